@@ -0,0 +1,48 @@
+"""
+Barrier-probability and ML backtesting, parameter sweeps and live trading.
+
+Importing the package loads no submodule: the names below are resolved on first access
+(PEP 562), and the heavy optional dependencies (lightgbm, arch, scipy, yfinance,
+matplotlib, broker APIs) are only imported inside the functions that use them.
+Command line: python -m <package> {backtest,sweep,live} --help
+"""
+import importlib
+
+_EXPORTS = {
+    "BacktestEngine": "backtest",
+    "BacktestEngineML": "backtest_ml",
+    "BacktestEngineHF": "backtest_hf",
+    "MultiStrategyRunner": "pipeline",
+    "PortfolioOptimizer": "portfolio",
+    "run_sweep": "sweep",
+    "compute_metrics": "metrics",
+    "fetch_multiple_stocks": "data",
+    "load_intraday": "data",
+    "ResultsStore": "results",
+    "Instrumentation": "instrumentation",
+    "LiveEngine": "live_engine",
+    "BarScheduler": "scheduler",
+    "SimulatedClock": "scheduler",
+    "MoneyManager": "money_management",
+    "MoneyManagerMT5": "money_management_mt5",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    else:
+        try:
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
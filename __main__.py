@@ -0,0 +1,5 @@
+# python -m <package> backtest | sweep | live
+import sys
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,128 @@
+# backtest.py
+import numpy as np
+import pandas as pd
+from functools import partial
+from .signals import barrier_frame, portfolio_signals
+from .volatility import GarchStage
+from .results import LazyFrames
+from .metrics import compute_metrics
+from .chunked import CarriedTail, ChunkedBarriers, ChunkedPortfolio
+from .engine import EngineBase, volatility_blocks
+
+class BacktestEngine(EngineBase):
+    def __init__(self, initial_capital=100000, transaction_cost=0.001, lookback_days=126, horizon_days=30,
+                 sell_threshold=0.7, buy_threshold=0.3, corr_threshold=0.8, results_dtype=np.float64,
+                 memory_budget=None, spill_dir=None, instrumentation=None, money_manager=None, sl_pct=None,
+                 tp_pct=None, barrier_model=None, garch_barriers=False, allocator=None, garch_stage=None):
+        """
+        lookback_days, horizon_days, sell_threshold, buy_threshold: barrier signal parameters
+        (signals.calculate_barrier_panel).
+        corr_threshold: correlation above which a BUY is dropped in favour of an earlier one.
+        Other parameters: see engine.EngineBase.
+        """
+        super().__init__(initial_capital, transaction_cost, results_dtype, memory_budget, spill_dir, instrumentation,
+                         money_manager, sl_pct, tp_pct, barrier_model, allocator)
+        self.lookback_days = lookback_days
+        self.horizon_days = horizon_days
+        self.sell_threshold = sell_threshold
+        self.buy_threshold = buy_threshold
+        self.corr_threshold = corr_threshold
+        self.garch_barriers = garch_barriers
+        self.garch_stage = garch_stage or GarchStage()
+
+    def run(self, tickers, start_date, end_date, prices=None):
+        first_span = len(self.instrumentation.spans)
+
+        # 1️⃣ Fetch prices (unless a panel is already provided), GARCH and barriers
+        prices, returns = self._fetch(tickers, start_date, end_date, prices)
+        results = self._results()
+        garch_vol, garch_report = self._garch(prices, tickers)
+        barrier_results = self._barriers(results, prices, tickers, lookback_days=self.lookback_days,
+                                         horizon_days=self.horizon_days, sell_threshold=self.sell_threshold,
+                                         buy_threshold=self.buy_threshold,
+                                         volatility=garch_vol if self.garch_barriers else None)
+
+        # 2️⃣ Compute volatility features
+        self._volatility(results, prices, tickers, volatility_blocks(prices[tickers], garch_vol))
+
+        # 3️⃣ Compute portfolio signals with correlation filter
+        with self.instrumentation.span("portfolio_signals", rows=len(returns)):
+            portfolio_sig = portfolio_signals(barrier_results, returns, corr_threshold=self.corr_threshold)
+
+        # 4️⃣ Simplified portfolio backtesting
+        dates = self._simulate(results, prices, tickers, results["barrier_panel"]["signal"])
+
+        return self._finish(results, first_span, dates=dates, portfolio_signals=portfolio_sig,
+                            garch_report=garch_report, barrier_results=barrier_results)
+
+    def run_chunked(self, tickers, blocks, corr_lookback=63):
+        """
+        Out-of-core run over consecutive time blocks of a wide price panel: any iterable of
+        frames, e.g. chunked.time_blocks(prices, 50_000) or blocks read one by one from disk.
+        Each stage carries only the state it needs to the next block (lookback windows,
+        pending barrier rows, cash, positions, benchmark units); results are appended block
+        by block to the ResultsStore, whose memory_budget / spill_dir bound the RAM they use.
+        Results match run(), except that there is no GARCH stage: its full-sample fit needs
+        the whole history at once, and trades are one unit per signal (no money_manager or allocator).
+        """
+        if self.money_manager is not None or self.garch_barriers or self.allocator is not None:
+            raise ValueError("run_chunked has no GARCH stage and simulates one unit per signal; "
+                             "use run() with a money_manager, an allocator or garch_barriers.")
+        ins = self.instrumentation
+        first_span = len(ins.spans)
+        results = self._results()
+
+        barriers = ChunkedBarriers(self.lookback_days, self.horizon_days, self.sell_threshold, self.buy_threshold,
+                                   self.barrier_model)
+        portfolio = ChunkedPortfolio(self.initial_capital, self.transaction_cost)
+        vol_history = CarriedTail(21)   # rolling(20) over pct_change
+        last_price = CarriedTail(1)     # pct_change across blocks
+        returns_tail = CarriedTail(corr_lookback + 1)
+        dates = []
+
+        def simulate(prices, codes):
+            block_dates, portfolio_values, benchmark_values, invested, traded = portfolio.update(prices, codes)
+            results.append("portfolio_values", portfolio_values)
+            results.append("benchmark_values", benchmark_values)
+            results.append("invested", invested)
+            results.append("traded", traded)
+            dates.append(block_dates)
+
+        # 1️⃣ Read blocks one at a time
+        for k, block in enumerate(blocks):
+            with ins.span("fetch", block=k, rows=len(block)):
+                returns_tail.extend(last_price.rolling(block, lambda p: p.pct_change()).dropna())
+                block = block[tickers]
+
+            # 2️⃣ Barrier rows of the dates now final, volatility features of the block
+            with ins.span("barriers", block=k, rows=len(block)):
+                prices, codes, panel = barriers.update(block)
+                results.append("barrier_panel", panel)
+            with ins.span("volatility", block=k, rows=len(block)):
+                vol = vol_history.rolling(block, lambda wide: pd.concat(
+                    {name: f() for name, f in volatility_blocks(wide).items()}, axis=1, names=["feature", "ticker"]))
+                results.append("volatility_features", vol)
+
+            # 3️⃣ Simulate the released dates, carrying cash and positions
+            with ins.span("simulation", block=k, rows=len(prices)):
+                simulate(prices, codes)
+
+        with ins.span("simulation", block="final"):
+            simulate(*barriers.finish())
+
+        # 4️⃣ Portfolio signals on the last barrier rows and the trailing returns
+        barrier_panel = results["barrier_panel"]
+        barrier_results = LazyFrames(tickers, partial(barrier_frame, barrier_panel))
+        with ins.span("portfolio_signals", rows=len(returns_tail.tail)):
+            portfolio_sig = portfolio_signals(barrier_results, returns_tail.tail, lookback=corr_lookback,
+                                              corr_threshold=self.corr_threshold)
+
+        results["dates"] = dates[0].append(dates[1:])
+        results["metrics"] = compute_metrics(results["portfolio_values"], self.initial_capital, results["invested"],
+                                             results["traded"])
+        results["portfolio_signals"] = portfolio_sig
+        results["barrier_results"] = barrier_results
+        results["spans"] = ins.spans[first_span:]
+        self.results = results
+
+        return self.results
@@ -1,96 +1,80 @@
 import pandas as pd
 import numpy as np
-from .data import fetch_multiple_stocks
-from .signals import calculate_barrier_metrics, portfolio_signals
+from .data import fetch_multiple_stocks, load_intraday, resample_closes, OHLCV_FIELDS
 from .volatility import VolatilityFeatures
-from .ml_model import compute_features, train_lightgbm
+from .ml_model import build_design_matrix
+from .metrics import periods_per_year
+from .engine import EngineBase
 
-class BacktestEngineHF:
-    def __init__(self, initial_capital=100000, transaction_cost=0.0005):
-        self.initial_capital = initial_capital
-        self.transaction_cost = transaction_cost
-        self.results = {}
+class BacktestEngineHF(EngineBase):
+    def __init__(self, initial_capital=100000, transaction_cost=0.0005, retrain_every=None, model_cache_dir=None,
+                 predict_jobs=1, results_dtype=np.float64, memory_budget=None, spill_dir=None,
+                 instrumentation=None, money_manager=None, sl_pct=None, tp_pct=None, barrier_model=None,
+                 allocator=None):
+        """Intraday bars, one-period ML horizon, no GARCH stage. Parameters: see engine.EngineBase."""
+        super().__init__(initial_capital, transaction_cost, results_dtype, memory_budget, spill_dir, instrumentation,
+                         money_manager, sl_pct, tp_pct, barrier_model, allocator)
+        self.retrain_every = retrain_every
+        self.model_cache_dir = model_cache_dir
+        self.predict_jobs = predict_jobs
 
-    def run(self, tickers, start_date, end_date, train_end_date, freq="1H"):
+    def run(self, tickers, start_date, end_date, train_end_date, freq="1h", prices=None, intraday=None,
+            chunksize=500_000):
         """
-        freq: '1H' = hourly, '1T' = minute, '1D' = daily
+        freq: '1h' = hourly, '1min' = minute, '1D' = daily (legacy '1H' / '1T' accepted)
+        prices: optional price panel used instead of downloading
+        intraday: local bar/tick exports ({ticker: path} or a folder of <ticker>.csv/.parquet,
+        e.g. MT5 or IBKR history) read in chunks of `chunksize` rows and resampled to `freq`;
+        the OHLCV panel is kept in results["ohlcv"]. Only bars that traded are kept, so bar
+        counts follow the real sessions instead of a forward-filled calendar.
         """
+        first_span = len(self.instrumentation.spans)
+
         # 1️⃣ Fetch intraday data
-        prices = fetch_multiple_stocks(tickers, start_date, end_date)
-        prices = prices.asfreq(freq).ffill()  # resample to desired frequency
+        with self.instrumentation.span("fetch") as sp:
+            ohlcv = None
+            if intraday is not None:
+                bars = load_intraday(intraday, freq, tickers, start_date, end_date, chunksize)
+                # Union of the sessions of all tickers; a ticker without a bar keeps its last close
+                ohlcv = {field: pd.DataFrame({t: bars[t][field] for t in tickers}) for field in OHLCV_FIELDS}
+                ohlcv["Volume"] = ohlcv["Volume"].fillna(0.0)
+                prices = ohlcv["Close"].ffill()
+            else:
+                if prices is None:
+                    prices = fetch_multiple_stocks(tickers, start_date, end_date)
+                prices = resample_closes(prices, freq).ffill()  # downsample only, no calendar fill
+            returns = prices.pct_change().dropna()
+            sp["rows"] = len(prices)
 
-        returns = prices.pct_change().dropna()
-        barrier_results = {}
-        vol_features = pd.DataFrame(index=prices.index)
+        results = self._results()
+        if ohlcv is not None:
+            results["ohlcv"] = ohlcv
+        barrier_results = self._barriers(results, prices, tickers)
 
-        # 2️⃣ Volatilité et barrier signals
-        for ticker in tickers:
-            df = prices[[ticker]].copy()
-            df["realized_vol"] = VolatilityFeatures.realized_volatility(df[ticker].pct_change())
-            df["garch_vol"] = df[ticker].pct_change().rolling(21).std()  # simple GARCH proxy
-            barrier_df = calculate_barrier_metrics(df[ticker])
-            barrier_results[ticker] = barrier_df
-            vol_features = pd.concat([vol_features, df[["realized_vol","garch_vol"]]], axis=1)
+        # 2️⃣ Volatilité
+        wide = prices[tickers]
+        self._volatility(results, prices, tickers, {
+            "realized_vol": lambda: VolatilityFeatures.realized_volatility(wide.pct_change()),
+            "garch_vol": lambda: wide.pct_change().rolling(21).std(),  # simple GARCH proxy
+        })
 
         # 3️⃣ Features ML et LightGBM
-        X, y = compute_features(prices, horizon_days=1, clip=0.02)  # horizon = 1 period for HF
-        model = train_lightgbm(X, y, train_end_date=train_end_date, n_estimators=200, lr=0.05)
+        with self.instrumentation.span("features") as sp:
+            design = build_design_matrix(prices, horizon_days=1, clip=0.02)  # horizon = 1 period for HF
+            sp["rows"] = len(design)
+        model, oos_pred = self._train(design, train_end_date, embargo=1, n_estimators=200, lr=0.05)
 
-        # 4️⃣ Predict HF returns
-        ml_signals = {}
-        for ticker in tickers:
-            X_ticker = X.xs(ticker, level=1)
-            y_pred = model.predict(X_ticker)
-            ml_signals[ticker] = pd.Series(y_pred, index=X_ticker.index).apply(
-                lambda x: "BUY" if x > 0 else "SELL"
-            )
+        # 4️⃣ Predict HF returns, one batched pass over the design matrix
+        ml_signals = self._predict(results, design, model, oos_pred, tickers)
 
         # 5️⃣ Combine ML + barrier signals
-        combined_signals = {}
-        for ticker in tickers:
-            barrier_df = barrier_results[ticker].set_index("date")
-            ml_df = ml_signals[ticker].to_frame(name="ml_signal")
-            combined = pd.concat([barrier_df["signal"], ml_df], axis=1, join="inner")
-            combined["signal"] = np.where(combined["signal"]==combined["ml_signal"], combined["signal"], "HOLD")
-            combined_signals[ticker] = combined
-
-        portfolio_sig = portfolio_signals(combined_signals, returns)
+        combined_signals, portfolio_sig = self._combine(results, tickers, returns)
 
         # 6️⃣ High-frequency backtesting
-        portfolio_values = []
-        benchmark_values = []
-        cash = self.initial_capital
-        positions = {t: 0 for t in tickers}
-
-        for date in prices.index[1:]:
-            daily_prices = prices.loc[date]
-            signals = {t: combined_signals[t].loc[date, "signal"] if date in combined_signals[t].index else "HOLD"
-                       for t in tickers}
-
-            # HF allocation: 1 unit per signal
-            for t, sig in signals.items():
-                price = daily_prices[t]
-                if sig == "BUY" and cash >= price:
-                    positions[t] += 1
-                    cash -= price * (1 + self.transaction_cost)
-                elif sig == "SELL" and positions[t] > 0:
-                    positions[t] -= 1
-                    cash += price * (1 - self.transaction_cost)
-
-            portfolio_val = cash + sum(positions[t]*daily_prices[t] for t in tickers)
-            portfolio_values.append(portfolio_val)
-            benchmark_values.append(sum(self.initial_capital/len(tickers)/prices[t].iloc[0]*daily_prices[t] for t in tickers))
-
-        self.results = {
-            "portfolio_values": portfolio_values,
-            "benchmark_values": benchmark_values,
-            "dates": prices.index[1:],
-            "portfolio_signals": portfolio_sig,
-            "volatility_features": vol_features,
-            "barrier_results": barrier_results,
-            "ml_signals": ml_signals,
-            "combined_signals": combined_signals,
-            "model": model
-        }
+        bars = None if ohlcv is None else {"open_": ohlcv["Open"], "high": ohlcv["High"], "low": ohlcv["Low"]}
+        dates = self._simulate(results, prices, tickers, results["combined_signal_panel"], bars,
+                               periods_per_year(prices.index[1:]))
 
-        return self.results
+        return self._finish(results, first_span, dates=dates, portfolio_signals=portfolio_sig,
+                            barrier_results=barrier_results, ml_signals=ml_signals,
+                            combined_signals=combined_signals, model=model)
@@ -0,0 +1,50 @@
+import numpy as np
+from .volatility import GarchStage
+from .ml_model import build_design_matrix
+from .engine import EngineBase, volatility_blocks
+
+class BacktestEngineML(EngineBase):
+    def __init__(self, initial_capital=100000, transaction_cost=0.001, retrain_every=None, model_cache_dir=None,
+                 predict_jobs=1, results_dtype=np.float64, memory_budget=None, spill_dir=None,
+                 instrumentation=None, money_manager=None, sl_pct=None, tp_pct=None, barrier_model=None,
+                 garch_barriers=False, allocator=None, garch_stage=None):
+        """Barrier signals confirmed by a LightGBM return forecast. Parameters: see engine.EngineBase."""
+        super().__init__(initial_capital, transaction_cost, results_dtype, memory_budget, spill_dir, instrumentation,
+                         money_manager, sl_pct, tp_pct, barrier_model, allocator)
+        self.retrain_every = retrain_every
+        self.model_cache_dir = model_cache_dir
+        self.predict_jobs = predict_jobs
+        self.garch_barriers = garch_barriers
+        self.garch_stage = garch_stage or GarchStage()
+
+    def run(self, tickers, start_date, end_date, train_end_date, prices=None):
+        first_span = len(self.instrumentation.spans)
+
+        # 1️⃣ Fetch prices (unless a panel is already provided), GARCH and barriers
+        prices, returns = self._fetch(tickers, start_date, end_date, prices)
+        results = self._results()
+        garch_vol, garch_report = self._garch(prices, tickers)
+        barrier_results = self._barriers(results, prices, tickers,
+                                         volatility=garch_vol if self.garch_barriers else None)
+
+        # 2️⃣ Compute volatility features
+        self._volatility(results, prices, tickers, volatility_blocks(prices[tickers], garch_vol))
+
+        # 3️⃣ Compute ML features and train LightGBM
+        with self.instrumentation.span("features") as sp:
+            design = build_design_matrix(prices, horizon_days=30, clip=0.3)
+            sp["rows"] = len(design)
+        model, oos_pred = self._train(design, train_end_date, embargo=30)
+
+        # 4️⃣ Predict future returns for all tickers, one batched pass over the design matrix
+        ml_signals = self._predict(results, design, model, oos_pred, tickers)
+
+        # 5️⃣ Combine ML signals with barrier signals using correlation filter
+        combined_signals, portfolio_sig = self._combine(results, tickers, returns)
+
+        # 6️⃣ Simplified backtesting
+        dates = self._simulate(results, prices, tickers, results["combined_signal_panel"])
+
+        return self._finish(results, first_span, dates=dates, portfolio_signals=portfolio_sig,
+                            garch_report=garch_report, barrier_results=barrier_results, ml_signals=ml_signals,
+                            combined_signals=combined_signals, model=model)
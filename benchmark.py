@@ -0,0 +1,285 @@
+"""
+Offline benchmark suite: every pipeline stage timed on seeded synthetic OHLCV data.
+
+    python -m <package>.benchmark run --tickers 10 50 --bars 2000 10000 --freq B h --out bench.json
+    python -m <package>.benchmark compare base.json bench.json --tolerance 0.2
+    python -m <package>.benchmark startup --out startup.json
+
+`run` writes one JSON document (environment + one row per case x stage); `compare` joins two
+of them on (tickers, bars, freq, stage) and exits non-zero when a stage got slower than
+`tolerance` allows. `startup` times fresh interpreters importing the package, the CLI and the
+engines (same file format, so `compare` guards it too) and exits non-zero when one of them
+pulled in a heavy optional dependency.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .signals import calculate_barrier_panel, calculate_correlations, MonteCarloBarrier
+from .volatility import VolatilityFeatures, GarchStage
+from .ml_model import compute_features, train_lightgbm, predict_batched
+from .simulation import simulate_unit_portfolio
+
+BARS_PER_YEAR = {"B": 252, "D": 252, "h": 252 * 7, "H": 252 * 7, "min": 252 * 390, "T": 252 * 390}
+REGIMES = ((0.08, 0.15), (-0.15, 0.40))  # (annualised drift, annualised vol): calm, stressed
+
+
+# -------------------- SYNTHETIC DATA --------------------
+def synthetic_ohlcv(n_tickers=10, n_bars=2000, freq="B", seed=0, start="2015-01-02", n_sectors=3,
+                    market_beta=0.6, sector_beta=0.4, regimes=REGIMES, switch_prob=0.01):
+    """
+    Seeded GBM panel with a market + sector factor structure and Markov regime switching.
+
+    Returns {"Open", "High", "Low", "Close", "Volume"} -> (n_bars x n_tickers) DataFrames,
+    the same fields as data.fetch_ohlcv, so every stage can run without a network.
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1 / BARS_PER_YEAR[freq]
+    mu, sigma = np.array(regimes, dtype=float).T
+    regime = np.cumsum(rng.random(n_bars) < switch_prob) % len(regimes)
+
+    sector = np.arange(n_tickers) % n_sectors
+    idio = np.sqrt(max(0.0, 1 - market_beta ** 2 - sector_beta ** 2))
+    z = (market_beta * rng.standard_normal((n_bars, 1))
+         + sector_beta * rng.standard_normal((n_bars, n_sectors))[:, sector]
+         + idio * rng.standard_normal((n_bars, n_tickers)))
+    vol = sigma[regime][:, None] * rng.uniform(0.7, 1.3, n_tickers)
+    log_ret = (mu[regime][:, None] - 0.5 * vol ** 2) * dt + vol * np.sqrt(dt) * z
+
+    close = rng.uniform(20, 200, n_tickers) * np.exp(np.cumsum(log_ret, axis=0))
+    bar_vol = vol * np.sqrt(dt)
+    open_ = np.vstack([close[:1], close[:-1]]) * np.exp(0.2 * bar_vol * rng.standard_normal(close.shape))
+    high = np.maximum(open_, close) * np.exp(0.5 * bar_vol * np.abs(rng.standard_normal(close.shape)))
+    low = np.minimum(open_, close) * np.exp(-0.5 * bar_vol * np.abs(rng.standard_normal(close.shape)))
+    volume = rng.lognormal(13, 0.5, close.shape).round()
+
+    index = pd.date_range(start, periods=n_bars, freq=freq, name="Date")
+    columns = [f"SYN{i:04d}" for i in range(n_tickers)]
+    return {name: pd.DataFrame(values, index=index, columns=columns)
+            for name, values in (("Open", open_), ("High", high), ("Low", low), ("Close", close), ("Volume", volume))}
+
+
+# -------------------- STAGES --------------------
+# Each stage takes the case context and returns its output, kept in the context for later
+# stages; a stage whose input was not selected computes it untimed through _need.
+def _need(ctx, name):
+    if name not in ctx:
+        ctx[name] = STAGES[name](ctx)
+    return ctx[name]
+
+
+def _volatility_features(ctx):
+    o = ctx["ohlcv"]
+    return (VolatilityFeatures.realized_volatility(o["Close"].pct_change()),
+            VolatilityFeatures.parkinson_volatility(o["High"], o["Low"]),
+            VolatilityFeatures.garman_klass_volatility(o["Open"], o["High"], o["Low"], o["Close"]),
+            VolatilityFeatures.close_to_close_volatility(o["Close"]))
+
+
+def _simulation(ctx):
+    codes = _need(ctx, "barrier_metrics")["signal"].reindex(ctx["prices"].index[1:], fill_value=0).to_numpy()
+    prices = ctx["prices"].to_numpy(dtype=float)
+    return simulate_unit_portfolio(prices[1:], codes, 100000, 0.001)
+
+
+def _engine(name):
+    """End-to-end run of one engine on the synthetic panel (engines imported on first use)."""
+    def run(ctx):
+        if name == "backtest":
+            from .backtest import BacktestEngine
+            return BacktestEngine().run(ctx["tickers"], None, None, prices=ctx["prices"])
+        if name == "ml":
+            from .backtest_ml import BacktestEngineML
+            return BacktestEngineML().run(ctx["tickers"], None, None, ctx["train_end"], prices=ctx["prices"])
+        from .backtest_hf import BacktestEngineHF
+        return BacktestEngineHF().run(ctx["tickers"], None, None, ctx["train_end"], freq=ctx["freq"],
+                                      prices=ctx["prices"])
+    return run
+
+
+STAGES = {
+    "barrier_metrics": lambda ctx: calculate_barrier_panel(ctx["prices"]),
+    "barrier_mc": lambda ctx: calculate_barrier_panel(ctx["prices"], model=MonteCarloBarrier(seed=ctx["seed"])),
+    "correlations": lambda ctx: calculate_correlations(ctx["prices"].pct_change().dropna()),
+    "volatility_features": _volatility_features,
+    "garch": lambda ctx: GarchStage().fit(ctx["prices"]),
+    "compute_features": lambda ctx: compute_features(ctx["prices"], horizon_days=1, clip=0.02),
+    "train_lightgbm": lambda ctx: train_lightgbm(*_need(ctx, "compute_features"), ctx["train_end"],
+                                                 n_estimators=200, lr=0.05),
+    "predict": lambda ctx: predict_batched(_need(ctx, "train_lightgbm"), _need(ctx, "compute_features")[0]),
+    "simulation": _simulation,
+    "engine_backtest": _engine("backtest"),
+    "engine_ml": _engine("ml"),
+    "engine_hf": _engine("hf"),
+}
+DEFAULT_STAGES = ["barrier_metrics", "correlations", "volatility_features", "compute_features",
+                  "train_lightgbm", "predict", "simulation", "engine_hf"]
+
+
+def _time_stage(func, ctx, repeat, memory):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(ctx)
+        times.append(time.perf_counter() - start)
+    peak = np.nan
+    if memory:
+        # Separate traced run: tracemalloc slows Python-heavy code, so it is kept out of the timings
+        tracemalloc.start()
+        try:
+            func(ctx)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return out, times, peak
+
+
+def run_benchmarks(tickers=(10,), bars=(2000,), freqs=("B",), stages=None, repeat=3, seed=0,
+                   memory=True, log=print):
+    """Time `stages` on every tickers x bars x freq case; returns one dict per (case, stage)."""
+    stages = DEFAULT_STAGES if stages is None else list(stages)
+    rows = []
+    for n_tickers in tickers:
+        for n_bars in bars:
+            for freq in freqs:
+                ohlcv = synthetic_ohlcv(n_tickers, n_bars, freq, seed)
+                prices = ohlcv["Close"]
+                ctx = {"ohlcv": ohlcv, "prices": prices, "tickers": list(prices.columns), "freq": freq, "seed": seed,
+                       "train_end": prices.index[n_bars // 2]}
+                for name in stages:
+                    # Engine runs are end-to-end and slow: timed once
+                    n = 1 if name.startswith("engine_") or name == "garch" else repeat
+                    ctx[name], times, peak = _time_stage(STAGES[name], ctx, n, memory)
+                    row = {"tickers": n_tickers, "bars": n_bars, "freq": freq, "stage": name, "repeat": n,
+                           "time_min_s": min(times), "time_median_s": float(np.median(times)),
+                           "cells_per_s": n_tickers * n_bars / min(times) if min(times) > 0 else np.nan,
+                           "peak_mem_mb": peak}
+                    rows.append(row)
+                    log(f"{n_tickers:>5} x {n_bars:>7} {freq:>4} {name:<20} {row['time_median_s']:9.4f}s"
+                        f" {peak:9.1f} MB")
+    return rows
+
+
+# -------------------- STARTUP --------------------
+# Optional dependencies that must only be imported by the functions using them
+HEAVY_MODULES = ("lightgbm", "arch", "scipy", "sklearn", "yfinance", "matplotlib", "MetaTrader5", "ib_insync")
+# Statement run by a fresh interpreter for each startup case ({pkg}: this package)
+STARTUP_CASES = {
+    "import_package": "import {pkg}",
+    "cli_parse": "from {pkg}.cli import build_parser; build_parser().parse_args(['backtest'])",
+    "import_engines": "import {pkg}.backtest, {pkg}.backtest_ml, {pkg}.backtest_hf",
+    "import_sweep": "import {pkg}.sweep, {pkg}.pipeline",
+    "import_live": "import {pkg}.live_hf_ibkr, {pkg}.live_hf_mt5",
+}
+
+
+def startup_times(repeat=5, log=print):
+    """
+    Wall time of a fresh interpreter running each STARTUP_CASES statement (interpreter start
+    included), with the HEAVY_MODULES it ended up importing; one row per case.
+    """
+    pkg_dir = os.path.dirname(os.path.abspath(__file__))
+    parent = os.path.dirname(pkg_dir)
+    pkg = __name__.rpartition(".")[0] or os.path.basename(pkg_dir)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [parent, os.environ.get("PYTHONPATH")])))
+    probe = f"; import sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    rows = []
+    for case, statement in STARTUP_CASES.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", statement.format(pkg=pkg) + probe], capture_output=True,
+                                 text=True, check=True, env=env, cwd=parent)
+            times.append(time.perf_counter() - start)
+        heavy = json.loads(out.stdout.strip().splitlines()[-1])
+        row = {"tickers": 0, "bars": 0, "freq": "-", "stage": f"startup_{case}", "repeat": repeat,
+               "time_min_s": min(times), "time_median_s": float(np.median(times)), "cells_per_s": np.nan,
+               "peak_mem_mb": np.nan, "heavy_imports": heavy}
+        rows.append(row)
+        log(f"{case:<20} {row['time_median_s']:9.4f}s  heavy imports: {', '.join(heavy) or 'none'}")
+    return rows
+
+
+def environment():
+    """Commit and library versions recorded next to the timings."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "processor": platform.processor()}
+
+
+def write_results(rows, path):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": rows}, f, indent=1, default=float)
+
+
+def compare(base_path, new_path, tolerance=0.2):
+    """
+    Median time ratio new/base per (tickers, bars, freq, stage); `regression` is True when
+    the ratio exceeds 1 + tolerance.
+    """
+    keys = ["tickers", "bars", "freq", "stage"]
+    frames = []
+    for path in (base_path, new_path):
+        with open(path) as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]).set_index(keys))
+    base, new = frames
+    table = base[["time_median_s", "peak_mem_mb"]].join(new[["time_median_s", "peak_mem_mb"]],
+                                                        how="inner", lsuffix="_base", rsuffix="_new")
+    table["time_ratio"] = table["time_median_s_new"] / table["time_median_s_base"]
+    table["regression"] = table["time_ratio"] > 1 + tolerance
+    return table.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run the benchmark matrix")
+    run.add_argument("--tickers", type=int, nargs="+", default=[10, 50])
+    run.add_argument("--bars", type=int, nargs="+", default=[2000])
+    run.add_argument("--freq", nargs="+", default=["B"], choices=sorted(BARS_PER_YEAR))
+    run.add_argument("--stages", nargs="+", default=None, choices=list(STAGES))
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    run.add_argument("--out", default="benchmark.json")
+    start = sub.add_parser("startup", help="time package / CLI / engine imports in fresh interpreters")
+    start.add_argument("--repeat", type=int, default=5)
+    start.add_argument("--out", default="startup.json")
+    cmp = sub.add_parser("compare", help="compare two benchmark files")
+    cmp.add_argument("base")
+    cmp.add_argument("new")
+    cmp.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        rows = run_benchmarks(args.tickers, args.bars, args.freq, args.stages, args.repeat, args.seed,
+                              memory=not args.no_memory)
+        write_results(rows, args.out)
+        print(f"Wrote {len(rows)} rows to {args.out}")
+        return 0
+    if args.command == "startup":
+        rows = startup_times(args.repeat)
+        write_results(rows, args.out)
+        print(f"Wrote {len(rows)} rows to {args.out}")
+        return 1 if any(row["heavy_imports"] for row in rows) else 0
+    table = compare(args.base, args.new, args.tolerance)
+    print(table.to_string(index=False))
+    return 1 if table["regression"].any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
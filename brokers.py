@@ -0,0 +1,290 @@
+import asyncio
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+ACK_STATUSES = {"PreSubmitted", "Submitted", "Filled", "Cancelled", "ApiCancelled", "Inactive"}
+DONE_STATUSES = {"Filled", "Cancelled", "ApiCancelled", "Inactive"}
+
+
+class Broker:
+    """
+    Interface used by LiveEngine. An order is a dict with keys
+    symbol, side ("BUY"/"SELL"), volume, price, sl, tp.
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+
+    def history(self, n):
+        """(n bars x symbols) DataFrame of closes used to warm up signals and train the model."""
+        raise NotImplementedError
+
+    def poll(self, symbols=None):
+        """{symbol: price} for the new bar (of `symbols`, default all), or None when no more data will come."""
+        raise NotImplementedError
+
+    def last_update(self, symbol):
+        """Time of the latest bar / quote of `symbol`, so a scheduler can skip unchanged symbols (None: unknown)."""
+        return None
+
+    def place_orders(self, orders):
+        """Submit a batch of orders; returns one ack dict (status, ack_ms) per order."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ReplayBroker(Broker):
+    """
+    Deterministic in-process broker streaming historical bars from a price panel or files.
+    The first `warmup` bars are served by history(), then poll() returns one bar per call.
+    With a `clock` (e.g. scheduler.SimulatedClock), poll() instead returns, per symbol, the
+    last bar closed at the clock's time, so bars of mixed frequencies come out on schedule.
+    Orders are acknowledged immediately and kept in `self.fills`.
+    """
+
+    def __init__(self, prices, warmup=500, clock=None):
+        if isinstance(prices, dict):
+            prices = pd.DataFrame({s: self._read(p) if isinstance(p, str) else p for s, p in prices.items()})
+        super().__init__(prices.columns)
+        self.prices = prices.sort_index()
+        self.warmup = warmup
+        self.cursor = warmup
+        self.clock = clock
+        self.fills = []
+        if clock is not None:
+            # per symbol: bar times (as epoch seconds, like the clock) and closes after the warm-up
+            live = self.prices.iloc[warmup:]
+            self.series = {}
+            for s in self.symbols:
+                col = live[s].dropna()
+                times = ((col.index - pd.Timestamp(0, tz=col.index.tz)).total_seconds()
+                         if isinstance(col.index, pd.DatetimeIndex) else col.index)
+                self.series[s] = (np.asarray(times, dtype=float), col.to_numpy())
+            self.end = max((t[-1] for t, _ in self.series.values() if len(t)), default=-np.inf)
+
+    @staticmethod
+    def _read(path):
+        """Close series from a CSV/Parquet export with a time/date column and a close column."""
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        df.columns = [c.lower() for c in df.columns]
+        time_col = "time" if "time" in df.columns else "date"
+        return df.set_index(pd.to_datetime(df[time_col]))["close"]
+
+    def history(self, n=None):
+        start = 0 if n is None else max(0, self.warmup - n)
+        return self.prices.iloc[start:self.warmup]
+
+    def _last_bar(self, symbol):
+        """Position of the last bar of `symbol` closed at the clock's time (-1 before the first)."""
+        times, _ = self.series[symbol]
+        return np.searchsorted(times, self.clock.now(), side="right") - 1
+
+    def poll(self, symbols=None):
+        if self.clock is not None:
+            if self.clock.now() > self.end:
+                return None
+            return {s: self.series[s][1][i] for s in (self.symbols if symbols is None else symbols)
+                    if (i := self._last_bar(s)) >= 0}
+        if self.cursor >= len(self.prices):
+            return None
+        row = self.prices.iloc[self.cursor]
+        self.cursor += 1
+        prices = row.dropna()
+        return prices[prices.index.isin(symbols)].to_dict() if symbols is not None else prices.to_dict()
+
+    def last_update(self, symbol):
+        if self.clock is None or self.clock.now() > self.end:
+            return None  # unknown / feed over: the next poll() tells
+        i = self._last_bar(symbol)
+        return self.series[symbol][0][i] if i >= 0 else None
+
+    @property
+    def now(self):
+        if self.clock is not None:
+            return pd.Timestamp(self.clock.now(), unit="s")
+        return self.prices.index[min(self.cursor, len(self.prices)) - 1]
+
+    def place_orders(self, orders):
+        acks = []
+        for o in orders:
+            self.fills.append({**o, "time": self.now})
+            acks.append({**o, "status": "Filled", "ack_ms": 0.0})
+        return acks
+
+
+class MT5Broker(Broker):
+    """MetaTrader 5 terminal adapter (M1 bars, market orders with SL/TP)."""
+
+    def __init__(self, symbols, timeframe=None):
+        import MetaTrader5 as mt5
+        super().__init__(symbols)
+        self.mt5 = mt5
+        self.timeframe = timeframe if timeframe is not None else mt5.TIMEFRAME_M1
+        if not mt5.initialize():
+            mt5.shutdown()
+            raise RuntimeError("MT5 initialization failed")
+
+    def history(self, n=500):
+        data = {}
+        for s in self.symbols:
+            df = pd.DataFrame(self.mt5.copy_rates_from_pos(s, self.timeframe, 0, n))
+            df['time'] = pd.to_datetime(df['time'], unit='s')
+            data[s] = df.set_index('time')['close']
+        return pd.DataFrame(data)
+
+    def poll(self, symbols=None):
+        return {s: self.mt5.symbol_info_tick(s).ask for s in (self.symbols if symbols is None else symbols)}
+
+    def last_update(self, symbol):
+        return self.mt5.symbol_info_tick(symbol).time_msc
+
+    def place_orders(self, orders):
+        acks = []
+        for o in orders:
+            start = time.perf_counter()
+            request = {
+                "action": self.mt5.TRADE_ACTION_DEAL,
+                "symbol": o["symbol"],
+                "volume": o["volume"],
+                "type": self.mt5.ORDER_TYPE_BUY if o["side"] == "BUY" else self.mt5.ORDER_TYPE_SELL,
+                "price": o["price"],
+            }
+            if o.get("sl") is not None:
+                request["sl"], request["tp"] = o["sl"], o["tp"]
+            result = self.mt5.order_send(request)
+            status = "Done" if result is not None and result.retcode == self.mt5.TRADE_RETCODE_DONE else "Rejected"
+            acks.append({**o, "status": status, "ack_ms": (time.perf_counter() - start) * 1000})
+        return acks
+
+    def close(self):
+        self.mt5.shutdown()
+
+
+class AsyncIBKRTrader:
+    """
+    Streaming quotes and concurrent order submission on top of ib_insync's async API.
+    Only uses qualifyContractsAsync / reqMktData / placeOrder and, on shutdown,
+    cancelOrder / cancelMktData on `ib`, so a local stub with the same methods can stand
+    in for TWS / IB Gateway (see tests/fake_ib.py).
+    """
+
+    def __init__(self, ib, symbols, ack_timeout=5):
+        self.ib = ib
+        self.symbols = list(symbols)
+        self.ack_timeout = ack_timeout
+        self.contracts = {}
+        self.tickers = {}
+        self.orders = []  # one dict per submitted order: symbol, action, status, ack latency
+        self.trades = []  # (record, ib_insync Trade) of every submitted order
+
+    async def subscribe(self):
+        """Qualify all stock contracts in one request and open a streaming quote per symbol."""
+        from ib_insync import Stock
+        contracts = [Stock(s, 'SMART', 'USD') for s in self.symbols]
+        await self.ib.qualifyContractsAsync(*contracts)
+        for s, c in zip(self.symbols, contracts):
+            self.contracts[s] = c
+            self.tickers[s] = self.ib.reqMktData(c, '', False, False)
+
+    def latest_prices(self, symbols=None):
+        """Last streamed price per symbol (symbols without a valid quote yet are left out)."""
+        prices = {}
+        for s in self.symbols if symbols is None else symbols:
+            p = self.tickers[s].marketPrice()
+            if p == p and p > 0:
+                prices[s] = p
+        return prices
+
+    async def _wait_ack(self, record, trade):
+        start = time.perf_counter()
+        while trade.orderStatus.status not in ACK_STATUSES:
+            if time.perf_counter() - start > self.ack_timeout:
+                record["status"] = "Timeout"
+                return record
+            await asyncio.sleep(0.005)
+        record["status"] = trade.orderStatus.status
+        record["ack_ms"] = (time.perf_counter() - start) * 1000
+        return record
+
+    async def submit(self, orders):
+        """Place every (symbol, contract, order) at once, then await all acknowledgements concurrently."""
+        waits = []
+        for symbol, contract, order in orders:
+            trade = self.ib.placeOrder(contract, order)
+            record = {"time": datetime.now(), "symbol": symbol, "contract": contract.secType,
+                      "action": order.action, "qty": order.totalQuantity, "status": None, "ack_ms": np.nan}
+            self.orders.append(record)
+            self.trades.append((record, trade))
+            waits.append(self._wait_ack(record, trade))
+        return await asyncio.gather(*waits)
+
+    def shutdown(self):
+        """Cancel the orders still working (acknowledged or not) and stop the quote streams."""
+        for record, trade in self.trades:
+            if trade.orderStatus.status not in DONE_STATUSES:
+                self.ib.cancelOrder(trade.order)
+                record["status"] = "PendingCancel"
+        self.trades = []
+        for contract in self.contracts.values():
+            self.ib.cancelMktData(contract)
+        self.tickers = {}
+
+
+class IBKRBroker(Broker):
+    """
+    Interactive Brokers adapter (TWS / IB Gateway). Quotes come from streaming
+    subscriptions; each stock order can be mirrored by an option order, and a batch
+    is submitted concurrently through AsyncIBKRTrader.
+    """
+
+    def __init__(self, symbols, host='127.0.0.1', port=7497, client_id=1,
+                 option_expiry=None, option_right="C", ib=None):
+        from ib_insync import IB, util
+        super().__init__(symbols)
+        self.util = util
+        self.ib = ib if ib is not None else IB()
+        if not self.ib.isConnected():
+            self.ib.connect(host, port, clientId=client_id)
+        self.option_expiry = option_expiry
+        self.option_right = option_right
+        self.trader = AsyncIBKRTrader(self.ib, symbols)
+        self.util.run(self.trader.subscribe())
+
+    async def _history(self, symbol, duration, bar_size):
+        from ib_insync import Stock
+        bars = await self.ib.reqHistoricalDataAsync(Stock(symbol, 'SMART', 'USD'), endDateTime='',
+                                                    durationStr=duration, barSizeSetting=bar_size,
+                                                    whatToShow='TRADES', useRTH=True)
+        return self.util.df(bars).set_index('date')['close']
+
+    def history(self, n=None, duration="60 D", bar_size="1 day"):
+        closes = self.util.run(asyncio.gather(*(self._history(s, duration, bar_size) for s in self.symbols)))
+        data = pd.DataFrame(dict(zip(self.symbols, closes)))
+        return data if n is None else data.iloc[-n:]
+
+    def poll(self, symbols=None):
+        self.ib.sleep(0)  # let ib_insync process pending ticker updates
+        return self.trader.latest_prices(symbols)
+
+    def last_update(self, symbol):
+        self.ib.sleep(0)
+        return self.trader.tickers[symbol].time
+
+    def place_orders(self, orders):
+        from ib_insync import Option, MarketOrder
+        batch = []
+        for o in orders:
+            order = MarketOrder(o["side"], o["volume"])
+            batch.append((o["symbol"], self.trader.contracts[o["symbol"]], order))
+            if self.option_expiry is not None:
+                option = Option(o["symbol"], self.option_expiry, round(o["price"]), self.option_right, 'SMART')
+                batch.append((o["symbol"], option, MarketOrder(o["side"], o["volume"])))
+        return self.util.run(self.trader.submit(batch))
+
+    def close(self):
+        self.trader.shutdown()
+        self.ib.disconnect()
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from .signals import barrier_rows
+from .simulation import align_signal_panel, simulate_unit_portfolio
+from .metrics import position_flows
+
+
+def time_blocks(prices, rows):
+    """Consecutive blocks of `rows` dates of a wide price frame (e.g. one backed by a memmap)."""
+    for start in range(0, len(prices), rows):
+        yield prices.iloc[start:start + rows]
+
+
+def _concat(head, block):
+    return block if head is None else pd.concat([head, block])
+
+
+class CarriedTail:
+    """
+    Last `rows` rows of a stream of blocks, prepended to the next block so that rolling
+    windows computed on it see the same history as on the full frame.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.tail = None
+
+    def extend(self, block):
+        """Returns (carried rows + block, number of carried rows)."""
+        carried = 0 if self.tail is None else len(self.tail)
+        buf = _concat(self.tail, block)
+        self.tail = buf.iloc[max(0, len(buf) - self.rows):] if self.rows else buf.iloc[:0]
+        return buf, carried
+
+    def rolling(self, block, func):
+        """func(frame) -> frame of the same rows, evaluated on the block with its history."""
+        buf, carried = self.extend(block)
+        return func(buf).iloc[carried:]
+
+
+class ChunkedBarriers:
+    """
+    calculate_barrier_panel over consecutive time blocks, carrying the last `lookback_days`
+    prices. The last `horizon_days` dates of the full history get no barrier row, so dates
+    are released `horizon_days` late, once it is known they are not among them; finish()
+    releases the remaining ones as HOLD.
+    """
+
+    def __init__(self, lookback_days=126, horizon_days=30, sell_threshold=0.7, buy_threshold=0.3, model=None):
+        self.lookback_days = lookback_days
+        self.horizon_days = horizon_days
+        self.sell_threshold = sell_threshold
+        self.buy_threshold = buy_threshold
+        self.model = model
+        self.history = CarriedTail(lookback_days)
+        self.seen = 0
+        self.pending_prices = None
+        self.pending_panel = None
+
+    def update(self, block):
+        """Returns (prices, signal codes, barrier panel) for the dates whose signal is now final."""
+        buf, carried = self.history.extend(block)
+        start = max(carried, self.lookback_days - (self.seen - carried))
+        panel = barrier_rows(buf, start, len(buf), self.lookback_days, self.horizon_days,
+                             self.sell_threshold, self.buy_threshold, self.model)
+        self.seen += len(block)
+        self.pending_prices = _concat(self.pending_prices, block)
+        self.pending_panel = panel if self.pending_panel is None else \
+            {k: pd.concat([self.pending_panel[k], v]) for k, v in panel.items()}
+        return self._release(max(0, len(self.pending_prices) - self.horizon_days))
+
+    def finish(self):
+        """The last `horizon_days` dates: HOLD, without barrier rows (as in the full run)."""
+        prices = self.pending_prices if self.pending_prices is not None else pd.DataFrame()
+        codes = np.zeros(prices.shape, dtype=np.int8)
+        self.pending_prices = self.pending_panel = None
+        return prices, codes
+
+    def _release(self, n):
+        prices = self.pending_prices.iloc[:n]
+        # Barrier rows are the trailing rows of the pending dates (earlier ones are warm-up)
+        n_rows = max(0, len(self.pending_panel["signal"]) - (len(self.pending_prices) - n))
+        panel = {k: v.iloc[:n_rows] for k, v in self.pending_panel.items()}
+        self.pending_prices = self.pending_prices.iloc[n:]
+        self.pending_panel = {k: v.iloc[n_rows:] for k, v in self.pending_panel.items()}
+        return prices, align_signal_panel(panel["signal"], prices.index), panel
+
+
+class ChunkedPortfolio:
+    """
+    simulate_unit_portfolio and the buy & hold benchmark over consecutive blocks of
+    (prices, codes), carrying cash, positions and benchmark units. The first date is the
+    starting point and is not simulated, as in the full run.
+    """
+
+    def __init__(self, initial_capital=100000, transaction_cost=0.001):
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.cash = float(initial_capital)
+        self.positions = None
+        self.units = None
+
+    def update(self, prices, codes):
+        """Returns (dates, portfolio values, benchmark values, invested, traded) of the simulated dates."""
+        values = prices.to_numpy(dtype=float)
+        if self.units is None and len(values):
+            self.units = self.initial_capital / values.shape[1] / values[0]
+            prices, values, codes = prices.iloc[1:], values[1:], codes[1:]
+        portfolio_values, cash, positions = simulate_unit_portfolio(values, codes, self.cash, self.transaction_cost,
+                                                                    positions=self.positions)
+        # Trades of the first date are counted from the positions carried in
+        previous = np.zeros((1, values.shape[1])) if self.positions is None else self.positions[None]
+        invested, traded = position_flows(np.vstack([previous, positions]), np.vstack([previous, values]))
+        if len(values):
+            self.cash, self.positions = cash[-1], positions[-1]
+        benchmark_values = (self.units * values).sum(axis=1) if self.units is not None else np.empty(0)
+        return prices.index, portfolio_values, benchmark_values, invested[1:], traded[1:]
@@ -0,0 +1,107 @@
+"""
+Command line entry point:
+
+    python -m <package> backtest --tickers AAPL MSFT GOOGL --start 2020-01-01 --end 2024-01-01
+    python -m <package> backtest --engine ml --train-end 2022-01-01 --plot
+    python -m <package> sweep --grid '{"lookback_days": [63, 126], "buy_threshold": [0.2, 0.3]}' --out sweep.csv
+    python -m <package> live ibkr --spans-log live_spans.jsonl
+
+Only argparse is imported to parse the command line; each subcommand imports what it runs
+(pandas for everything, lightgbm only when a model is trained, matplotlib only with --plot,
+broker APIs only for live).
+"""
+import argparse
+import json
+
+DEFAULT_TICKERS = ["AAPL", "MSFT", "GOOGL"]
+
+
+def _backtest(args):
+    from .signals import signal_labels
+    from .report import plot_portfolio_results, print_report
+    if args.engine == "barrier":
+        from .backtest import BacktestEngine
+        res = BacktestEngine().run(args.tickers, args.start, args.end)
+    elif args.engine == "ml":
+        from .backtest_ml import BacktestEngineML
+        res = BacktestEngineML(retrain_every=args.retrain_every).run(args.tickers, args.start, args.end,
+                                                                     args.train_end)
+    else:
+        from .backtest_hf import BacktestEngineHF
+        res = BacktestEngineHF(retrain_every=args.retrain_every).run(args.tickers, args.start, args.end,
+                                                                     args.train_end, freq=args.freq,
+                                                                     intraday=args.intraday)
+
+    print("📌 Portfolio signals:", signal_labels(res["portfolio_signals"]))
+    for ticker, df in res["barrier_results"].items():
+        print(f"\n📌 {ticker} barrier signals (last rows):\n",
+              df.tail(3).assign(signal=lambda d: signal_labels(d["signal"])))
+    print()
+    print_report(res)
+    if args.plot:
+        plot_portfolio_results(res)
+    return 0
+
+
+def _sweep(args):
+    from .sweep import run_sweep
+    table = run_sweep(args.tickers, args.start, args.end, json.loads(args.grid), initial_capital=args.capital,
+                      n_jobs=args.jobs)
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"Wrote {len(table)} rows to {args.out}")
+    else:
+        print(table.to_string(index=False))
+    return 0
+
+
+def _live(args):
+    if args.broker == "ibkr":
+        from .live_hf_ibkr import main
+    else:
+        from .live_hf_mt5 import main
+    main(spans_log=args.spans_log)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m " + (__package__ or "cli"), description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def market(p):
+        p.add_argument("--tickers", nargs="+", default=DEFAULT_TICKERS)
+        p.add_argument("--start", default="2020-01-01")
+        p.add_argument("--end", default="2024-01-01")
+
+    bt = sub.add_parser("backtest", help="run one engine and print its signals and report")
+    market(bt)
+    bt.add_argument("--engine", choices=["barrier", "ml", "hf"], default="barrier")
+    bt.add_argument("--train-end", help="last training date of the ML model (ml / hf engines)")
+    bt.add_argument("--retrain-every", type=int, help="walk-forward retraining every N dates instead")
+    bt.add_argument("--freq", default="1h", help="bar size of the hf engine")
+    bt.add_argument("--intraday", help="directory of <ticker>.csv / .parquet intraday bars or ticks (hf engine)")
+    bt.add_argument("--plot", action="store_true", help="plot portfolio vs benchmark")
+    bt.set_defaults(func=_backtest)
+
+    sw = sub.add_parser("sweep", help="run the barrier rules over a parameter grid")
+    market(sw)
+    sw.add_argument("--grid", required=True, help='JSON {parameter: [values]}, e.g. {"lookback_days": [63, 126]}')
+    sw.add_argument("--capital", type=float, default=100000)
+    sw.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    sw.add_argument("--out", help="CSV file for the results table (printed otherwise)")
+    sw.set_defaults(func=_sweep)
+
+    live = sub.add_parser("live", help="run a live trading loop (connects to the broker)")
+    live.add_argument("broker", choices=["ibkr", "mt5"])
+    live.add_argument("--spans-log", help="JSONL file of per-cycle / per-symbol timing spans")
+    live.set_defaults(func=_live)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "backtest" and args.engine != "barrier" and not (args.train_end or args.retrain_every):
+        parser.error(f"--engine {args.engine} needs --train-end or --retrain-every")
+    return args.func(args)
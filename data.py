@@ -0,0 +1,489 @@
+import os
+import re
+import json
+import shutil
+import pandas as pd
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick, Day, Week, MonthEnd, QuarterEnd, YearEnd
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+# Chaque téléchargement déborde de OVERLAP de part et d'autre pour recouper des séances
+# déjà en cache ; un écart au-delà de ADJUSTMENT_RTOL signale un ré-ajustement
+OVERLAP = pd.Timedelta(days=7)
+ADJUSTMENT_RTOL = 1e-5
+
+
+def _download(tickers, start_date, end_date):
+    import yfinance as yf  # importé à la demande : lent à charger, inutile hors téléchargement
+    return yf.download(
+        tickers,
+        start=start_date,
+        end=end_date,
+        auto_adjust=True,
+        group_by='ticker',
+        progress=False,
+        threads=True
+    )
+
+
+def _extract_field(raw, ticker, field):
+    """Colonne `field` d'un ticker dans la sortie de yf.download (None si absente)."""
+    if isinstance(raw.columns, pd.MultiIndex):
+        candidates = [(field, ticker), (ticker, field)]
+        if field == 'Close':
+            candidates += [('Adj Close', ticker), (ticker, 'Adj Close')]
+    else:
+        candidates = [field] + (['Adj Close'] if field == 'Close' else [])
+    for col in candidates:
+        if col in raw.columns:
+            return raw[col]
+    return None
+
+
+def _extract_ohlcv(raw, tickers):
+    """Découpe la sortie de yf.download en un DataFrame OHLCV par ticker."""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+    for ticker in tickers:
+        cols = {f: _extract_field(raw, ticker, f) for f in OHLCV_FIELDS}
+        if cols['Close'] is None:
+            continue
+        df = pd.DataFrame({f: c for f, c in cols.items() if c is not None}, columns=OHLCV_FIELDS)
+        df = df.dropna(how='all')
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+def _naive_index(index):
+    index = pd.DatetimeIndex(index)
+    return index.tz_convert(None) if index.tz is not None else index
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for s, e in sorted(ranges):
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return [tuple(r) for r in merged]
+
+
+class PriceCache:
+    """
+    Cache OHLCV local, un dossier par ticker :
+        dates.npy  (int64, ns, trié)
+        ohlcv.npy  (float64, n x 5 : Open, High, Low, Close, Volume)
+        ranges.json (intervalles [start, end) déjà téléchargés, en ns)
+    Les .npy sont ouverts en memory-map : charger un panel de milliers de tickers ne
+    re-parse rien, seules les lignes demandées sont lues.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _dir(self, ticker):
+        return os.path.join(self.cache_dir, ticker.replace(os.sep, "_"))
+
+    def ranges(self, ticker):
+        path = os.path.join(self._dir(ticker), "ranges.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(r) for r in json.load(f)]
+
+    def missing_ranges(self, ticker, start_date, end_date):
+        """Sous-intervalles de [start_date, end_date) absents du cache."""
+        start, end = pd.Timestamp(start_date).value, pd.Timestamp(end_date).value
+        missing, cursor = [], start
+        for s, e in self.ranges(ticker):
+            if e <= cursor or s >= end:
+                continue
+            if s > cursor:
+                missing.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < end:
+            missing.append((cursor, end))
+        return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in missing]
+
+    def clear(self, ticker):
+        """Supprime tout le cache d'un ticker (données et intervalles couverts)."""
+        shutil.rmtree(self._dir(ticker), ignore_errors=True)
+
+    def _arrays(self, ticker, mmap_mode='r'):
+        d = self._dir(ticker)
+        if not os.path.exists(os.path.join(d, "dates.npy")):
+            return np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_FIELDS)))
+        return (np.load(os.path.join(d, "dates.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(d, "ohlcv.npy"), mmap_mode=mmap_mode))
+
+    def load(self, ticker, start_date=None, end_date=None):
+        """OHLCV en cache sur [start_date, end_date), lu par memory-map."""
+        dates, values = self._arrays(ticker)
+        lo = 0 if start_date is None else np.searchsorted(dates, pd.Timestamp(start_date).value, 'left')
+        hi = len(dates) if end_date is None else np.searchsorted(dates, pd.Timestamp(end_date).value, 'left')
+        return pd.DataFrame(np.asarray(values[lo:hi]), index=pd.DatetimeIndex(np.asarray(dates[lo:hi])),
+                            columns=OHLCV_FIELDS)
+
+    def store(self, ticker, frame, start_date, end_date):
+        """Fusionne `frame` dans le cache et marque [start_date, end_date) comme couvert."""
+        d = self._dir(ticker)
+        os.makedirs(d, exist_ok=True)
+        old_dates, old_values = self._arrays(ticker, mmap_mode=None)
+        new_dates = _naive_index(frame.index).asi8
+        new_values = frame.reindex(columns=OHLCV_FIELDS).to_numpy(dtype=float)
+
+        keep = ~np.isin(old_dates, new_dates)
+        dates = np.concatenate([old_dates[keep], new_dates])
+        values = np.concatenate([old_values[keep], new_values])
+        order = np.argsort(dates, kind='stable')
+
+        for name, arr in (("dates.npy", dates[order]), ("ohlcv.npy", values[order])):
+            tmp = os.path.join(d, name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, os.path.join(d, name))
+
+        self.mark_covered(ticker, start_date, end_date)
+
+    def mark_covered(self, ticker, start_date, end_date):
+        """Marque [start_date, end_date) comme couvert, avec ou sans données (ticker vide sur la période)."""
+        if pd.Timestamp(end_date) <= pd.Timestamp(start_date):
+            return
+        d = self._dir(ticker)
+        os.makedirs(d, exist_ok=True)
+        ranges = self.ranges(ticker) + [(pd.Timestamp(start_date).value, pd.Timestamp(end_date).value)]
+        tmp = os.path.join(d, "ranges.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(_merge_ranges(ranges), f)
+        os.replace(tmp, os.path.join(d, "ranges.json"))
+
+
+def _adjustment_changed(cache, ticker, frame):
+    """
+    True si les clôtures re-téléchargées de séances déjà couvertes diffèrent du cache :
+    yfinance a ré-ajusté tout l'historique après un dividende ou un split.
+    """
+    dates = _naive_index(frame.index)
+    covered = np.zeros(len(dates), dtype=bool)
+    for s, e in cache.ranges(ticker):
+        covered |= (dates.asi8 >= s) & (dates.asi8 < e)
+    if not covered.any():
+        return False
+    new = pd.Series(frame['Close'].to_numpy(dtype=float)[covered], index=dates[covered])
+    cached = cache.load(ticker, new.index[0], new.index[-1] + pd.Timedelta(1, 'ns'))['Close']
+    new, cached = new.align(cached, join='inner')
+    both = np.isfinite(new.to_numpy()) & np.isfinite(cached.to_numpy())
+    return not np.allclose(new[both], cached[both], rtol=ADJUSTMENT_RTOL, atol=0)
+
+
+def _store(cache, ticker, frame, s, e, complete, log):
+    """Range dans le cache la partie [s, e) de `frame` ; seules les séances terminées sont couvertes."""
+    covered_end = min(e, complete)
+    if frame is not None:
+        dates = _naive_index(frame.index)
+        frame = frame[(dates >= s) & (dates < e)]
+    if frame is not None and not frame.empty:
+        cache.store(ticker, frame, s, covered_end)
+    else:
+        # Réponse vide mémorisée : pas de nouveau téléchargement à chaque appel
+        # (supprimer ranges.json du ticker pour forcer une nouvelle tentative)
+        log(f"⚠️ No data returned for {ticker} on {s.date()} → {e.date()}, recorded as empty.")
+        cache.mark_covered(ticker, s, covered_end)
+
+
+def fetch_ohlcv(tickers, start_date, end_date, cache_dir="price_cache", offline=False, log=print):
+    """
+    OHLCV par ticker via le cache local ; seuls les intervalles manquants sont téléchargés.
+
+    Les prix sont ajustés (auto_adjust) avec les facteurs du jour du téléchargement. Chaque
+    intervalle manquant est donc téléchargé avec OVERLAP de marge : si les séances déjà en
+    cache ont changé, tout le cache du ticker est re-téléchargé d'un bloc, sans quoi des
+    morceaux ajustés à des dates différentes seraient recollés avec des sauts.
+
+    Parameters:
+        tickers (list or str): Liste de tickers ou un ticker unique.
+        start_date (str): Date de début "YYYY-MM-DD".
+        end_date (str): Date de fin "YYYY-MM-DD" (exclue, comme yfinance).
+        cache_dir (str): dossier du cache.
+        offline (bool): ne jamais appeler yfinance, utiliser uniquement le cache.
+        log (callable): fonction pour logging (default=print).
+
+    Returns:
+        dict: {ticker: pd.DataFrame Open/High/Low/Close/Volume}
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    cache = PriceCache(cache_dir)
+
+    if not offline:
+        # Seules les séances terminées (avant aujourd'hui) sont marquées couvertes :
+        # la barre du jour, encore partielle, sera re-téléchargée au prochain appel
+        complete = pd.Timestamp.today().normalize()
+        # Regroupe les tickers qui manquent exactement le même intervalle → un seul yf.download
+        batches = {}
+        for ticker in tickers:
+            for s, e in cache.missing_ranges(ticker, start_date, end_date):
+                batches.setdefault((s, e), []).append(ticker)
+        stale = set()
+        for (s, e), batch in batches.items():
+            log(f"Fetching {s.date()} → {e.date()} for {len(batch)} tickers...")
+            frames = _extract_ohlcv(_download(batch, s - OVERLAP, e + OVERLAP), batch)
+            for ticker in batch:
+                if ticker in stale:
+                    continue
+                if ticker in frames and _adjustment_changed(cache, ticker, frames[ticker]):
+                    stale.add(ticker)
+                    continue
+                _store(cache, ticker, frames.get(ticker), s, e, complete, log)
+
+        # Tickers ré-ajustés : demande et cache existant re-téléchargés ensemble
+        refetch = {}
+        for ticker in stale:
+            ranges = cache.ranges(ticker)
+            span = (min(pd.Timestamp(start_date), pd.Timestamp(ranges[0][0])),
+                    max(pd.Timestamp(end_date), pd.Timestamp(ranges[-1][1])))
+            refetch.setdefault(span, []).append(ticker)
+        for (s, e), batch in refetch.items():
+            log(f"⚠️ Adjusted prices changed for {len(batch)} tickers (dividend or split), "
+                f"refetching {s.date()} → {e.date()}...")
+            frames = _extract_ohlcv(_download(batch, s, e), batch)
+            for ticker in batch:
+                cache.clear(ticker)
+                _store(cache, ticker, frames.get(ticker), s, e, complete, log)
+
+    return {t: cache.load(t, start_date, end_date) for t in tickers}
+
+
+def load_panel(tickers, start_date, end_date, cache_dir="price_cache", field="Close"):
+    """Panel (dates x tickers) d'un champ OHLCV, lu directement depuis le cache (hors ligne)."""
+    cache = PriceCache(cache_dir)
+    return pd.DataFrame({t: cache.load(t, start_date, end_date)[field] for t in tickers})
+
+
+def fetch_multiple_stocks(tickers, start_date, end_date, log=print, cache_dir=None, offline=False):
+    """
+    Télécharge les prix de clôture ajustés pour plusieurs tickers via yfinance.
+
+    Parameters:
+        tickers (list or str): Liste de tickers ou un ticker unique.
+        start_date (str): Date de début "YYYY-MM-DD".
+        end_date (str): Date de fin "YYYY-MM-DD".
+        log (callable): fonction pour logging (default=print).
+        cache_dir (str): si fourni, passe par le cache OHLCV local (voir fetch_ohlcv).
+        offline (bool): avec cache_dir, n'utilise que le cache.
+
+    Returns:
+        pd.DataFrame: DataFrame avec les colonnes des tickers et les prix ajustés.
+    """
+    if isinstance(tickers, str):
+        tickers = [tickers]
+
+    log(f"Fetching data for {len(tickers)} tickers...")
+
+    if cache_dir is not None:
+        frames = fetch_ohlcv(tickers, start_date, end_date, cache_dir=cache_dir, offline=offline, log=log)
+        closes = {t: f['Close'] for t, f in frames.items() if not f.empty}
+    else:
+        raw = _download(tickers, start_date, end_date)
+
+        if raw is None or raw.empty:
+            raise ValueError("No price data returned from yfinance.")
+
+        closes = {}
+        for ticker in tickers:
+            col = _extract_field(raw, ticker, 'Close')
+            if col is None:
+                log(f"⚠️ Close/Adj Close not found for {ticker}, skipping.")
+            else:
+                closes[ticker] = col
+
+    data = pd.DataFrame(closes)
+    data = data.dropna(axis=1, how='all').dropna(how='all')
+
+    if data.empty:
+        raise ValueError("No valid price columns found after processing.")
+
+    log(f"Data fetched successfully: {data.shape[0]} rows, {data.shape[1]} tickers.")
+    return data
+
+
+# -------------------- INTRADAY (fichiers locaux MT5 / IBKR) --------------------
+TIME_COLUMNS = ("time", "date", "datetime", "timestamp")
+VOLUME_COLUMNS = ("volume", "real_volume", "tick_volume", "size")
+_LEGACY_UNITS = {"H": "h", "T": "min", "S": "s", "L": "ms"}
+
+
+def bar_rule(freq):
+    """Alias pandas d'une fréquence, en acceptant les anciennes formes ("1H", "1T", "30S")."""
+    match = re.fullmatch(r"(\d*)([A-Za-z]+)", freq)
+    if match is None:
+        return freq
+    n, unit = match.groups()
+    return n + _LEGACY_UNITS.get(unit, unit)
+
+
+_PERIOD_OFFSETS = (Week, MonthEnd, QuarterEnd, YearEnd)
+
+
+def _bar_keys(index, rule):
+    """
+    Début de la barre de chaque horodatage : grille fixe pour les minutes, heures et jours
+    (Day n'est plus un Tick depuis pandas 3), période calendaire pour une semaine, un mois,
+    un trimestre ou une année ; toute autre fréquence est refusée plutôt que ramenée au jour.
+    """
+    offset = to_offset(rule)
+    if isinstance(offset, (Tick, Day)):
+        return index.floor(offset)
+    if isinstance(offset, _PERIOD_OFFSETS) and offset.n == 1:
+        return index.to_period(offset).start_time
+    raise ValueError(f"Unsupported bar frequency {rule!r}: use a fixed one ('5min', '1h', '1D', ...) "
+                     "or one week / month / quarter / year ('1W', 'W-FRI', 'ME', 'QE', 'YE').")
+
+
+def _raw_to_ohlcv(df):
+    """Colonnes brutes d'un export (barres ou ticks MT5/IBKR) -> Open/High/Low/Close/Volume indexé par le temps."""
+    df = df.rename(columns=str.lower)
+    time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+    if time_col is None:
+        raise ValueError(f"No time column ({', '.join(TIME_COLUMNS)}) in intraday file.")
+    times = df[time_col]
+    index = _naive_index(pd.to_datetime(times, unit="s") if pd.api.types.is_numeric_dtype(times)
+                         else pd.to_datetime(times))
+
+    if "close" in df.columns:
+        close = df["close"]
+        open_, high, low = (df[c] if c in df.columns else close for c in ("open", "high", "low"))
+    else:
+        # Ticks : dernier prix échangé, sinon milieu bid/ask (forex MT5 : last = 0)
+        mid = (df["bid"] + df["ask"]) / 2 if {"bid", "ask"} <= set(df.columns) else None
+        if "last" in df.columns:
+            close = df["last"].where(df["last"] > 0, mid) if mid is not None else df["last"]
+        elif "price" in df.columns:
+            close = df["price"]
+        elif mid is not None:
+            close = mid
+        else:
+            raise ValueError("No price column (close, last, price or bid/ask) in intraday file.")
+        open_ = high = low = close
+    vol_col = next((c for c in VOLUME_COLUMNS if c in df.columns), None)
+    volume = df[vol_col] if vol_col is not None else 0.0
+
+    out = pd.DataFrame({"Open": np.asarray(open_, dtype=float), "High": np.asarray(high, dtype=float),
+                        "Low": np.asarray(low, dtype=float), "Close": np.asarray(close, dtype=float),
+                        "Volume": np.asarray(volume, dtype=float) if vol_col is not None else 0.0},
+                       index=index)
+    return out[out["Close"].notna()]
+
+
+def _aggregate_bars(bars, rule):
+    """Agrège des barres/ticks en barres `rule` ; seules les barres contenant des données existent."""
+    g = bars.groupby(_bar_keys(bars.index, rule))
+    return pd.DataFrame({"Open": g["Open"].first(), "High": g["High"].max(), "Low": g["Low"].min(),
+                         "Close": g["Close"].last(), "Volume": g["Volume"].sum()})
+
+
+def _read_chunks(path, chunksize):
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            yield pd.read_parquet(path)
+            return
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def read_intraday(path, freq="1min", start_date=None, end_date=None, chunksize=500_000):
+    """
+    Lit un export CSV/Parquet de barres ou de ticks (MT5, IBKR) par blocs de `chunksize` lignes
+    et le ré-échantillonne en barres OHLCV `freq` au fil de l'eau : seul un bloc est en mémoire,
+    la dernière barre (incomplète) d'un bloc est fusionnée avec le suivant, et aucune barre n'est
+    créée hors séance (pas de calendrier complété par ffill).
+
+    Parameters:
+        path (str): fichier .csv ou .parquet (colonne time/date + close, ou last/price/bid-ask).
+        freq (str): fréquence cible ("1min", "5min", "1h", "1D" ; "1H"/"1T" acceptés).
+        start_date, end_date (str): fenêtre [start_date, end_date) optionnelle.
+        chunksize (int): lignes lues par bloc.
+
+    Returns:
+        pd.DataFrame: Open/High/Low/Close/Volume indexé par le début de chaque barre.
+    """
+    rule = bar_rule(freq)
+    start = pd.Timestamp(start_date) if start_date is not None else None
+    end = pd.Timestamp(end_date) if end_date is not None else None
+    done, carry = [], None
+    for chunk in _read_chunks(path, chunksize):
+        raw = _raw_to_ohlcv(chunk)
+        if start is not None:
+            raw = raw[raw.index >= start]
+        if end is not None:
+            raw = raw[raw.index < end]
+        if raw.empty:
+            continue
+        bars = _aggregate_bars(raw, rule)
+        if carry is not None:
+            if bars.index[0] == carry.index[0]:
+                first = bars.iloc[0].copy()
+                first["Open"] = carry["Open"].iloc[0]
+                first["High"] = max(first["High"], carry["High"].iloc[0])
+                first["Low"] = min(first["Low"], carry["Low"].iloc[0])
+                first["Volume"] += carry["Volume"].iloc[0]
+                bars.iloc[0] = first
+            else:
+                done.append(carry)
+        done.append(bars.iloc[:-1])
+        carry = bars.iloc[-1:]
+    if carry is not None:
+        done.append(carry)
+    if not done:
+        return pd.DataFrame(columns=OHLCV_FIELDS, index=pd.DatetimeIndex([]))
+    return pd.concat(done)
+
+
+def _intraday_sources(sources, tickers=None):
+    """{ticker: chemin} depuis un dict ou un dossier de fichiers <ticker>.csv / <ticker>.parquet."""
+    if isinstance(sources, dict):
+        paths = dict(sources)
+    else:
+        paths = {os.path.splitext(name)[0]: os.path.join(sources, name) for name in sorted(os.listdir(sources))
+                 if name.endswith((".csv", ".parquet"))}
+    if tickers is not None:
+        missing = [t for t in tickers if t not in paths]
+        if missing:
+            raise ValueError(f"No intraday file for {missing}.")
+        paths = {t: paths[t] for t in tickers}
+    return paths
+
+
+def load_intraday(sources, freq="1min", tickers=None, start_date=None, end_date=None, chunksize=500_000, log=print):
+    """
+    Barres OHLCV `freq` par ticker depuis des exports locaux (voir read_intraday).
+
+    Parameters:
+        sources (dict or str): {ticker: chemin} ou dossier de fichiers <ticker>.csv/.parquet.
+        tickers (list): sous-ensemble de tickers (tous par défaut).
+
+    Returns:
+        dict: {ticker: pd.DataFrame Open/High/Low/Close/Volume}
+    """
+    frames = {}
+    for ticker, path in _intraday_sources(sources, tickers).items():
+        frames[ticker] = read_intraday(path, freq, start_date, end_date, chunksize)
+        log(f"{ticker}: {len(frames[ticker])} bars {bar_rule(freq)} from {path}")
+    return frames
+
+
+def resample_closes(prices, freq):
+    """
+    Panel de clôtures ré-échantillonné à `freq` sans jamais sur-échantillonner : les barres
+    plus fines sont agrégées (dernière clôture), les barres plus grossières restent telles quelles.
+    """
+    return prices.groupby(_bar_keys(prices.index, bar_rule(freq))).last()
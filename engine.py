@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from functools import partial
+from .data import fetch_multiple_stocks
+from .signals import (calculate_barrier_panel, barrier_frame, ml_signal, combine_signals, ml_signal_series,
+                      combined_frame, portfolio_signals)
+from .volatility import VolatilityFeatures
+from .simulation import align_signal_panel, simulate_strategy
+from .ml_model import train_lightgbm, WalkForwardTrainer, predict_batched, prediction_panel
+from .results import ResultsStore, LazyFrames
+from .instrumentation import Instrumentation
+
+
+def volatility_blocks(wide, garch_vol=None):
+    """Volatility features of the daily engines: {name: callable -> wide frame}, evaluated one at a time."""
+    blocks = {
+        "realized_vol": lambda: VolatilityFeatures.realized_volatility(wide.pct_change()),
+        "parkinson_vol": lambda: VolatilityFeatures.parkinson_volatility(wide, wide),
+        "garman_klass_vol": lambda: VolatilityFeatures.garman_klass_volatility(wide, wide, wide, wide),
+    }
+    if garch_vol is not None:
+        blocks["garch_vol"] = lambda: garch_vol[wide.columns]
+    return blocks
+
+
+class EngineBase:
+    """
+    Stages shared by BacktestEngine, BacktestEngineML and BacktestEngineHF; each run() chains
+    them into a ResultsStore, one instrumentation span per stage.
+
+    initial_capital, transaction_cost: starting cash and cost per unit of traded value.
+    results_dtype: float dtype of stored results (np.float32 halves their memory).
+    memory_budget: bytes of results kept in RAM; beyond it arrays spill to memory-mapped
+    files in spill_dir (a temporary directory by default).
+    instrumentation: Instrumentation recording a span per stage (disabled by default);
+    the spans of each run are attached to results["spans"].
+    money_manager, sl_pct, tp_pct, allocator: how signals are traded, see
+    simulation.simulate_strategy (None = one unit per signal); the trades or target
+    weights are kept in results["trades"] / results["target_weights"].
+    barrier_model: signals.MonteCarloBarrier to simulate touch probabilities (None = closed form).
+
+    The daily engines (BacktestEngine, BacktestEngineML) also take:
+    garch_barriers: score the barriers with the GARCH volatility instead of the rolling one.
+    garch_stage: volatility.GarchStage used by every run of the engine (default: one with
+    no cache_dir), so its fit cache and warm starts carry over to later runs; pass
+    GarchStage(cache_dir=...) to keep them across processes.
+
+    The ML engines (BacktestEngineML, BacktestEngineHF) also take:
+    retrain_every: None = one model trained up to train_end_date; N = walk-forward
+    retraining every N dates, each segment predicted out-of-sample.
+    model_cache_dir: persist trained models and reuse them when features, parameters
+    and data window are unchanged.
+    predict_jobs: threads for the batched prediction pass.
+    """
+
+    def __init__(self, initial_capital=100000, transaction_cost=0.001, results_dtype=np.float64, memory_budget=None,
+                 spill_dir=None, instrumentation=None, money_manager=None, sl_pct=None, tp_pct=None,
+                 barrier_model=None, allocator=None):
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.results_dtype = results_dtype
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.money_manager = money_manager
+        self.sl_pct, self.tp_pct = sl_pct, tp_pct
+        self.barrier_model = barrier_model
+        self.allocator = allocator
+        self.results = {}
+
+    def _results(self):
+        return ResultsStore(self.results_dtype, self.memory_budget, self.spill_dir)
+
+    def _fetch(self, tickers, start_date, end_date, prices=None):
+        """Price panel (downloaded unless provided) and its returns."""
+        with self.instrumentation.span("fetch") as sp:
+            if prices is None:
+                prices = fetch_multiple_stocks(tickers, start_date, end_date)
+            returns = prices.pct_change().dropna()
+            sp["rows"] = len(prices)
+        return prices, returns
+
+    def _garch(self, prices, tickers):
+        """GARCH fitted for all tickers at once (parallel, warm-started, failures reported)."""
+        with self.instrumentation.span("garch", rows=len(prices)):
+            return self.garch_stage.fit(prices[tickers])
+
+    def _barriers(self, results, prices, tickers, **kwargs):
+        """results["barrier_panel"] (kwargs: calculate_barrier_panel parameters) and its per-ticker frames."""
+        with self.instrumentation.span("barriers", rows=len(prices)):
+            results["barrier_panel"] = calculate_barrier_panel(prices[tickers], model=self.barrier_model, **kwargs)
+            # Per-ticker frames are only built when accessed
+            return LazyFrames(tickers, partial(barrier_frame, results["barrier_panel"]))
+
+    def _volatility(self, results, prices, tickers, blocks):
+        """results["volatility_features"]: one wide block per feature, written into preallocated columns."""
+        with self.instrumentation.span("volatility", rows=len(prices)):
+            vol_features = results.allocate("volatility_features", prices.index,
+                                            pd.MultiIndex.from_product([list(blocks), tickers], names=["feature", "ticker"]))
+            for k, block in enumerate(blocks.values()):
+                vol_features[:, k * len(tickers):(k + 1) * len(tickers)] = block()
+
+    def _train(self, design, train_end_date, embargo, n_estimators=1000, lr=0.03):
+        """(model, out-of-sample predictions): walk-forward with retrain_every, else one model (no predictions)."""
+        with self.instrumentation.span("training", rows=len(design)):
+            if self.retrain_every:
+                model = WalkForwardTrainer(retrain_every=self.retrain_every, embargo=embargo,
+                                           initial_estimators=n_estimators, lr=lr, cache_dir=self.model_cache_dir)
+                return model, model.fit_predict(design, design.y)
+            model = train_lightgbm(design, design.y, train_end_date=train_end_date, n_estimators=n_estimators, lr=lr,
+                                   cache_dir=self.model_cache_dir)
+            return model, None
+
+    def _predict(self, results, design, model, oos_pred, tickers):
+        """results["ml_predictions"] from one batched pass over the design matrix, and the per-ticker ML signals."""
+        with self.instrumentation.span("inference", rows=len(design)):
+            pred = oos_pred if oos_pred is not None else predict_batched(model, design, n_jobs=self.predict_jobs)
+            results["ml_predictions"] = prediction_panel(pred, design).reindex(columns=tickers)
+            ml_pred = results["ml_predictions"]
+            return LazyFrames(tickers, lambda t: ml_signal_series(ml_pred[t]))
+
+    def _combine(self, results, tickers, returns):
+        """results["combined_signal_panel"], its per-ticker frames and the correlation-filtered latest signals."""
+        barrier_sig = results["barrier_panel"]["signal"]
+        ml_pred = results["ml_predictions"]
+        with self.instrumentation.span("portfolio_signals", rows=len(barrier_sig)):
+            # simple rule: if both agree, keep; else HOLD (also HOLD where there is no prediction)
+            ml_codes = ml_signal(ml_pred.reindex(barrier_sig.index).to_numpy())
+            results["combined_signal_panel"] = pd.DataFrame(combine_signals(barrier_sig.to_numpy(), ml_codes),
+                                                            index=barrier_sig.index, columns=tickers)
+            combined_signals = LazyFrames(tickers, lambda t: combined_frame(barrier_sig[t], ml_pred[t]))
+            return combined_signals, portfolio_signals(combined_signals, returns)
+
+    def _simulate(self, results, prices, tickers, signal_panel, bars=None, periods_per_year=252):
+        """simulation.simulate_strategy on dates 1.. of prices; returns those dates."""
+        with self.instrumentation.span("simulation", rows=len(prices) - 1):
+            dates = prices.index[1:]
+            codes = align_signal_panel(signal_panel, dates)
+            results.update(simulate_strategy(prices[tickers], codes, self.initial_capital, self.transaction_cost,
+                                             self.allocator, self.money_manager, self.sl_pct, self.tp_pct, bars,
+                                             periods_per_year))
+        return dates
+
+    def _finish(self, results, first_span, **entries):
+        results.update(entries)
+        results["spans"] = self.instrumentation.spans[first_span:]
+        self.results = results
+        return self.results
@@ -0,0 +1,158 @@
+import heapq
+import numpy as np
+import pandas as pd
+from .signals import BUY, SELL
+
+# Why a trade was closed
+EXIT_OPEN, EXIT_STOP, EXIT_TARGET, EXIT_SIGNAL = 0, 1, 2, 3
+EXIT_LABELS = np.array(["open", "stop_loss", "take_profit", "signal"], dtype=object)
+
+
+def next_signal(codes, code):
+    """(dates x tickers) index of the first date strictly after each date with signal `code` (len(codes) if none)."""
+    n = len(codes)
+    at = np.where(codes == code, np.arange(n)[:, None], n)
+    at = np.minimum.accumulate(at[::-1], axis=0)[::-1]  # first date >= t
+    return np.vstack([at[1:], np.full((1, codes.shape[1]), n)])
+
+
+def first_hit(high, low, entry, column, stop, target, last=None, direction=1, cells=1 << 22):
+    """
+    First-passage search: for each trade, the first bar after `entry` whose high/low range
+    reaches its stop or its target, looking no further than bar `last`.
+
+    high, low: (bars x tickers) arrays; entry, column, stop, target, last: one value per trade;
+    direction: +1 long (stop below, target above), -1 short, per trade or for all.
+    A bar reaching both levels counts as a stop (the intrabar order is unknown).
+    Returns (bar, reason): bar -1 and reason EXIT_OPEN when neither level is reached.
+
+    All unresolved trades are scanned together over a window of the next bars, gathered as
+    one (trades x window) block of about `cells` values; the window grows as trades resolve.
+    """
+    n = len(high)
+    entry = np.asarray(entry, dtype=np.int64)
+    column = np.asarray(column, dtype=np.int64)
+    stop = np.asarray(stop, dtype=float)
+    target = np.asarray(target, dtype=float)
+    last = np.full(len(entry), n - 1) if last is None else np.minimum(np.asarray(last, dtype=np.int64), n - 1)
+    long = np.broadcast_to(np.asarray(direction) > 0, entry.shape)
+
+    bar = np.full(len(entry), -1, dtype=np.int64)
+    reason = np.full(len(entry), EXIT_OPEN, dtype=np.int8)
+    start = entry + 1
+    pending = np.flatnonzero(start <= last)
+    while pending.size:
+        window = int(min(n, max(16, cells // pending.size)))
+        rows = start[pending, None] + np.arange(window)
+        valid = rows <= last[pending, None]
+        rows = np.minimum(rows, n - 1)
+        cols = column[pending, None]
+        h, lo = high[rows, cols], low[rows, cols]
+        lng = long[pending, None]
+        s, t = stop[pending, None], target[pending, None]
+        stop_hit = valid & np.where(lng, lo <= s, h >= s)
+        hit = stop_hit | (valid & np.where(lng, h >= t, lo <= t))
+
+        found = hit.any(axis=1)
+        k = hit.argmax(axis=1)[found]
+        done = pending[found]
+        bar[done] = start[done] + k
+        reason[done] = np.where(stop_hit[found, k], EXIT_STOP, EXIT_TARGET)
+        start[pending] += window
+        pending = pending[~found]
+        pending = pending[start[pending] <= last[pending]]
+    return bar, reason
+
+
+def _affordable(entry, cost, transaction_cost, exit_bar, proceeds, cash):
+    """Mask of the trades taken in order when each needs cash >= its cost (exit_bar -1: never closed)."""
+    taken = np.zeros(len(entry), dtype=bool)
+    exits = []  # (bar, proceeds) of the open trades taken
+    for i, (t, c, b, p) in enumerate(zip(entry.tolist(), cost.tolist(), exit_bar.tolist(), proceeds.tolist())):
+        while exits and exits[0][0] <= t:
+            cash += heapq.heappop(exits)[1]
+        if cash >= c:
+            taken[i] = True
+            cash -= c * (1 + transaction_cost)
+            if b >= 0:
+                heapq.heappush(exits, (b, p))
+    return taken
+
+
+def simulate_sl_tp(close, codes, money_manager, transaction_cost=0.0, initial_capital=None, high=None, low=None,
+                   open_=None, sl_pct=None, tp_pct=None, exit_on_sell=True):
+    """
+    Backtest execution with the live money-management rules: every BUY opens a long trade at
+    the close, sized by money_manager.calculate_lots with the levels of get_sl_tp, and closed
+    at the first bar whose range reaches the stop-loss or the take-profit (filled at the
+    level, or at the open when the bar gaps through it), or at the close of the next SELL
+    signal of its ticker (exit_on_sell). Without high/low, closes are used as the bar range:
+    a level is then only seen crossed by a close, and without open_ that close is the fill
+    when it is past the level.
+    As in simulate_unit_portfolio, a BUY is only taken when the cash left covers it
+    (lot x close), trades of a date in column order, after the exits of that date.
+
+    close (and high, low, open_): wide (dates x tickers) frames; codes: aligned signal codes.
+    Returns (equity per date, trades DataFrame).
+    """
+    tickers, dates = close.columns, close.index
+    close_v = close.to_numpy(dtype=float)
+    high_v = close_v if high is None else high.to_numpy(dtype=float)
+    low_v = close_v if low is None else low.to_numpy(dtype=float)
+    codes = np.asarray(codes)
+    initial_capital = money_manager.account_size if initial_capital is None else initial_capital
+
+    entry, column = np.nonzero((codes == BUY) & ~np.isnan(close_v))
+    entry_price = close_v[entry, column]
+    pct = {k: v for k, v in (("sl_pct", sl_pct), ("tp_pct", tp_pct)) if v is not None}
+    sl, tp = money_manager.get_sl_tp(entry_price, "BUY", **pct)
+    lot = money_manager.calculate_lots(entry_price, sl)
+
+    last = next_signal(codes, SELL)[entry, column] if exit_on_sell else np.full(len(entry), len(dates))
+    bar, reason = first_hit(high_v, low_v, entry, column, sl, tp, last)
+    by_signal = (reason == EXIT_OPEN) & (last < len(dates))
+    bar[by_signal] = last[by_signal]
+    reason[by_signal] = EXIT_SIGNAL
+
+    closed = bar >= 0
+    exit_price = np.full(len(entry), np.nan)
+    exit_price[by_signal] = close_v[bar[by_signal], column[by_signal]]
+    # Price the bar opened at, or closes when they are the only prices seen
+    if open_ is not None:
+        gap_v = open_.to_numpy(dtype=float)
+    else:
+        gap_v = close_v if high is None and low is None else None
+    for code, level, fill in ((EXIT_STOP, sl, np.fmin), (EXIT_TARGET, tp, np.fmax)):
+        m = reason == code
+        exit_price[m] = level[m] if gap_v is None else fill(level[m], gap_v[bar[m], column[m]])
+
+    # Cash check: candidate trades are in (date, column) order; exits free their proceeds first
+    taken = _affordable(entry, lot * entry_price, transaction_cost, np.where(closed, bar, -1),
+                        lot * exit_price * (1 - transaction_cost), initial_capital)
+    entry, column, entry_price, sl, tp, lot = entry[taken], column[taken], entry_price[taken], sl[taken], \
+        tp[taken], lot[taken]
+    bar, reason, closed, exit_price = bar[taken], reason[taken], closed[taken], exit_price[taken]
+
+    # Cash flows on entry / exit dates, units held in between, marked at the last close
+    flows = np.zeros(len(dates))
+    np.add.at(flows, entry, -lot * entry_price * (1 + transaction_cost))
+    np.add.at(flows, bar[closed], lot[closed] * exit_price[closed] * (1 - transaction_cost))
+    units = np.zeros(close_v.shape)
+    np.add.at(units, (entry, column), lot)
+    np.add.at(units, (bar[closed], column[closed]), -lot[closed])
+    marks = pd.DataFrame(close_v).ffill().fillna(0.0).to_numpy()
+    equity = initial_capital + np.cumsum(flows) + (np.cumsum(units, axis=0) * marks).sum(axis=1)
+
+    trades = pd.DataFrame({
+        "ticker": tickers[column],
+        "entry_date": dates[entry],
+        "entry_price": entry_price,
+        "lot": lot,
+        "sl": sl,
+        "tp": tp,
+        "exit_date": dates[np.where(closed, bar, 0)].where(closed),
+        "exit_price": exit_price,
+        "exit_reason": EXIT_LABELS[reason],
+        "pnl": lot * (exit_price * (1 - transaction_cost) - entry_price * (1 + transaction_cost)),
+    })
+    return equity, trades
@@ -0,0 +1,117 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # not available on Windows (MT5 hosts): peak RSS is then reported as NaN
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process so far, in MB (NaN where unsupported)."""
+    if resource is None:
+        return np.nan
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10  # bytes on macOS, KB elsewhere
+
+
+class Instrumentation:
+    """
+    Named spans around pipeline stages: wall time, CPU time, peak RSS and row counts.
+
+    Each finished span is a dict record (name, wall_ms, cpu_ms, rss_peak_mb, rss_growth_mb
+    plus any fields set inside the span, e.g. rows) appended to `self.spans` and passed to
+    every sink, so a callback or a structured log can consume them as they happen.
+    With enabled=False, span() yields a throwaway dict and records nothing.
+
+        ins = Instrumentation(sinks=[jsonl_sink("spans.jsonl")])
+        with ins.span("features") as sp:
+            X, y = compute_features(prices)
+            sp["rows"] = len(X)
+    """
+
+    def __init__(self, enabled=True, sinks=()):
+        self.enabled = enabled
+        self.sinks = list(sinks)
+        self.spans = []
+
+    @contextmanager
+    def _span(self, name, fields):
+        record = {"name": name, **fields}
+        rss = peak_rss_mb()
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["wall_ms"] = (time.perf_counter() - start) * 1000
+            record["cpu_ms"] = (time.process_time() - cpu) * 1000
+            record["rss_peak_mb"] = peak_rss_mb()
+            record["rss_growth_mb"] = record["rss_peak_mb"] - rss
+            self._emit(record)
+
+    def span(self, name, **fields):
+        if not self.enabled:
+            return _NullSpan()
+        return self._span(name, fields)
+
+    def record(self, name, wall_ms, **fields):
+        """Add an already-measured event (cheaper than a span in tight loops)."""
+        if self.enabled:
+            self._emit({"name": name, "wall_ms": wall_ms, **fields})
+
+    def _emit(self, record):
+        self.spans.append(record)
+        for sink in self.sinks:
+            sink(record)
+
+    def summary(self, spans=None):
+        """Per-span-name count, total and p50/p90/p99 wall ms, total CPU ms and max peak RSS."""
+        df = pd.DataFrame(self.spans if spans is None else spans)
+        if df.empty:
+            return df
+        for col in ("cpu_ms", "rss_peak_mb"):
+            if col not in df:
+                df[col] = np.nan
+        grouped = df.groupby("name", sort=False)
+        return pd.DataFrame({
+            "count": grouped.size(),
+            "wall_ms_total": grouped["wall_ms"].sum(),
+            "wall_ms_p50": grouped["wall_ms"].quantile(0.5),
+            "wall_ms_p90": grouped["wall_ms"].quantile(0.9),
+            "wall_ms_p99": grouped["wall_ms"].quantile(0.99),
+            "cpu_ms_total": grouped["cpu_ms"].sum(min_count=1),
+            "rss_peak_mb": grouped["rss_peak_mb"].max(),
+        })
+
+    def histogram(self, name, bins=20):
+        """(counts, bin_edges) of the wall ms of every span called `name`."""
+        values = [s["wall_ms"] for s in self.spans if s["name"] == name]
+        return np.histogram(values, bins=bins)
+
+
+class _NullSpan:
+    """Disabled span: a reusable no-op context manager."""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+def log_sink(log=print):
+    """Sink writing each span as one JSON line through `log` (print, logger.info, ...)."""
+    return lambda record: log(json.dumps(record, default=str))
+
+
+def jsonl_sink(path):
+    """Sink appending each span as one JSON line to `path`."""
+    def sink(record):
+        with open(path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+    return sink
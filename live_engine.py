@@ -0,0 +1,211 @@
+import time
+import numpy as np
+from .signals import (BUY, SELL, HOLD, SIGNAL_LABELS, BarrierSignalState, RollingCorrelation, ml_signal,
+                     filter_correlated_buys, signal_labels)
+from .instrumentation import Instrumentation
+from .scheduler import BarScheduler
+
+
+class LiveEngine:
+    """
+    Broker-agnostic live loop: barrier + ML signals, correlation filter, order execution.
+
+    Rules (shared by the former MT5 and IBKR scripts):
+      - barrier signal from a streaming BarrierSignalState per symbol;
+      - if a model is given, keep the signal only when it agrees with the ML direction;
+      - among BUYs correlated above `corr_threshold`, keep only the first (per group of
+        symbols sharing a timeframe, see schedule());
+      - BUY always opens `lot_size` (or the money-manager lot), SELL closes only if long.
+
+    With an enabled `instrumentation`, every cycle records "poll", "signals", "orders" and
+    "cycle" spans plus one "symbol:<name>" event per updated symbol, so the steps and symbols
+    eating into the bar interval show up in instrumentation.summary() / histogram().
+
+    run() evaluates each symbol on the close of its own bars (see scheduler.BarScheduler),
+    skipping symbols whose broker data has not changed since their last evaluation.
+    """
+
+    def __init__(self, broker, price_data, model=None, X=None, corr_threshold=0.8, corr_lookback=63,
+                 lot_size=1, money_manager=None, sl_pct=None, tp_pct=None, log=print, instrumentation=None):
+        self.broker = broker
+        self.symbols = broker.symbols
+        self.corr_threshold = corr_threshold
+        self.corr_lookback = corr_lookback
+        self.lot_size = lot_size
+        self.money_manager = money_manager
+        self.sl_pct, self.tp_pct = sl_pct, tp_pct
+        self.log = log
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+
+        self.barrier_state = {s: BarrierSignalState.from_history(price_data[s].dropna()) for s in self.symbols}
+        self.price_data = price_data
+        self._correlation_groups([self.symbols])
+        # X is not refreshed between cycles, so the ML direction per symbol is fixed
+        self.ml_signals = None
+        if model is not None:
+            last_rows = X.groupby(level=1).tail(1).droplevel(0).reindex(self.symbols)
+            self.ml_signals = dict(zip(self.symbols, ml_signal(model.predict(last_rows)).tolist()))
+
+        self.positions = {s: 0 for s in self.symbols}
+        self.orders = []
+        self.latency = {"tick_to_signal": [], "signal_to_order": []}
+        self.symbols_processed = 0
+        self.busy_sec = 0.0
+
+    def _correlation_groups(self, groups):
+        """
+        One trailing-window correlation matrix per group of symbols, updated only with bars
+        where the whole group is quoted: returns are taken between the group's full rows, so
+        partial polls (other timeframes, symbols without a quote yet) leave no NaN rows.
+        """
+        self.correlations = []
+        for symbols in groups:
+            history = self.price_data[list(symbols)].dropna()
+            self.correlations.append((list(symbols),
+                                      RollingCorrelation(symbols, self.corr_lookback, history.pct_change().iloc[1:]),
+                                      history.iloc[-1].to_dict() if len(history) else {}))
+
+    def _signals(self, prices):
+        for symbols, correlation, last in self.correlations:
+            if all(s in prices for s in symbols):
+                correlation.update([prices[s] / last[s] - 1 if s in last else np.nan for s in symbols])
+                last.update({s: prices[s] for s in symbols})
+
+        signals = {}
+        timed = self.instrumentation.enabled
+        for s in self.symbols:
+            if s in prices:
+                if timed:
+                    start = time.perf_counter()
+                    self.barrier_state[s].update(prices[s])
+                    self.instrumentation.record(f"symbol:{s}", (time.perf_counter() - start) * 1000)
+                else:
+                    self.barrier_state[s].update(prices[s])
+            barrier_signal = self.barrier_state[s].signal
+            if self.ml_signals is None:
+                signals[s] = barrier_signal
+            else:
+                signals[s] = barrier_signal if barrier_signal == self.ml_signals[s] else HOLD
+
+        # -------------------- Apply correlation filter --------------------
+        for symbols, correlation, _ in self.correlations:
+            if any(s in prices for s in symbols):
+                signals = filter_correlated_buys(signals, correlation.matrix(), symbols, self.corr_threshold)
+        return signals
+
+    def _orders(self, signals, prices):
+        orders = []
+        for s, sig in signals.items():
+            if s not in prices or sig not in (BUY, SELL):
+                continue
+            price = prices[s]
+            side = SIGNAL_LABELS[sig]  # brokers and the money manager take "BUY"/"SELL"
+            sl = tp = None
+            lot = self.lot_size
+            if self.money_manager is not None:
+                pct = {k: v for k, v in (("sl_pct", self.sl_pct), ("tp_pct", self.tp_pct)) if v is not None}
+                sl, tp = self.money_manager.get_sl_tp(price, side, **pct)
+                lot = self.money_manager.calculate_lot(price, sl)
+            if sig == BUY:
+                self.positions[s] += lot
+            elif self.positions[s] > 0:
+                self.positions[s] -= lot
+            else:
+                continue
+            orders.append({"symbol": s, "side": side, "volume": lot, "price": price, "sl": sl, "tp": tp})
+        return orders
+
+    def step(self, symbols=None):
+        """
+        One cycle over `symbols` (default all). Returns the filtered signal codes, {} when no
+        bar arrived, None when the feed ended.
+        """
+        ins = self.instrumentation
+        with ins.span("cycle") as cycle:
+            with ins.span("poll"):
+                prices = self.broker.poll(symbols)
+            t_tick = time.perf_counter()
+            if prices is None:
+                return None
+            cycle["rows"] = len(prices)
+            if not prices:
+                return {}
+            with ins.span("signals", rows=len(prices)):
+                signals = self._signals(prices)
+            t_signal = time.perf_counter()
+
+            with ins.span("orders") as sp:
+                orders = self._orders(signals, prices)
+                if orders:
+                    self.orders += self.broker.place_orders(orders)
+                sp["rows"] = len(orders)
+            t_order = time.perf_counter()
+
+        self.latency["tick_to_signal"].append((t_signal - t_tick) * 1000)
+        self.latency["signal_to_order"].append((t_order - t_signal) * 1000)
+        self.symbols_processed += len(prices)
+        self.busy_sec += t_order - t_tick
+        return signals
+
+    def _on_bar(self, symbols, bar_close):
+        signals = self.step(symbols)
+        if signals is not None:
+            self.log(bar_close, signal_labels({s: signals[s] for s in symbols if s in signals}))
+        return signals
+
+    def schedule(self, scheduler, timeframes="1min", offset=None):
+        """
+        Register the symbols on `scheduler`: `timeframes` is one bar size for all of them or
+        {bar size: [symbols]}, e.g. {"1min": fx, "5min": stocks, "1h": options}.
+        """
+        if isinstance(timeframes, str):
+            timeframes = {timeframes: self.symbols}
+        self._correlation_groups(timeframes.values())
+        for timeframe, symbols in timeframes.items():
+            scheduler.add(timeframe, symbols, timeframe, self._on_bar, stamp=self.broker.last_update,
+                          offset=offset)
+        return scheduler
+
+    def run(self, timeframes="1min", clock=None, lag_sec=1.0, until=None):
+        """
+        Evaluate the symbols on their bar closes until the feed ends or on Ctrl-C.
+        `lag_sec` waits after each close for the bar to reach the broker; `clock` defaults to
+        wall time (pass a scheduler.SimulatedClock with a clocked ReplayBroker to replay).
+        """
+        self.scheduler = self.schedule(BarScheduler(clock, lag_sec=lag_sec, instrumentation=self.instrumentation,
+                                                    log=self.log), timeframes)
+        try:
+            self.scheduler.run(until=until)
+        except KeyboardInterrupt:
+            self.log("Stopping live trading...")
+        finally:
+            self.broker.close()
+            self.log(self.scheduler.report())
+
+    def latency_report(self):
+        """Latency percentiles (ms) per stage and throughput in symbols per second of work."""
+        report = {}
+        for stage, values in self.latency.items():
+            values = np.asarray(values)
+            for q in (50, 90, 99):
+                report[f"{stage}_p{q}_ms"] = np.percentile(values, q) if len(values) else np.nan
+        report["cycles"] = len(self.latency["tick_to_signal"])
+        report["symbols_per_sec"] = self.symbols_processed / self.busy_sec if self.busy_sec else np.nan
+        return report
+
+    def latency_histograms(self, bins=20):
+        """{stage: (counts, bin_edges)} of the per-cycle latencies (ms)."""
+        return {stage: np.histogram(values, bins=bins) for stage, values in self.latency.items()}
+
+
+def replay_benchmark(prices, warmup=500, **engine_kwargs):
+    """
+    Stream `prices` (panel or {symbol: csv/parquet path}) through a ReplayBroker as fast as
+    possible and return LiveEngine.latency_report(). Needs no terminal or gateway.
+    """
+    from .brokers import ReplayBroker
+    broker = ReplayBroker(prices, warmup=warmup)
+    engine = LiveEngine(broker, broker.history(), log=lambda *a: None, **engine_kwargs)
+    while engine.step() is not None:
+        pass
+    return engine.latency_report()
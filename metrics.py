@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+METRICS = ("final_value", "total_return", "sharpe", "sortino", "max_drawdown", "max_drawdown_duration",
+           "hit_rate", "turnover", "exposure")
+
+
+def _columns(values):
+    """(dates x curves) float array of one curve (1-D) or many (2-D / DataFrame)."""
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def drawdowns(values):
+    """Drawdown from the running peak and periods since that peak, same shape as `values`."""
+    v = _columns(values)
+    running_max = np.fmax.accumulate(v, axis=0)
+    at_peak = v >= running_max
+    steps = np.arange(len(v))[:, None]
+    peak = np.maximum.accumulate(np.where(at_peak, steps, 0), axis=0)
+    shape = np.shape(values)
+    return (v / running_max - 1).reshape(shape), (steps - peak).reshape(shape)
+
+
+def periods_per_year(dates):
+    """Bars per calendar year of a DatetimeIndex, to annualise intraday or irregular series."""
+    years = (dates[-1] - dates[0]) / np.timedelta64(1, "D") / 365.25 if len(dates) > 1 else 0
+    return (len(dates) - 1) / years if years > 0 else 252
+
+
+def position_flows(positions, prices):
+    """
+    Gross invested value and traded value per date of a (dates x tickers) path of units held
+    (as returned by the simulators), marked at `prices`; the first date trades from flat.
+    """
+    positions = np.asarray(positions, dtype=float)
+    prices = np.nan_to_num(np.asarray(prices, dtype=float))
+    invested = (np.abs(positions) * prices).sum(axis=1)
+    traded = (np.abs(np.diff(positions, axis=0, prepend=0)) * prices).sum(axis=1)
+    return invested, traded
+
+
+def compute_metrics(values, initial_capital=None, invested=None, traded=None, periods_per_year=252):
+    """
+    Performance metrics of one equity curve, or of many at once.
+
+    values: 1-D curve, or (dates x curves) array / DataFrame (e.g. the curves of a sweep).
+    initial_capital: scalar or one per curve (default: the first value).
+    invested, traded: same shape as values, gross position value and traded value per date
+    (see position_flows); turnover and exposure are NaN without them.
+
+    - sharpe / sortino: annualised mean return over its standard / downside deviation;
+    - max_drawdown: deepest fall from a running peak; max_drawdown_duration: longest time
+      (periods) spent below a previous peak, including an unrecovered one;
+    - hit_rate: share of periods with a positive return among those with a non-zero one;
+    - turnover: traded value per year, as a multiple of the average equity;
+    - exposure: average share of equity invested.
+
+    Returns a dict for a 1-D curve, otherwise a DataFrame with one row per curve.
+    """
+    v = _columns(values)
+    capital = v[0] if initial_capital is None else np.broadcast_to(np.asarray(initial_capital, dtype=float), v.shape[1:])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rets = v[1:] / v[:-1] - 1
+        mean = rets.mean(axis=0)
+        std = rets.std(axis=0)
+        downside = np.sqrt((np.minimum(rets, 0) ** 2).mean(axis=0))
+        drawdown, duration = drawdowns(v)
+        out = {
+            "final_value": v[-1],
+            "total_return": v[-1] / capital - 1,
+            "sharpe": np.where(std > 0, np.sqrt(periods_per_year) * mean / std, np.nan),
+            "sortino": np.where(downside > 0, np.sqrt(periods_per_year) * mean / downside, np.nan),
+            "max_drawdown": drawdown.min(axis=0),
+            "max_drawdown_duration": duration.max(axis=0),
+            "hit_rate": (rets > 0).sum(axis=0) / (rets != 0).sum(axis=0),
+            "turnover": np.full(v.shape[1], np.nan) if traded is None else
+            _columns(traded).sum(axis=0) / v.mean(axis=0) * periods_per_year / max(1, len(v) - 1),
+            "exposure": np.full(v.shape[1], np.nan) if invested is None else (_columns(invested) / v).mean(axis=0),
+        }
+    if np.ndim(values) == 1:
+        return {k: out[k][0].item() for k in METRICS}
+    index = values.columns if isinstance(values, pd.DataFrame) else None
+    return pd.DataFrame(out, index=index, columns=list(METRICS))
@@ -1,36 +1,283 @@
+import os
+import pickle
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-import lightgbm as lgb
-
-def compute_features(price_data, benchmark_prices, horizon_days=30, clip=0.3):
-    feats_list = []
-    bench_ret = benchmark_prices.pct_change()
-    bench_var_63 = bench_ret.rolling(63).var()
-
-    for ticker in price_data.columns:
-        s = price_data[ticker].dropna()
-        if s.empty: continue
-        df = pd.DataFrame({
-            "ret_1": s.pct_change(),
-            "ret_5": s.pct_change(5),
-            "ma_20_div": s / s.rolling(20).mean() - 1,
-            "vol_21": s.pct_change().rolling(21).std(),
-        })
-        future_ret = s.shift(-horizon_days) / s - 1
-        df['target'] = future_ret.clip(-clip, clip)
-        df['ticker'] = ticker
-        feats_list.append(df)
-    big = pd.concat(feats_list).dropna()
-    big = big.set_index(['ticker'], append=True).sort_index()
-    return big.drop(columns=['target']), big['target']
-
-def train_lightgbm(X, y, train_end_date, recency_lambda=0.002):
-    idx_dates = X.index.get_level_values(0)
-    mask = idx_dates <= pd.Timestamp(train_end_date)
-    X_train, y_train = X[mask], y[mask]
-    tr_dates = X_train.index.get_level_values(0)
+
+
+# -------------------- FEATURES --------------------
+# Each feature maps a wide (dates x tickers) price frame to a wide frame of the same shape,
+# so a new rolling feature is one column-vectorized expression, with no per-ticker loop.
+def _ret_1(prices):
+    return prices.pct_change()
+
+
+def _ret_5(prices):
+    return prices.pct_change(5)
+
+
+def _ma_20_div(prices):
+    return prices / prices.rolling(20).mean() - 1
+
+
+def _vol_21(prices):
+    return prices.pct_change().rolling(21).std()
+
+
+FEATURES = {
+    "ret_1": _ret_1,
+    "ret_5": _ret_5,
+    "ma_20_div": _ma_20_div,
+    "vol_21": _vol_21,
+}
+
+
+def register_feature(name, func):
+    """Add a feature: func(wide_prices) -> wide DataFrame aligned on wide_prices."""
+    FEATURES[name] = func
+
+
+class DesignMatrix:
+    """
+    Contiguous (rows x features) matrix in (date, ticker) order, with integer index arrays
+    into `dates` / `tickers` instead of a MultiIndex.
+    """
+
+    def __init__(self, X, y, dates, tickers, date_idx, ticker_idx, feature_names, index_name=None):
+        self.X = X
+        self.y = y
+        self.dates = dates
+        self.tickers = tickers
+        self.date_idx = date_idx
+        self.ticker_idx = ticker_idx
+        self.feature_names = feature_names
+        self.index_name = index_name
+
+    def __len__(self):
+        return len(self.X)
+
+    def row_dates(self):
+        return self.dates[self.date_idx]
+
+    def index(self):
+        return pd.MultiIndex.from_arrays([self.dates[self.date_idx], self.tickers[self.ticker_idx]],
+                                         names=[self.index_name, 'ticker'])
+
+    def to_frame(self):
+        """(X, y) in the DataFrame / MultiIndex layout returned by compute_features."""
+        index = self.index()
+        return (pd.DataFrame(self.X, index=index, columns=self.feature_names),
+                pd.Series(self.y, index=index, name='target'))
+
+
+def _wide_features(prices, features, dtype):
+    """
+    Yield (name, C-contiguous `dtype` array) per feature, one feature alive at a time.
+    Columns with internal gaps are computed on their dropna() series, as per-ticker code would.
+    """
+    gappy = [k for k, t in enumerate(prices.columns)
+             if prices[t].loc[prices[t].first_valid_index():prices[t].last_valid_index()].isna().any()]
+    for name, func in features.items():
+        values = np.ascontiguousarray(func(prices).to_numpy(dtype=dtype))
+        for k in gappy:
+            s = prices.iloc[:, [k]].dropna()
+            values[:, k] = func(s).iloc[:, 0].reindex(prices.index).to_numpy(dtype=dtype)
+        yield name, values
+
+
+def build_design_matrix(price_data, horizon_days=30, clip=0.3, dtype=np.float64, features=None):
+    """
+    Panel-layout feature engine: every feature is computed as a wide array operation, then
+    valid (date, ticker) cells are gathered straight into one contiguous `dtype` matrix.
+    """
+    features = FEATURES if features is None else features
+    prices = price_data.reindex(columns=sorted(price_data.columns)).astype(float)
+    prices = prices.loc[:, prices.notna().any()]
+
+    def target(p):
+        return (p.shift(-horizon_days) / p - 1).clip(-clip, clip)
+
+    (_, y_wide), = _wide_features(prices, {"target": target}, dtype)
+    valid = ~np.isnan(y_wide)
+    wide = {}
+    for name, values in _wide_features(prices, features, dtype):
+        valid &= ~np.isnan(values)
+        wide[name] = values
+    flat = np.flatnonzero(valid.ravel())
+
+    names = list(wide)
+    X = np.empty((len(flat), len(names)), dtype=dtype)
+    for k, name in enumerate(names):
+        X[:, k] = wide.pop(name).ravel()[flat]  # release each wide array once gathered
+    y = y_wide.ravel()[flat]
+    n_tickers = prices.shape[1]
+    return DesignMatrix(X, y, prices.index, prices.columns,
+                        (flat // n_tickers).astype(np.int32), (flat % n_tickers).astype(np.int32),
+                        names, prices.index.name)
+
+
+def compute_features(price_data, benchmark_prices=None, horizon_days=30, clip=0.3, dtype=np.float64):
+    """
+    (X, y) with a (date, ticker) MultiIndex, built by build_design_matrix.
+    benchmark_prices is accepted for backward compatibility; no feature uses it.
+    """
+    return build_design_matrix(price_data, horizon_days, clip, dtype).to_frame()
+
+
+def _rows(X, y):
+    """(features frame without index, targets, row dates) of a DesignMatrix or a (date, ticker) frame."""
+    if isinstance(X, DesignMatrix):
+        return pd.DataFrame(X.X, columns=X.feature_names, copy=False), np.asarray(y), X.row_dates()
+    return (pd.DataFrame(X.to_numpy(), columns=X.columns, copy=False), np.asarray(y),
+            X.index.get_level_values(0))
+
+
+def _model_key(X, y, dates, params, parent=None):
+    """Hash of the feature set, parameters and training window (plus the model boosted from)."""
+    h = hashlib.sha1()
+    h.update(repr(list(X.columns)).encode())
+    h.update(repr(sorted(params.items())).encode())
+    h.update(np.asarray(dates.asi8).tobytes())
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=float)).tobytes())
+    h.update(np.ascontiguousarray(y, dtype=float).tobytes())
+    h.update(str(parent).encode())
+    return h.hexdigest()[:20]
+
+
+def train_lightgbm(X, y, train_end_date, recency_lambda=0.002, n_estimators=1000, lr=0.03,
+                   init_model=None, early_stopping_rounds=None, valid_fraction=0.2, cache_dir=None):
+    """
+    LightGBM regressor on rows dated <= train_end_date, with exponential recency weights.
+    X is a DesignMatrix (y = its targets) or a DataFrame with a (date, ticker) MultiIndex.
+
+    init_model: a previous model to continue boosting from instead of starting over.
+    early_stopping_rounds: stop on the last `valid_fraction` of training dates (time-ordered split).
+    cache_dir: persist the model keyed by features, parameters and data window, and reuse it
+    when nothing changed.
+    """
+    features, targets, dates = _rows(X, y)
+    mask = np.asarray(dates <= pd.Timestamp(train_end_date))
+    X_train, y_train, tr_dates = features[mask], targets[mask], dates[mask]
     age_days = (pd.Timestamp(train_end_date) - pd.to_datetime(tr_dates)).days
-    w = np.exp(-recency_lambda * age_days)
-    model = lgb.LGBMRegressor(n_estimators=1000, learning_rate=0.03)
-    model.fit(X_train, y_train, sample_weight=w)
+    w = np.exp(-recency_lambda * np.asarray(age_days, dtype=float))
+
+    params = {"n_estimators": n_estimators, "learning_rate": lr, "recency_lambda": recency_lambda,
+              "early_stopping_rounds": early_stopping_rounds, "valid_fraction": valid_fraction}
+    key = path = None
+    if cache_dir is not None:
+        key = _model_key(X_train, y_train, tr_dates, params, getattr(init_model, "cache_key", None))
+        path = os.path.join(cache_dir, f"lgbm_{key}.pkl")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return pickle.load(f)
+
+    import lightgbm as lgb
+    model = lgb.LGBMRegressor(n_estimators=n_estimators, learning_rate=lr, verbose=-1)
+    fit_kwargs = {"init_model": init_model.booster_ if init_model is not None else None}
+    if early_stopping_rounds:
+        # Time-ordered split: the most recent dates validate, older ones train
+        unique_dates = np.unique(tr_dates)
+        cutoff = unique_dates[int(len(unique_dates) * (1 - valid_fraction))]
+        fit_rows = np.asarray(tr_dates < cutoff)
+        model.fit(X_train[fit_rows], y_train[fit_rows], sample_weight=w[fit_rows],
+                  eval_set=[(X_train[~fit_rows], y_train[~fit_rows])], eval_sample_weight=[w[~fit_rows]],
+                  callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)], **fit_kwargs)
+    else:
+        model.fit(X_train, y_train, sample_weight=w, **fit_kwargs)
+
+    if cache_dir is not None:
+        model.cache_key = key
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(model, f)
     return model
+
+
+def predict_batched(model, X, chunk_size=250_000, n_jobs=1):
+    """
+    One inference pass over a whole design matrix (DataFrame, DesignMatrix or array).
+    Rows are predicted in chunks of `chunk_size` to bound memory; with n_jobs > 1 the
+    chunks run on threads (LightGBM releases the GIL while predicting).
+    """
+    values = X.X if isinstance(X, DesignMatrix) else X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+    bounds = [(i, min(i + chunk_size, len(values))) for i in range(0, len(values), chunk_size)]
+    # The raw booster skips the sklearn wrapper's per-call input validation
+    predict = model.booster_.predict if hasattr(model, "booster_") else model.predict
+    pred = np.empty(len(values))
+    if n_jobs is not None and n_jobs <= 1:
+        for lo, hi in bounds:
+            pred[lo:hi] = predict(values[lo:hi])
+        return pred
+    with ThreadPoolExecutor(n_jobs) as pool:
+        for (lo, hi), chunk in zip(bounds, pool.map(lambda b: predict(values[b[0]:b[1]]), bounds)):
+            pred[lo:hi] = chunk
+    return pred
+
+
+def prediction_panel(pred, index):
+    """
+    Scatter row predictions into a wide (dates x tickers) frame, NaN elsewhere. `index` is the
+    DesignMatrix predicted or a (date, ticker) MultiIndex; only dates and tickers with rows are kept.
+    """
+    if isinstance(index, DesignMatrix):
+        dates, tickers = np.unique(index.date_idx), np.unique(index.ticker_idx)
+        wide = np.full((len(index.dates), len(index.tickers)), np.nan)
+        wide[index.date_idx, index.ticker_idx] = pred
+        return pd.DataFrame(wide[np.ix_(dates, tickers)], index=index.dates[dates],
+                            columns=index.tickers[tickers].rename('ticker'))
+    wide = np.full((len(index.levels[0]), len(index.levels[1])), np.nan)
+    wide[index.codes[0], index.codes[1]] = pred
+    return pd.DataFrame(wide, index=index.levels[0], columns=index.levels[1])
+
+
+class WalkForwardTrainer:
+    """
+    Walk-forward LightGBM: every `retrain_every` dates the model is retrained on all rows
+    dated before the segment (minus an `embargo` of dates, e.g. the target horizon, so no
+    training target overlaps the segment) and predicts that segment only.
+
+    Each retrain continues boosting from the previous model with `n_estimators` extra trees
+    (the first one uses `initial_estimators`), and every step goes through train_lightgbm's
+    on-disk cache, so repeating a backtest only trains steps whose window changed.
+    """
+
+    def __init__(self, retrain_every=63, min_train_dates=252, embargo=0, initial_estimators=1000,
+                 n_estimators=100, lr=0.03, recency_lambda=0.002, early_stopping_rounds=None,
+                 valid_fraction=0.2, cache_dir=None):
+        self.retrain_every = retrain_every
+        self.min_train_dates = min_train_dates
+        self.embargo = embargo
+        self.initial_estimators = initial_estimators
+        self.n_estimators = n_estimators
+        self.lr = lr
+        self.recency_lambda = recency_lambda
+        self.early_stopping_rounds = early_stopping_rounds
+        self.valid_fraction = valid_fraction
+        self.cache_dir = cache_dir
+        self.models = []  # (first prediction date, model)
+
+    def fit_predict(self, X, y):
+        """
+        Out-of-sample predictions for every row of X (NaN before the first training window):
+        an array for a DesignMatrix (y = its targets), a Series on the index of a DataFrame.
+        """
+        features, _, dates = _rows(X, y)
+        unique_dates = np.unique(dates)
+        pred = np.full(len(X), np.nan)
+        model = None
+        self.models = []
+        for start in range(self.min_train_dates + self.embargo, len(unique_dates), self.retrain_every):
+            train_end = unique_dates[start - 1 - self.embargo]
+            model = train_lightgbm(X, y, train_end, recency_lambda=self.recency_lambda,
+                                   n_estimators=self.initial_estimators if model is None else self.n_estimators,
+                                   lr=self.lr, init_model=model,
+                                   early_stopping_rounds=self.early_stopping_rounds,
+                                   valid_fraction=self.valid_fraction, cache_dir=self.cache_dir)
+            self.models.append((unique_dates[start], model))
+            stop = unique_dates[min(start + self.retrain_every, len(unique_dates)) - 1]
+            rows = np.asarray((dates >= unique_dates[start]) & (dates <= stop))
+            pred[rows] = model.predict(features[rows])
+        if isinstance(X, DesignMatrix):
+            return pred
+        return pd.Series(pred, index=X.index, name="prediction")
@@ -1,4 +1,4 @@
-import pandas as pd
+import numpy as np
 
 class MoneyManager:
     def __init__(self, account_size=100000, risk_per_trade=0.01, default_lot=1):
@@ -21,6 +21,16 @@ class MoneyManager:
         lot = max(1, round(risk_amount / abs(price - stop_loss)))
         return lot
 
+    def calculate_lots(self, prices, stop_losses):
+        """
+        calculate_lot over arrays of prices and stop-losses (backtest execution).
+        """
+        risk_amount = self.account_size * self.risk_per_trade
+        distance = np.abs(np.asarray(prices, dtype=float) - np.asarray(stop_losses, dtype=float))
+        with np.errstate(divide="ignore"):
+            lots = np.maximum(1, np.round(risk_amount / distance))
+        return np.where((distance > 0) & ~np.isnan(distance), lots, self.default_lot)
+
     def get_sl_tp(self, price, direction, sl_pct=0.02, tp_pct=0.04):
         """
         Calculate Stop-Loss and Take-Profit prices.
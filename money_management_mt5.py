@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class MoneyManagerMT5:
     def __init__(self, account_size=100000, risk_per_trade=0.01, default_lot=0.1):
         self.account_size = account_size
@@ -11,6 +14,13 @@ class MoneyManagerMT5:
         lot = max(self.default_lot, round(risk_amount / abs(price - stop_loss), 2))
         return lot
 
+    def calculate_lots(self, prices, stop_losses):
+        risk_amount = self.account_size * self.risk_per_trade
+        distance = np.abs(np.asarray(prices, dtype=float) - np.asarray(stop_losses, dtype=float))
+        with np.errstate(divide="ignore"):
+            lots = np.maximum(self.default_lot, np.round(risk_amount / distance, 2))
+        return np.where((distance > 0) & ~np.isnan(distance), lots, self.default_lot)
+
     def get_sl_tp(self, price, direction, sl_pct=0.002, tp_pct=0.004):
         if direction == "BUY":
             sl = price * (1 - sl_pct)
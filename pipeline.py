@@ -0,0 +1,293 @@
+import hashlib
+from collections import Counter
+import numpy as np
+import pandas as pd
+from .data import fetch_multiple_stocks
+from .signals import (BUY, HOLD, calculate_barrier_panel, barrier_signal, ml_signal, combine_signals,
+                      correlation_matrix, filter_correlated_buys)
+from .volatility import GarchStage
+from .ml_model import build_design_matrix, train_lightgbm, WalkForwardTrainer, predict_batched, prediction_panel
+from .simulation import align_signal_panel, simulate_strategy, buy_and_hold_values
+from .metrics import compute_metrics
+from .engine import volatility_blocks
+from .instrumentation import Instrumentation
+
+# Parameters of a strategy variant; a variant overrides any of them
+DEFAULT_CONFIG = {
+    "strategy": "combined",  # "barrier", "ml" or "combined"
+    "lookback_days": 126,
+    "horizon_days": 30,
+    "sell_threshold": 0.7,
+    "buy_threshold": 0.3,
+    "barrier_model": None,
+    "garch_barriers": False,
+    "target_horizon": 30,
+    "target_clip": 0.3,
+    "train_end_date": None,
+    "retrain_every": None,
+    "ml_threshold": 0.0,
+    "corr_lookback": 63,
+    "corr_threshold": 0.8,
+    "initial_capital": 100000,
+    "transaction_cost": 0.001,
+    "allocator": None,
+}
+
+# Signal panels each strategy reads
+STRATEGY_INPUTS = {
+    "barrier": ("barrier_signals",),
+    "ml": ("ml_signals",),
+    "combined": ("barrier_signals", "ml_signals"),
+}
+
+
+def fingerprint(value):
+    """Stable key of a stage parameter: content hash for frames and arrays, identity for other objects."""
+    h = hashlib.sha1()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        h.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif value is None or isinstance(value, (str, int, float, bool, tuple, list, pd.Timestamp, np.generic)):
+        h.update(repr(value).encode())
+    else:
+        # Models, allocators: the same instance shares outputs (see StageGraph.get)
+        h.update(f"{type(value).__qualname__}@{id(value)}".encode())
+    return h.hexdigest()
+
+
+class StageGraph:
+    """
+    Pipeline stages as a dependency graph with memoized outputs.
+
+    A stage is func(**inputs, **params): its inputs are other stages (or a callable of the
+    config returning their names, for inputs that depend on a parameter) and its params the
+    config entries it reads. Its output is cached under a key made of its name, the values of
+    those params and the keys of its inputs, so asking for a stage computes only what is not
+    cached: a changed parameter invalidates the stages declaring it and everything downstream.
+    Roots (source()) are keyed by content. Every computed stage is a span of `instrumentation`
+    and is listed in `computed`; cache hits are counted per stage in `reused`.
+    """
+
+    def __init__(self, instrumentation=None):
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.stages = {}
+        self.sources = {}
+        self.cache = {}
+        self.computed = []
+        self.reused = Counter()
+        self._pinned = {}  # identity-keyed params, kept alive so their id cannot be reused
+
+    def stage(self, name, func, inputs=(), params=()):
+        self.stages[name] = (func, inputs, tuple(params))
+
+    def source(self, name, value):
+        """Set a root value (e.g. the price panel)."""
+        self.sources[name] = f"{name}:{fingerprint(value)}"
+        self.cache[self.sources[name]] = value
+
+    def inputs(self, name, config):
+        inputs = self.stages[name][1]
+        return tuple(inputs(config) if callable(inputs) else inputs)
+
+    def key(self, name, config):
+        if name in self.sources:
+            return self.sources[name]
+        h = hashlib.sha1(name.encode())
+        for p in self.stages[name][2]:
+            h.update(f"{p}={fingerprint(config[p])};".encode())
+        for dep in self.inputs(name, config):
+            h.update(self.key(dep, config).encode())
+        return f"{name}:{h.hexdigest()}"
+
+    def get(self, name, config):
+        key = self.key(name, config)
+        if key in self.cache:
+            if name not in self.sources:
+                self.reused[name] += 1
+            return self.cache[key]
+        func, _, params = self.stages[name]
+        inputs = {dep: self.get(dep, config) for dep in self.inputs(name, config)}
+        params = {p: config[p] for p in params}
+        with self.instrumentation.span(name):
+            value = func(**inputs, **params)
+        for v in params.values():
+            self._pinned[id(v)] = v
+        self.cache[key] = value
+        self.computed.append(name)
+        return value
+
+    def clear(self):
+        """Drop every cached output except the roots."""
+        self.cache = {k: v for k, v in self.cache.items() if k in self.sources.values()}
+        self._pinned = {}
+
+
+# -------------------- STAGES --------------------
+def _returns(prices):
+    return prices.pct_change().dropna()
+
+
+def _correlation(returns, tickers, corr_lookback):
+    return correlation_matrix(returns[tickers], corr_lookback)
+
+
+def _volatility(prices, garch, tickers):
+    blocks = volatility_blocks(prices[tickers], garch[0])
+    return pd.concat({name: block() for name, block in blocks.items()}, axis=1, names=["feature", "ticker"])
+
+
+def _barrier_probs(prices, tickers, lookback_days, horizon_days, barrier_model, garch_barriers, garch=None):
+    return calculate_barrier_panel(prices[tickers], lookback_days, horizon_days, model=barrier_model,
+                                   volatility=garch[0] if garch_barriers else None)
+
+
+def _barrier_signals(barrier_probs, sell_threshold, buy_threshold):
+    avg_prob = barrier_probs["avg_barrier_prob"]
+    return pd.DataFrame(barrier_signal(avg_prob.to_numpy(), sell_threshold, buy_threshold),
+                        index=avg_prob.index, columns=avg_prob.columns)
+
+
+def _features(prices, target_horizon, target_clip):
+    return build_design_matrix(prices, horizon_days=target_horizon, clip=target_clip)
+
+
+def _ml_signals(predictions, ml_threshold):
+    return pd.DataFrame(ml_signal(predictions.to_numpy(), ml_threshold),
+                        index=predictions.index, columns=predictions.columns)
+
+
+def _signals(strategy, barrier_signals=None, ml_signals=None):
+    if strategy == "barrier":
+        return barrier_signals
+    if strategy == "ml":
+        return ml_signals
+    # Barrier signal where the ML direction agrees (HOLD where there is no prediction)
+    ml_codes = ml_signals.reindex(barrier_signals.index).fillna(HOLD).to_numpy()
+    return pd.DataFrame(combine_signals(barrier_signals.to_numpy(), ml_codes),
+                        index=barrier_signals.index, columns=barrier_signals.columns)
+
+
+def _simulation(prices, signals, tickers, initial_capital, transaction_cost, allocator):
+    dates = prices.index[1:]
+    sim = simulate_strategy(prices[tickers], align_signal_panel(signals, dates), initial_capital, transaction_cost,
+                            allocator)
+    return pd.DataFrame({"portfolio_value": sim["portfolio_values"], "invested": sim["invested"],
+                         "traded": sim["traded"]}, index=dates)
+
+
+def _portfolio_signals(signals, correlation, tickers, corr_threshold):
+    latest = {t: int(c) for t, c in zip(tickers, signals.iloc[-1].to_numpy())} if len(signals) else {}
+    return filter_correlated_buys(latest, correlation, list(tickers), corr_threshold)
+
+
+class MultiStrategyRunner:
+    """
+    Many strategy variants on one price panel, sharing the stages they have in common:
+
+        prices ─→ returns ─→ correlation ──────────────────────────→ portfolio_signals
+               ├→ garch ─→ volatility                                ↑
+               ├→ barrier_probs ─→ barrier_signals ─┐                │
+               └→ features ─→ predictions ─→ ml_signals ─┴→ signals ─┴→ simulation
+
+    Each variant overrides DEFAULT_CONFIG (e.g. {"strategy": "barrier", "buy_threshold": 0.25}).
+    As stages only depend on the parameters they declare, variants differing in thresholds
+    share the barrier probabilities and the trained model, and barrier-only, ML-only and
+    combined variants share both. The cache lives on the runner: calling run() again after
+    changing a variant or the prices recomputes only the stages downstream of the change.
+    Any stage output of a variant is available through artifact().
+    """
+
+    def __init__(self, model_cache_dir=None, predict_jobs=1, instrumentation=None, garch_stage=None, **defaults):
+        """
+        defaults: overrides of DEFAULT_CONFIG applied to every variant (e.g. train_end_date).
+        garch_stage: volatility.GarchStage shared by every run (its fit cache and warm starts
+        carry over when the prices are extended); one without cache_dir by default.
+        """
+        self.model_cache_dir = model_cache_dir
+        self.garch_stage = garch_stage or GarchStage()
+        self.predict_jobs = predict_jobs
+        self.defaults = self._checked(defaults)
+        self.values = {}
+        g = self.graph = StageGraph(instrumentation)
+        g.stage("returns", _returns, ("prices",))
+        g.stage("correlation", _correlation, ("returns",), ("tickers", "corr_lookback"))
+        g.stage("garch", self._garch, ("prices",), ("tickers",))
+        g.stage("volatility", _volatility, ("prices", "garch"), ("tickers",))
+        g.stage("barrier_probs", _barrier_probs,
+                lambda c: ("prices", "garch") if c["garch_barriers"] else ("prices",),
+                ("tickers", "lookback_days", "horizon_days", "barrier_model", "garch_barriers"))
+        g.stage("barrier_signals", _barrier_signals, ("barrier_probs",), ("sell_threshold", "buy_threshold"))
+        g.stage("features", _features, ("prices",), ("target_horizon", "target_clip"))
+        g.stage("predictions", self._predictions, ("features",),
+                ("tickers", "train_end_date", "retrain_every", "target_horizon"))
+        g.stage("ml_signals", _ml_signals, ("predictions",), ("ml_threshold",))
+        g.stage("signals", _signals, lambda c: STRATEGY_INPUTS[c["strategy"]], ("strategy",))
+        g.stage("simulation", _simulation, ("prices", "signals"),
+                ("tickers", "initial_capital", "transaction_cost", "allocator"))
+        g.stage("portfolio_signals", _portfolio_signals, ("signals", "correlation"), ("tickers", "corr_threshold"))
+
+    @staticmethod
+    def _checked(overrides):
+        unknown = set(overrides) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"unknown parameters: {sorted(unknown)}")
+        if overrides.get("strategy", "barrier") not in STRATEGY_INPUTS:
+            raise ValueError(f"strategy must be one of {list(STRATEGY_INPUTS)}, got {overrides['strategy']!r}")
+        return dict(overrides)
+
+    def _garch(self, prices, tickers):
+        return self.garch_stage.fit(prices[tickers])
+
+    def _predictions(self, features, tickers, train_end_date, retrain_every, target_horizon):
+        if retrain_every:
+            trainer = WalkForwardTrainer(retrain_every=retrain_every, embargo=target_horizon,
+                                         cache_dir=self.model_cache_dir)
+            pred = trainer.fit_predict(features, features.y)
+        else:
+            if train_end_date is None:
+                raise ValueError("ML strategies need a train_end_date (or retrain_every)")
+            model = train_lightgbm(features, features.y, train_end_date=train_end_date, cache_dir=self.model_cache_dir)
+            pred = predict_batched(model, features, n_jobs=self.predict_jobs)
+        return prediction_panel(pred, features).reindex(columns=tickers)
+
+    def config(self, tickers, variant):
+        return {**DEFAULT_CONFIG, **self.defaults, **self._checked(variant), "tickers": list(tickers)}
+
+    def artifact(self, name, tickers, variant=None):
+        """Output of stage `name` for a variant (computed if not cached), e.g. "volatility"."""
+        return self.graph.get(name, self.config(tickers, variant or {}))
+
+    def run(self, tickers, variants, start_date=None, end_date=None, prices=None):
+        """
+        variants: {name: overrides} or a list of overrides (named variant_0, variant_1, ...).
+        Returns a DataFrame with one row per variant: its overrides, the number of BUYs left by
+        the correlation filter on the last date and its metrics (metrics.compute_metrics). The
+        portfolio values of each variant are kept in self.values[name].
+        """
+        if prices is None:
+            prices = fetch_multiple_stocks(tickers, start_date, end_date)
+        self.graph.source("prices", prices)
+        if not isinstance(variants, dict):
+            variants = {f"variant_{i}": v for i, v in enumerate(variants)}
+
+        rows, curves, capital = [], {}, []
+        for name, variant in variants.items():
+            config = self.config(tickers, variant)
+            curves[name] = self.graph.get("simulation", config)
+            latest = self.graph.get("portfolio_signals", config)
+            capital.append(config["initial_capital"])
+            rows.append({"variant": name, "strategy": config["strategy"], **variant,
+                         "latest_buys": sum(code == BUY for code in latest.values())})
+        self.values = {name: curve["portfolio_value"] for name, curve in curves.items()}
+
+        # Metrics of all variants in one batch over their (dates x variants) curves
+        def stacked(field):
+            return np.column_stack([curve[field].to_numpy() for curve in curves.values()])
+        metrics = compute_metrics(stacked("portfolio_value"), capital, stacked("invested"), stacked("traded"))
+        table = pd.concat([pd.DataFrame(rows).set_index("variant"), metrics.set_axis(list(curves))], axis=1)
+        benchmark = buy_and_hold_values(prices[tickers].to_numpy(dtype=float), 1.0)[-1]
+        table["benchmark_final_value"] = benchmark * np.asarray(capital, dtype=float)
+        return table
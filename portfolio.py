@@ -0,0 +1,210 @@
+import numpy as np
+from .signals import BUY, keep_uncorrelated_buys
+
+METHODS = ("min_variance", "mean_variance", "risk_parity")
+
+
+def project_simplex(v, mask):
+    """Euclidean projection of each row of `v` on {w >= 0, sum(w) = 1, w = 0 outside `mask`}."""
+    u = np.where(mask, v, -np.inf)
+    s = -np.sort(-u, axis=1)
+    finite = np.isfinite(s)
+    css = np.cumsum(np.where(finite, s, 0.0), axis=1) - 1
+    k = np.arange(1, v.shape[1] + 1)
+    rho = np.maximum(((s - css / k > 0) & finite).sum(axis=1), 1)
+    theta = css[np.arange(len(v)), rho - 1] / rho
+    return np.where(mask, np.maximum(v - theta[:, None], 0.0), 0.0)
+
+
+class WindowMoments:
+    """
+    Sums over a sliding window of return rows (NaN counted as missing), moved by adding the
+    rows entering and removing the rows leaving, with an exact recompute every `refresh` moves
+    to bound the drift. Besides the mean and covariance, the sums kept are exactly those the
+    Ledoit-Wolf shrinkage intensity needs, so it is available at every step too.
+    """
+
+    def __init__(self, n, refresh=252):
+        self.refresh = refresh
+        self.lo = self.hi = 0
+        self.moves = 0
+        self.count = np.zeros(n)
+        self.total = np.zeros(n)
+        self.cross = np.zeros((n, n))
+        self.sq_total = 0.0    # sum of |x|^2
+        self.sq_x = np.zeros(n)  # sum of |x|^2 x
+        self.quad = 0.0        # sum of |x|^4
+
+    def _add(self, x, valid, sign):
+        a = (x * x).sum(axis=1)
+        self.count += sign * valid.sum(axis=0)
+        self.total += sign * x.sum(axis=0)
+        self.cross += sign * (x.T @ x)
+        self.sq_total += sign * a.sum()
+        self.sq_x += sign * (a @ x)
+        self.quad += sign * (a @ a)
+
+    def move(self, x, valid, lo, hi):
+        """Slide the window to rows [lo, hi) of `x` (NaN already replaced by 0) / `valid`."""
+        self.moves += 1
+        if lo >= self.hi or self.moves % self.refresh == 0:
+            self.__init__(len(self.total), self.refresh)
+            self.moves = 1
+            self._add(x[lo:hi], valid[lo:hi], 1)
+        else:
+            self._add(x[self.hi:hi], valid[self.hi:hi], 1)
+            self._add(x[self.lo:lo], valid[self.lo:lo], -1)
+        self.lo, self.hi = lo, hi
+
+    def estimate(self):
+        """(mean, sample covariance, Ledoit-Wolf intensity, shrinkage target variance)."""
+        T = self.hi - self.lo
+        mean = self.total / T
+        cov = self.cross / T - np.outer(mean, mean)
+        n = len(mean)
+        target = np.trace(cov) / n
+        # sum_t |x_t - m|^4 expanded over the kept sums
+        c = mean @ mean
+        fourth = (self.quad + 4 * mean @ self.cross @ mean + T * c * c - 4 * mean @ self.sq_x
+                  + 2 * c * self.sq_total - 4 * c * mean @ self.total)
+        norm2 = (cov * cov).sum()
+        b2 = max(0.0, (fourth - T * norm2) / T ** 2)
+        d2 = norm2 - n * target ** 2
+        delta = min(1.0, b2 / d2) if d2 > 0 else 1.0
+        return mean, cov, delta, target
+
+
+class PortfolioOptimizer:
+    """
+    Target weights from the filtered signals and the return history, at every
+    `rebalance_every`-th date once `lookback` returns are available.
+
+    At each rebalance date, the BUY names with a full window go through the same greedy
+    correlation filter as portfolio_signals, and the survivors are weighted long-only
+    (weights sum to 1; nothing bought = all cash) by:
+      - "min_variance": minimum variance;
+      - "mean_variance": max  mean'w - risk_aversion / 2 * w'Cov w;
+      - "risk_parity": equal risk contributions w_i (Cov w)_i.
+    The covariance comes from window sums moved date to date (WindowMoments), shrunk
+    toward the average variance with the Ledoit-Wolf intensity ("ledoit_wolf") or a
+    fixed `shrinkage` in [0, 1].
+
+    Dates are solved `batch_size` at a time: their covariance sub-blocks are padded to a
+    common size and every iteration (projected accelerated gradient for the variance
+    objectives, a square-root fixed point for risk parity) runs on the whole batch, each
+    date warm-started from the weights of the previous batch.
+    """
+
+    def __init__(self, method="min_variance", lookback=63, rebalance_every=1, risk_aversion=3.0,
+                 shrinkage="ledoit_wolf", corr_threshold=0.8, batch_size=32, max_iter=1000, tol=1e-8):
+        if method not in METHODS:
+            raise ValueError(f"method must be one of {METHODS}, got {method!r}")
+        self.method = method
+        self.lookback = lookback
+        self.rebalance_every = rebalance_every
+        self.risk_aversion = risk_aversion
+        self.shrinkage = shrinkage
+        self.corr_threshold = corr_threshold
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.iterations = []  # iterations used per solved batch
+
+    def target_weights(self, returns, codes):
+        """
+        returns, codes: aligned (dates x tickers) arrays of returns and signal codes.
+        Returns (dates x tickers) weights: NaN rows between rebalance dates.
+        """
+        returns = np.asarray(returns, dtype=float)
+        codes = np.asarray(codes)
+        n_dates, n = returns.shape
+        valid = ~np.isnan(returns)
+        x = np.where(valid, returns, 0.0)
+        weights = np.full((n_dates, n), np.nan)
+        moments = WindowMoments(n, refresh=max(self.lookback, 252))
+        previous = np.zeros(n)
+        batch = []
+        for t in range(self.lookback - 1, n_dates, self.rebalance_every):
+            moments.move(x, valid, t + 1 - self.lookback, t + 1)
+            mean, cov, delta, target = moments.estimate()
+            if self.shrinkage != "ledoit_wolf":
+                delta = self.shrinkage
+            names = np.flatnonzero((codes[t] == BUY) & (moments.count == self.lookback))
+            if len(names) > 1 and self.corr_threshold is not None:
+                sub = cov[np.ix_(names, names)]
+                d = np.sqrt(np.diag(sub))
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    corr = np.nan_to_num(sub / np.outer(d, d))
+                names = names[keep_uncorrelated_buys(np.ones(len(names), dtype=bool), corr, self.corr_threshold)]
+            shrunk = (1 - delta) * cov[np.ix_(names, names)] + delta * target * np.eye(len(names))
+            batch.append((t, names, shrunk, mean[names]))
+            if len(batch) == self.batch_size:
+                previous = self._solve(batch, weights, previous)
+                batch = []
+        if batch:
+            self._solve(batch, weights, previous)
+        return weights
+
+    def _solve(self, batch, weights, previous):
+        """Solve a batch of dates together; writes their rows of `weights`, returns the last one."""
+        m = max(1, max(len(names) for _, names, _, _ in batch))
+        B = len(batch)
+        cov = np.zeros((B, m, m))
+        mu = np.zeros((B, m))
+        mask = np.zeros((B, m), dtype=bool)
+        w0 = np.zeros((B, m))
+        for b, (_, names, shrunk, mean) in enumerate(batch):
+            k = len(names)
+            cov[b, :k, :k] = shrunk
+            mu[b, :k] = mean
+            mask[b, :k] = True
+            start = previous[names]
+            w0[b, :k] = start / start.sum() if start.sum() > 0 else 1.0 / max(k, 1)
+
+        if self.method == "risk_parity":
+            w = self._risk_parity(cov, mask, w0)
+        else:
+            gamma = self.risk_aversion if self.method == "mean_variance" else 1.0
+            w = self._projected_gradient(gamma * cov, mu if self.method == "mean_variance" else 0 * mu, mask, w0)
+
+        n = weights.shape[1]
+        for b, (t, names, _, _) in enumerate(batch):
+            weights[t] = 0.0
+            weights[t, names] = w[b, :len(names)]
+        last = np.zeros(n)
+        last[batch[-1][1]] = w[-1, :len(batch[-1][1])]
+        return last
+
+    def _projected_gradient(self, Q, mu, mask, w):
+        """Accelerated projected gradient for min 1/2 w'Qw - mu'w on the masked simplex."""
+        step = 1 / np.maximum(np.abs(Q).sum(axis=2).max(axis=1), 1e-300)  # Gershgorin bound on the Lipschitz constant
+        z, t = w.copy(), np.ones(len(w))
+        for it in range(self.max_iter):
+            grad = (Q @ z[..., None])[..., 0] - mu
+            w_new = project_simplex(z - step[:, None] * grad, mask)
+            # Momentum restarted on the dates where it stopped pointing downhill
+            t[((z - w_new) * (w_new - w)).sum(axis=1) > 0] = 1.0
+            t_new = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            z = w_new + ((t - 1) / t_new)[:, None] * (w_new - w)
+            done = np.abs(w_new - w).max() < self.tol
+            w, t = w_new, t_new
+            if done:
+                break
+        self.iterations.append(it + 1)
+        return w
+
+    def _risk_parity(self, cov, mask, w):
+        """Fixed point y <- sqrt(y / (Cov y)) of y_i (Cov y)_i = 1, normalised to weights."""
+        y = np.where(mask, np.where(w > 0, w, 1.0 / np.maximum(mask.sum(axis=1, keepdims=True), 1)), 0.0)
+        w = y / np.maximum(y.sum(axis=1, keepdims=True), 1e-300)
+        for it in range(self.max_iter):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                y = np.where(mask, np.sqrt(y / (cov @ y[..., None])[..., 0]), 0.0)
+            y = np.nan_to_num(y)
+            w_new = y / np.maximum(y.sum(axis=1, keepdims=True), 1e-300)
+            done = np.abs(w_new - w).max() < self.tol
+            w = w_new
+            if done:
+                break
+        self.iterations.append(it + 1)
+        return w
@@ -0,0 +1,56 @@
+import numpy as np
+from .metrics import compute_metrics
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points of (x, y) that keep the shape of
+    the line (peaks and troughs survive), for plotting series far longer than the screen.
+    The endpoints are always kept, and so are the global maximum and minimum, which plain
+    LTTB can drop (e.g. the trough of the deepest drawdown).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets of interior points
+    cx, cy = (np.concatenate([[0.0], np.cumsum(np.nan_to_num(a))]) for a in (x, y))
+    width = np.diff(edges)
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / width
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / width
+    avg_x, avg_y = np.append(avg_x, x[-1]), np.append(avg_y, y[-1])
+
+    finite = np.flatnonzero(~np.isnan(y))
+    extremes = finite[[np.argmax(y[finite]), np.argmin(y[finite])]] if len(finite) else finite
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Point of the bucket making the largest triangle with the last kept point and the next bucket's mean
+        area = np.abs((x[a] - avg_x[b + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[b + 1] - y[a]))
+        area = np.nan_to_num(area, nan=-1.0)
+        forced = extremes[(extremes >= lo) & (extremes < hi)]
+        a = forced[np.argmax(area[forced - lo])] if len(forced) else lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+def plot_portfolio_results(results, max_points=2000):
+    """Portfolio vs benchmark, each line downsampled with LTTB to at most `max_points` points."""
+    import matplotlib.pyplot as plt
+    dates = results['dates']
+    x = np.asarray(dates, dtype="datetime64[ns]").astype(np.int64)
+    for key, label in (('portfolio_values', "Portfolio"), ('benchmark_values', "Benchmark")):
+        values = np.asarray(results[key], dtype=float)
+        keep = lttb(x, values, max_points)
+        plt.plot(dates[keep], values[keep], label=label)
+    plt.legend(); plt.show()
+
+def print_report(results, metrics=None):
+    """metrics: a compute_metrics dict (default: results["metrics"], or computed from the portfolio values)."""
+    if metrics is None:
+        metrics = results["metrics"] if "metrics" in results else compute_metrics(results['portfolio_values'])
+    print("Final Portfolio Value:", metrics['final_value'])
+    for k, v in metrics.items():
+        if k != "final_value":
+            print(f"{k.replace('_', ' ').title()}: {v}")
@@ -0,0 +1,203 @@
+import os
+import tempfile
+from collections.abc import Mapping, MutableMapping
+import numpy as np
+import pandas as pd
+
+
+class ResultsStore(MutableMapping):
+    """
+    Engine results kept as columnar numpy arrays behind a dict interface.
+
+    Arrays, numeric Series / DataFrames and dicts of them (panels) are stored as contiguous
+    arrays, floats cast to `dtype` (e.g. np.float32). Once the in-memory bytes would exceed
+    `memory_budget`, new arrays are written to .npy files in `spill_dir` (a temporary
+    directory by default) and read back memory-mapped, so they are only paged in when used.
+    Items are rebuilt lazily on access: 1-D arrays come back as arrays, frames as DataFrames
+    over the stored buffer. Anything else (models, reports, small dicts) is kept as is.
+    """
+
+    def __init__(self, dtype=np.float64, memory_budget=None, spill_dir=None):
+        self.dtype = np.dtype(dtype)
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.nbytes = 0
+        self.spilled = []
+        self._data = {}
+
+    # -------------------- storage --------------------
+    def _path(self, key, suffix=".npy"):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="results_")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        return os.path.join(self.spill_dir, key.replace("/", "__") + suffix)
+
+    def _over_budget(self, nbytes):
+        return self.memory_budget is not None and self.nbytes + nbytes > self.memory_budget
+
+    def _array(self, key, values):
+        values = np.asarray(values)
+        if values.dtype.kind == "f":
+            values = values.astype(self.dtype, copy=False)
+        if self._over_budget(values.nbytes):
+            path = self._path(key)
+            np.save(path, values)
+            self.spilled.append(key)
+            return np.load(path, mmap_mode="r")
+        self.nbytes += values.nbytes
+        return np.ascontiguousarray(values)
+
+    def allocate(self, key, index, columns=None, dtype=None):
+        """
+        Preallocate the array behind `key` (zero-filled, or a writable memmap when over budget)
+        and return it for the caller to fill; store[key] then reads it as a frame / array.
+        """
+        dtype = self.dtype if dtype is None else np.dtype(dtype)
+        shape = (len(index),) if columns is None else (len(index), len(columns))
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if self._over_budget(nbytes):
+            values = np.lib.format.open_memmap(self._path(key), mode="w+", dtype=dtype, shape=shape)
+            self.spilled.append(key)
+        else:
+            values = np.zeros(shape, dtype)
+            self.nbytes += nbytes
+        self._data[key] = ("frame" if columns is not None else "series", values, index, columns)
+        return values
+
+    def append(self, key, value):
+        """
+        Append rows (an array, Series, DataFrame or dict of frames) to `key`, for results
+        produced block by block. Once over budget, the rows of `key` move to a file in
+        spill_dir that keeps growing and that store[key] reads memory-mapped.
+        """
+        if isinstance(value, dict):
+            entry = self._data.setdefault(key, ("panel", {}, None, None))
+            for k, v in value.items():
+                entry[1][k] = self._append_rows(entry[1].get(k), f"{key}/{k}", v)
+        else:
+            self._data[key] = self._append_rows(self._data.get(key), key, value)
+
+    def _append_rows(self, entry, key, value):
+        if entry is None:
+            kind = "frame" if isinstance(value, pd.DataFrame) else "series" if isinstance(value, pd.Series) else "array"
+            label = value.columns if kind == "frame" else value.name if kind == "series" else None
+            values = np.asarray(value)
+            dtype = self.dtype if values.dtype.kind == "f" else values.dtype
+            entry = ("rows", _Rows(kind, label, dtype, values.shape[1:]), None, None)
+        rows = entry[1]
+        values = np.asarray(value.to_numpy() if isinstance(value, (pd.Series, pd.DataFrame)) else value,
+                            dtype=rows.dtype)
+        if rows.path is None and self._over_budget(values.nbytes):
+            self.nbytes -= rows.spill(self._path(key, ".bin"))
+            self.spilled.append(key)
+        if rows.path is None:
+            self.nbytes += values.nbytes
+        rows.add(values, None if rows.kind == "array" else value.index)
+        return entry
+
+    def _entry(self, key, value):
+        if isinstance(value, np.ndarray) and value.dtype.kind in "biuf":
+            return ("array", self._array(key, value), None, None)
+        if isinstance(value, pd.Series) and value.dtype.kind in "biuf":
+            return ("series", self._array(key, value.to_numpy()), value.index, value.name)
+        if isinstance(value, pd.DataFrame) and len(value.columns) and len(set(value.dtypes)) == 1 \
+                and value.dtypes.iloc[0].kind in "biuf":
+            return ("frame", self._array(key, value.to_numpy()), value.index, value.columns)
+        if isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+            return ("panel", {k: self._entry(f"{key}/{k}", v) for k, v in value.items()}, None, None)
+        return ("object", value, None, None)
+
+    @staticmethod
+    def _build(entry):
+        kind, values, index, columns = entry
+        if kind == "series":
+            return pd.Series(values, index=index, name=columns, copy=False)
+        if kind == "frame":
+            return pd.DataFrame(values, index=index, columns=columns, copy=False)
+        if kind == "panel":
+            return {k: ResultsStore._build(e) for k, e in values.items()}
+        if kind == "rows":
+            return values.build()
+        return values
+
+    # -------------------- mapping interface --------------------
+    def __setitem__(self, key, value):
+        self._data[key] = self._entry(key, value)
+
+    def __getitem__(self, key):
+        return self._build(self._data[key])
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Rows:
+    """Rows of one appended result: blocks kept in memory, or a raw file on disk once spilled."""
+
+    def __init__(self, kind, label, dtype, width):
+        self.kind, self.label, self.dtype, self.width = kind, label, dtype, width
+        self.blocks, self.index, self.path, self.rows = [], [], None, 0
+
+    def add(self, values, index):
+        if self.path is None:
+            self.blocks.append(np.ascontiguousarray(values))
+        else:
+            with open(self.path, "ab") as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+        if index is not None:
+            self.index.append(index)
+        self.rows += len(values)
+
+    def spill(self, path):
+        """Move the rows kept so far to `path`; returns the bytes released."""
+        self.path = path
+        with open(path, "wb") as f:
+            for block in self.blocks:
+                f.write(block.tobytes())
+        released = sum(block.nbytes for block in self.blocks)
+        self.blocks = []
+        return released
+
+    def values(self):
+        shape = (self.rows,) + self.width
+        if self.path is not None and self.rows:
+            return np.memmap(self.path, self.dtype, "r", shape=shape)
+        if len(self.blocks) > 1:
+            self.blocks = [np.concatenate(self.blocks)]
+        return self.blocks[0] if self.blocks else np.empty(shape, self.dtype)
+
+    def build(self):
+        values = self.values()
+        if self.kind == "array":
+            return values
+        if len(self.index) > 1:
+            self.index = [self.index[0].append(self.index[1:])]
+        index = self.index[0] if self.index else None
+        if self.kind == "series":
+            return pd.Series(values, index=index, name=self.label, copy=False)
+        return pd.DataFrame(values, index=index, columns=self.label, copy=False)
+
+
+class LazyFrames(Mapping):
+    """Read-only {key: frame} mapping whose frames are built by `build(key)` only when accessed."""
+
+    def __init__(self, keys, build):
+        self._keys = dict.fromkeys(keys)
+        self._build = build
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return self._build(key)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,200 @@
+import heapq
+import time
+import numpy as np
+import pandas as pd
+from .instrumentation import Instrumentation
+
+
+class WallClock:
+    """Real time in epoch seconds."""
+
+    def now(self):
+        return time.time()
+
+    def sleep_until(self, t):
+        while (remaining := t - time.time()) > 0:
+            time.sleep(remaining)
+
+
+class SimulatedClock:
+    """
+    Deterministic clock for tests and replays: sleeping jumps straight to the deadline,
+    and advance() stands in for the time a callback spends working.
+    """
+
+    def __init__(self, start=0.0):
+        self.t = start if isinstance(start, (int, float)) else pd.Timestamp(start).timestamp()
+
+    def now(self):
+        return self.t
+
+    def sleep_until(self, t):
+        self.t = max(self.t, t)
+
+    def advance(self, seconds):
+        self.t += seconds
+
+
+class _Job:
+    def __init__(self, name, symbols, period, offset, callback, stamp):
+        self.name = name
+        self.symbols = list(symbols)
+        self.period = period
+        self.offset = offset
+        self.callback = callback
+        self.stamp = stamp
+        self.seen = {}  # symbol -> stamp at the last evaluation
+        self.stats = {"fired": 0, "evaluated": 0, "skipped": 0, "symbols": 0, "overruns": 0,
+                      "missed_bars": 0, "errors": 0}
+        self.late_ms = []
+        self.busy_ms = []
+
+    def next_close(self, t):
+        """First bar close strictly after t."""
+        return (np.floor((t - self.offset) / self.period) + 1) * self.period + self.offset
+
+    def fresh(self):
+        """Symbols whose data changed since the last evaluation (all of them without a stamp)."""
+        if self.stamp is None:
+            return self.symbols
+        out = []
+        for s in self.symbols:
+            stamp = self.stamp(s)
+            if stamp is None or stamp != self.seen.get(s):
+                out.append(s)
+                self.seen[s] = stamp
+        return out
+
+
+class BarScheduler:
+    """
+    Fires callbacks on bar closes instead of sleeping a fixed interval after each cycle.
+
+    Each job is a set of symbols on one timeframe ("1min", "5min", "1h", ...); bars are
+    aligned to multiples of the timeframe since the epoch (UTC), so a 5-minute job fires at
+    :00, :05, ... whatever the previous cycle cost. Jobs with different timeframes share
+    one loop, and jobs due at the same close with the same callback are evaluated in a
+    single call on the union of their symbols.
+
+    `stamp(symbol)` (e.g. the broker's last bar / tick time) lets a job skip symbols with no
+    new data since their last evaluation; when none has any, the callback is not called.
+    callback(symbols, bar_close) returning None ends the job (feed over).
+
+    Per job, `report()` gives fired / evaluated / skipped counts, lateness (time between the
+    close and the start of the evaluation) and busy time percentiles, and the overruns:
+    evaluations still running at the job's next close, whose bars are then counted as missed.
+    With an enabled `instrumentation`, every evaluation is also recorded as a "bar:<job>" event.
+
+        clock = SimulatedClock("2024-01-02 09:30")
+        scheduler = BarScheduler(clock)
+        scheduler.add("fx", ["EURUSD"], "1min", on_bar)
+        scheduler.run(until="2024-01-02 16:00")
+    """
+
+    def __init__(self, clock=None, lag_sec=0.0, instrumentation=None, log=print):
+        self.clock = clock or WallClock()
+        self.lag_sec = lag_sec  # wait after the close for the bar to be published
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.log = log
+        self.jobs = {}
+        self._queue = []
+        self._seq = 0
+
+    def add(self, name, symbols, timeframe, callback, stamp=None, offset=None):
+        """Register a job; `offset` shifts the bar grid (e.g. "30min" for sessions opening at :30)."""
+        if name in self.jobs:
+            raise ValueError(f"Job {name!r} already scheduled")
+        period = pd.Timedelta(timeframe).total_seconds()
+        if period <= 0:
+            raise ValueError(f"Timeframe must be positive, got {timeframe!r}")
+        offset = pd.Timedelta(offset).total_seconds() if offset is not None else 0.0
+        job = _Job(name, symbols, period, offset, callback, stamp)
+        self.jobs[name] = job
+        self._push(job.next_close(self.clock.now() - self.lag_sec), job)
+        return job
+
+    def _push(self, close, job):
+        heapq.heappush(self._queue, (close, self._seq, job))
+        self._seq += 1
+
+    def _due(self):
+        """Pop every job due at the earliest close, grouped by callback in registration order."""
+        close, _, job = heapq.heappop(self._queue)
+        jobs = [job]
+        while self._queue and self._queue[0][0] == close:
+            jobs.append(heapq.heappop(self._queue)[2])
+        groups = {}
+        for job in jobs:
+            groups.setdefault(job.callback, []).append(job)
+        return close, list(groups.values())
+
+    def _evaluate(self, close, jobs):
+        start = self.clock.now()
+        late_ms = (start - close - self.lag_sec) * 1000
+        symbols = []
+        for job in jobs:
+            job.stats["fired"] += 1
+            job.late_ms.append(late_ms)
+            for s in job.fresh():
+                if s not in symbols:
+                    symbols.append(s)
+        if not symbols:
+            for job in jobs:
+                job.stats["skipped"] += 1
+            return True
+
+        result, error = True, False
+        try:
+            result = jobs[0].callback(symbols, pd.Timestamp(close, unit="s"))
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            self.log(f"Error in {'+'.join(j.name for j in jobs)}:", e)
+            error = True
+        end = self.clock.now()
+        busy_ms = (end - start) * 1000
+        for job in jobs:
+            job.stats["evaluated"] += 1
+            job.stats["symbols"] += sum(s in symbols for s in job.symbols)
+            job.stats["errors"] += error
+            job.busy_ms.append(busy_ms)
+            missed = int((end - self.lag_sec - close) // job.period)
+            if missed > 0:
+                job.stats["overruns"] += 1
+                job.stats["missed_bars"] += missed
+                self.log(f"Overrun: {job.name} bar {pd.Timestamp(close, unit='s')} took {busy_ms:.0f} ms, "
+                         f"{missed} bar(s) missed")
+            self.instrumentation.record(f"bar:{job.name}", busy_ms, late_ms=late_ms, rows=len(symbols),
+                                        overrun=missed > 0)
+        return result is not None
+
+    def run(self, until=None, max_bars=None):
+        """
+        Sleep until each close and evaluate the jobs due, until `until` (timestamp), `max_bars`
+        closes, or every job's feed has ended. Returns the number of closes processed.
+        """
+        until = None if until is None else pd.Timestamp(until).timestamp()
+        bars = 0
+        while self._queue and (max_bars is None or bars < max_bars):
+            if until is not None and self._queue[0][0] > until:
+                break
+            close, groups = self._due()
+            self.clock.sleep_until(close + self.lag_sec)
+            for jobs in groups:
+                if self._evaluate(close, jobs):
+                    for job in jobs:
+                        self._push(job.next_close(max(close, self.clock.now() - self.lag_sec)), job)
+            bars += 1
+        return bars
+
+    def report(self):
+        """One row per job: counts, overruns, missed bars and lateness / busy time percentiles (ms)."""
+        rows = {}
+        for name, job in self.jobs.items():
+            row = {"timeframe_sec": job.period, **job.stats}
+            for label, values in (("late", job.late_ms), ("busy", job.busy_ms)):
+                values = np.asarray(values)
+                for q in (50, 99):
+                    row[f"{label}_p{q}_ms"] = np.percentile(values, q) if len(values) else np.nan
+            rows[name] = row
+        return pd.DataFrame.from_dict(rows, orient="index")
@@ -1,71 +1,496 @@
+import math
+import zlib
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
-import itertools
-
-def calculate_barrier_metrics(prices, lookback_days=126, horizon_days=30):
-    metrics = []
-    for i in range(lookback_days, len(prices) - horizon_days):
-        current_price = prices.iloc[i]
-        hist = prices.iloc[i - lookback_days:i]
-        returns = np.log(hist / hist.shift(1)).dropna()
-        vol = returns.std() * np.sqrt(252) or 0.3
-        barrier_levels = [current_price * (1 - d) for d in [0.05, 0.10, 0.15]]
-        probs = []
-        for barrier in barrier_levels:
-            if current_price <= barrier:
-                prob = 1.0
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+BARRIER_DISTANCES = (0.05, 0.10, 0.15)
+BARRIER_COLUMNS = ['barrier_5pct', 'barrier_10pct', 'barrier_15pct']
+
+# Signals are int8 codes from generation to simulation; strings only at the display edge
+HOLD, BUY, SELL = 0, 1, -1
+SIGNAL_DTYPE = np.int8
+SIGNAL_LABELS = np.array(["HOLD", "BUY", "SELL"], dtype=object)  # indexed by code (SELL = -1)
+
+
+def signal_labels(codes):
+    """Signal codes to "BUY"/"SELL"/"HOLD" labels (scalar, array, Series or dict), for display only."""
+    if isinstance(codes, dict):
+        return {k: SIGNAL_LABELS[v] for k, v in codes.items()}
+    if isinstance(codes, pd.Series):
+        return pd.Series(SIGNAL_LABELS[codes.to_numpy(dtype=int)], index=codes.index, name=codes.name)
+    return SIGNAL_LABELS[codes]
+
+
+def calculate_barrier_panel(prices, lookback_days=126, horizon_days=30, sell_threshold=0.7, buy_threshold=0.3,
+                            model=None, volatility=None):
+    """
+    Barrier probabilities for a whole (dates x tickers) price matrix in one pass.
+
+    model: None = closed-form approximation; a MonteCarloBarrier to estimate touch
+    probabilities by simulation.
+    volatility: optional wide frame of daily volatility aligned on prices (e.g. the GARCH
+    conditional volatility of GarchStage.fit) used instead of the rolling estimate.
+
+    Returns a dict of wide DataFrames ('price', 'volatility', 'barrier_5pct',
+    'barrier_10pct', 'barrier_15pct', 'avg_barrier_prob', 'signal') covering the
+    same rows as calculate_barrier_metrics.
+    """
+    if isinstance(prices, pd.Series):
+        prices = prices.to_frame()
+    return barrier_rows(prices, lookback_days, len(prices) - horizon_days, lookback_days, horizon_days,
+                        sell_threshold, buy_threshold, model, volatility)
+
+
+def barrier_rows(prices, start, stop, lookback_days=126, horizon_days=30, sell_threshold=0.7, buy_threshold=0.3,
+                 model=None, volatility=None):
+    """
+    Barrier panel for rows [start, stop) of a wide price frame, each scored on the
+    `lookback_days` prices before it (which the frame must contain).
+    """
+    dates = prices.index[start:max(start, stop)]
+
+    if volatility is None:
+        # Rolling std of the lookback-1 log returns inside [i - lookback, i), O(1) per bar
+        log_ret = np.log(prices / prices.shift(1))
+        vol = log_ret.rolling(lookback_days - 1, min_periods=2).std().shift(1) * np.sqrt(252)
+    else:
+        vol = volatility.reindex(index=prices.index, columns=prices.columns) * np.sqrt(252)
+    vol = vol.iloc[start:max(start, stop)].to_numpy()
+    vol = np.where(vol == 0, 0.3, vol)
+
+    current = prices.iloc[start:max(start, stop)].to_numpy(dtype=float)
+    if model is not None:
+        probs = model.touch_probs(vol, horizon_days, prices.columns)
+    else:
+        from scipy.special import ndtr
+        scale = vol * np.sqrt(horizon_days / 252)
+        probs = np.empty((len(BARRIER_DISTANCES),) + current.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for k, d in enumerate(BARRIER_DISTANCES):
+                barrier = current * (1 - d)
+                distance = np.log(current / barrier)
+                probs[k] = np.where(current <= barrier, 1.0, ndtr(-distance / scale))
+    avg_prob = probs.mean(axis=0)
+
+    signal = barrier_signal(avg_prob, sell_threshold, buy_threshold)
+
+    def wide(values):
+        return pd.DataFrame(values, index=dates, columns=prices.columns)
+
+    panel = {'price': wide(current), 'volatility': wide(vol)}
+    for k, col in enumerate(BARRIER_COLUMNS):
+        panel[col] = wide(probs[k])
+    panel['avg_barrier_prob'] = wide(avg_prob)
+    panel['signal'] = wide(signal)
+    return panel
+
+
+class MonteCarloBarrier:
+    """
+    Touch probabilities of the BARRIER_DISTANCES barriers estimated by simulation.
+
+    Each ticker gets one seeded block of `n_paths` x (horizon x steps_per_day) shocks
+    (standard normal, or Student-t with `df` degrees of freedom scaled to unit variance),
+    shared by all its dates and barriers: for a date with volatility sigma, the log-price
+    path is sigma * W - sigma^2 / 2 * t over the shared cumulated shocks W. Between two
+    monitoring points a Brownian-bridge term exp(-2 (x0 - b)(x1 - b) / (sigma^2 dt)) adds
+    the probability of touching the barrier unobserved, so coarse steps are not biased low.
+    With the same paths, a probability only depends on the date through sigma: it is
+    evaluated on a fixed lattice of volatilities `grid_step` apart in log and interpolated
+    (grid_step=None evaluates every date). Volatilities are processed in chunks of about `cells`
+    path values, tickers over `n_jobs` threads.
+    Seeds derive from `seed` and the ticker name, so a ticker scores the same in any universe.
+    """
+
+    def __init__(self, n_paths=2000, steps_per_day=1, df=None, seed=0, grid_step=0.02, n_jobs=None, cells=1 << 22):
+        self.n_paths = n_paths
+        self.steps_per_day = steps_per_day
+        self.df = df
+        self.seed = seed
+        self.grid_step = grid_step
+        self.n_jobs = n_jobs
+        self.cells = cells
+
+    def _shocks(self, ticker, steps):
+        rng = np.random.default_rng([self.seed, zlib.crc32(str(ticker).encode())])
+        if self.df is None:
+            z = rng.standard_normal((self.n_paths, steps))
+        else:
+            z = rng.standard_t(self.df, (self.n_paths, steps)) * np.sqrt((self.df - 2) / self.df)
+        return np.hstack([np.zeros((self.n_paths, 1)), np.cumsum(z, axis=1)])
+
+    def _probs(self, sigmas, w, t, dt):
+        """(barriers x len(sigmas)) touch probabilities over the cumulated shocks `w`."""
+        levels = np.log(1 - np.asarray(BARRIER_DISTANCES))
+        probs = np.empty((len(levels), len(sigmas)))
+        chunk = max(1, self.cells // w.size)
+        for start in range(0, len(sigmas), chunk):
+            sigma = sigmas[start:start + chunk, None, None]
+            x = sigma * np.sqrt(dt) * w - 0.5 * sigma ** 2 * t
+            var = sigma ** 2 * dt
+            for k, level in enumerate(levels):
+                # A monitoring point at or below the barrier makes the crossing term exp(0) = 1
+                gap = np.maximum(x - level, 0.0)
+                cross = np.exp(-2 * gap[..., :-1] * gap[..., 1:] / var)
+                probs[k, start:start + chunk] = 1 - np.prod(1 - cross, axis=2).mean(axis=1)
+        return probs
+
+    def _ticker(self, vol, horizon_days, ticker):
+        steps = horizon_days * self.steps_per_day
+        dt = 1 / (252 * self.steps_per_day)
+        w = self._shocks(ticker, steps)
+        t = np.arange(steps + 1) * dt
+        probs = np.full((len(BARRIER_DISTANCES), len(vol)), np.nan)
+        valid = ~np.isnan(vol)
+        sigmas = vol[valid]
+        if self.grid_step is None:
+            probs[:, valid] = self._probs(sigmas, w, t, dt)
+        elif len(sigmas):
+            # Fixed lattice in log-volatility: the same nodes whatever the dates scored
+            lo, hi = np.floor(np.log(sigmas.min()) / self.grid_step), np.ceil(np.log(sigmas.max()) / self.grid_step)
+            log_nodes = np.arange(lo, hi + 1) * self.grid_step
+            node_probs = self._probs(np.exp(log_nodes), w, t, dt)
+            probs[:, valid] = [np.interp(np.log(sigmas), log_nodes, p) for p in node_probs]
+        return probs
+
+    def touch_probs(self, vol, horizon_days, tickers):
+        """(barriers x dates x tickers) touch probabilities for a (dates x tickers) annualised volatility."""
+        vol = np.asarray(vol, dtype=float)
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+            columns = list(pool.map(self._ticker, vol.T, [horizon_days] * len(tickers), tickers))
+        return np.stack(columns, axis=2) if columns else np.empty((len(BARRIER_DISTANCES),) + vol.shape)
+
+
+def barrier_signal(avg_prob, sell_threshold=0.7, buy_threshold=0.3):
+    """🔑 Trading signal code from the average barrier probability."""
+    return np.where(avg_prob > sell_threshold, SELL, np.where(avg_prob < buy_threshold, BUY, HOLD)).astype(SIGNAL_DTYPE)
+
+
+def ml_signal(pred, threshold=0.0):
+    """Direction from predicted returns: BUY above `threshold`, SELL otherwise, HOLD where no prediction."""
+    pred = np.asarray(pred, dtype=float)
+    return np.where(np.isnan(pred), HOLD, np.where(pred > threshold, BUY, SELL)).astype(SIGNAL_DTYPE)
+
+
+def combine_signals(barrier, ml):
+    """Keep the barrier signal where it agrees with the ML direction, HOLD otherwise (aligned arrays)."""
+    barrier = np.asarray(barrier, dtype=SIGNAL_DTYPE)
+    return np.where(barrier == np.asarray(ml), barrier, HOLD).astype(SIGNAL_DTYPE)
+
+
+def ml_signal_series(pred):
+    """ML signal codes for one ticker's prediction Series, on the dates that have a prediction."""
+    pred = pred.dropna()
+    return pd.Series(ml_signal(pred.to_numpy()), index=pred.index)
+
+
+def combined_frame(barrier, pred):
+    """One ticker's barrier signal combined with its ML direction, on the dates where both exist."""
+    pred = pred.reindex(barrier.index)
+    both = pred.notna().to_numpy()
+    ml_codes = ml_signal(pred.to_numpy()[both])
+    return pd.DataFrame({"signal": combine_signals(barrier.to_numpy()[both], ml_codes), "ml_signal": ml_codes},
+                        index=barrier.index[both])
+
+
+def barrier_frame(panel, ticker):
+    """One ticker's frame of a barrier panel, as produced by calculate_barrier_metrics."""
+    if panel['price'].empty:
+        return pd.DataFrame([])
+    df = pd.DataFrame({key: panel[key][ticker].to_numpy() for key in panel})
+    df.insert(0, 'date', panel['price'].index)
+    return df[['date', 'price', 'volatility'] + BARRIER_COLUMNS + ['avg_barrier_prob', 'signal']]
+
+
+def barrier_frames(panel):
+    """Split a barrier panel into the per-ticker frames produced by calculate_barrier_metrics."""
+    return {t: barrier_frame(panel, t) for t in panel['price'].columns}
+
+
+def calculate_barrier_metrics(prices, lookback_days=126, horizon_days=30, sell_threshold=0.7, buy_threshold=0.3):
+    name = prices.name if prices.name is not None else 0
+    panel = calculate_barrier_panel(prices.rename(name), lookback_days, horizon_days, sell_threshold, buy_threshold)
+    return barrier_frames(panel)[name]
+
+
+class BarrierSignalState:
+    """
+    Streaming version of calculate_barrier_metrics for one symbol.
+
+    update(price) scores the new bar against the previous `lookback_days` prices, exactly
+    like row i of the batch function, then pushes it into the window. The log-return
+    variance is kept with add/remove Welford updates, so each bar costs O(1); it is
+    recomputed exactly every `lookback_days` bars, and as soon as a removal cancels most of it.
+    """
+
+    def __init__(self, lookback_days=126, horizon_days=30, sell_threshold=0.7, buy_threshold=0.3):
+        self.lookback_days = lookback_days
+        self.horizon_days = horizon_days
+        self.sell_threshold = sell_threshold
+        self.buy_threshold = buy_threshold
+        self.prices = deque(maxlen=lookback_days)
+        self.returns = deque(maxlen=lookback_days - 1)
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.same_run = 0  # trailing run of identical returns, to detect a flat window exactly
+        self.stale = False
+        self.updates = 0
+        self.last = None
+
+    @classmethod
+    def from_history(cls, prices, **kwargs):
+        """Warm the state up on a price history (the last bar becomes the current one)."""
+        state = cls(**kwargs)
+        for p in np.asarray(prices, dtype=float):
+            state.update(p)
+        return state
+
+    def _add(self, x):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    def _remove(self, x):
+        self.n -= 1
+        if self.n == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        d = x - self.mean
+        self.mean -= d / self.n
+        before = self.m2
+        self.m2 -= d * (x - self.mean)
+        # Removing a return that carried most of the variance leaves mostly rounding error
+        self.stale = self.stale or self.m2 < 1e-4 * before
+
+    def _recompute(self):
+        self.stale = False
+        valid = [r for r in self.returns if r == r]
+        self.n = len(valid)
+        self.mean = sum(valid) / self.n if self.n else 0.0
+        self.m2 = sum((r - self.mean) ** 2 for r in valid)
+
+    def volatility(self):
+        if self.n < 2:
+            return np.nan
+        if self.same_run >= len(self.returns):
+            return 0.3
+        vol = np.sqrt(max(self.m2, 0.0) / (self.n - 1)) * np.sqrt(252)
+        return vol or 0.3
+
+    def update(self, price):
+        """Feed one bar; returns the barrier metrics for it (None while the window fills up)."""
+        price = float(price)
+        metrics = None
+        if len(self.prices) == self.lookback_days:
+            vol = self.volatility()
+            scale = vol * np.sqrt(self.horizon_days / 252)
+            probs = []
+            for d in BARRIER_DISTANCES:
+                barrier = price * (1 - d)
+                if price <= barrier:
+                    probs.append(1.0)
+                else:
+                    # Normal CDF through math.erfc: scalar, and no scipy import in the live loop
+                    probs.append(0.5 * math.erfc(math.log(price / barrier) / scale / math.sqrt(2)))
+            avg_prob = (probs[0] + probs[1] + probs[2]) / 3
+            metrics = {
+                'price': price,
+                'volatility': vol,
+                'barrier_5pct': probs[0],
+                'barrier_10pct': probs[1],
+                'barrier_15pct': probs[2],
+                'avg_barrier_prob': avg_prob,
+                'signal': barrier_signal(avg_prob, self.sell_threshold, self.buy_threshold).item(),
+            }
+
+        if self.prices:
+            r = np.log(price / self.prices[-1])
+            if len(self.returns) == self.returns.maxlen:
+                old = self.returns[0]
+                if old == old:
+                    self._remove(old)
+            self.same_run = self.same_run + 1 if self.returns and r == self.returns[-1] else 1
+            self.returns.append(r)
+            if r == r:
+                self._add(r)
+        self.prices.append(price)
+
+        # Periodic exact recompute bounds the drift of the add/remove updates
+        self.updates += 1
+        if self.stale or self.updates % self.lookback_days == 0:
+            self._recompute()
+        self.last = metrics
+        return metrics
+
+    @property
+    def signal(self):
+        return self.last['signal'] if self.last else HOLD
+
+
+def _pair_corr(x, y, lookback):
+    """Correlation over the last `lookback` rows where both series are present (0 if unavailable)."""
+    both = ~(np.isnan(x) | np.isnan(y))
+    if both.sum() <= lookback:
+        return 0.0
+    a, b = x[both][-lookback:], y[both][-lookback:]
+    a, b = a - a.mean(), b - b.mean()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (a @ b) / np.sqrt((a @ a) * (b @ b))
+    return corr if np.isfinite(corr) else 0.0
+
+
+def correlation_matrix(returns_data, lookback=63):
+    """
+    Matrix form of calculate_correlations: correlation of each pair over its last `lookback`
+    jointly available returns, 0 when there are not more than `lookback` of them.
+    Columns with no gap in the trailing window share a single covariance product;
+    only pairs involving a column with a recent gap are computed pairwise.
+    """
+    values = returns_data.to_numpy(dtype=float)
+    n = values.shape[1]
+    valid = ~np.isnan(values)
+    counts = valid.T.astype(np.float32) @ valid.astype(np.float32)
+    clean = valid[-lookback:].all(axis=0) if len(values) >= lookback else np.zeros(n, dtype=bool)
+
+    corr = np.zeros((n, n))
+    if clean.any():
+        tail = values[-lookback:, clean]
+        tail = tail - tail.mean(axis=0)
+        cov = tail.T @ tail
+        d = np.sqrt(np.diag(cov))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block = cov / np.outer(d, d)
+        corr[np.ix_(clean, clean)] = np.where(np.isfinite(block), block, 0.0)
+    for i in np.flatnonzero(~clean):
+        for j in range(n):
+            if j != i:
+                corr[i, j] = corr[j, i] = _pair_corr(values[:, i], values[:, j], lookback)
+    corr[counts <= lookback] = 0.0
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+class RollingCorrelation:
+    """
+    Correlation matrix over the last `lookback` return rows, updated in O(n^2) per new row
+    (rank-one add/remove of the cross-product sums) instead of recomputed from the window.
+
+    Rows with missing values switch to correlation_matrix() on `history`: the recent rows
+    trimmed only as far as every pair keeps its last lookback + 1 jointly present returns,
+    so the result equals correlation_matrix() on everything seen so far. `max_history` bounds
+    that trimmed history (a symbol without quotes for that long stops holding rows back).
+    """
+
+    def __init__(self, columns, lookback=63, history=None, max_history=None):
+        self.columns = list(columns)
+        self.lookback = lookback
+        self.buffer = deque(maxlen=lookback)
+        n = len(self.columns)
+        self.total = np.zeros(n)
+        self.cross = np.zeros((n, n))
+        self.history = deque()
+        self.max_history = max_history or 20 * lookback
+        self.joint = np.zeros((n, n), dtype=np.int64)  # jointly present returns per pair in `history`
+        self.seen = 0
+        self.gaps = 0  # rows with NaN currently in the buffer
+        self.updates = 0
+        if history is not None:
+            for row in history[self.columns].to_numpy(dtype=float):
+                self.update(row)
+
+    def _recompute(self):
+        rows = np.array([r for r in self.buffer if not np.isnan(r).any()]).reshape(-1, len(self.columns))
+        self.total = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+
+    def _trim(self):
+        """Drop the oldest history rows whose removal leaves every pair they cover above lookback."""
+        while len(self.history) > self.lookback:
+            present = ~np.isnan(self.history[0])
+            if len(self.history) <= self.max_history and \
+                    (self.joint[np.ix_(present, present)] <= self.lookback + 1).any():
+                break
+            self.joint -= np.outer(present, present)
+            self.history.popleft()
+
+    def update(self, row):
+        row = np.asarray(row, dtype=float)
+        if len(self.buffer) == self.lookback:
+            old = self.buffer[0]
+            if np.isnan(old).any():
+                self.gaps -= 1
             else:
-                distance = np.log(current_price / barrier)
-                prob = norm.cdf(-distance / (vol * np.sqrt(horizon_days / 252)))
-            probs.append(prob)
-        
-        avg_prob = np.mean(probs)
-
-        # 🔑 Generate trading signal
-        if avg_prob > 0.7:
-            signal = "SELL"
-        elif avg_prob < 0.3:
-            signal = "BUY"
+                self.total -= old
+                self.cross -= np.outer(old, old)
+        self.buffer.append(row)
+        if np.isnan(row).any():
+            self.gaps += 1
         else:
-            signal = "HOLD"
+            self.total += row
+            self.cross += np.outer(row, row)
+        present = ~np.isnan(row)
+        self.joint += np.outer(present, present)
+        self.history.append(row)
+        self._trim()
+        self.seen += 1
+        self.updates += 1
+        if self.updates % self.lookback == 0:
+            self._recompute()
+
+    def matrix(self, returns_data=None):
+        """Current correlation matrix; `returns_data` (full history) is only used when the window has gaps."""
+        if self.gaps or self.seen <= self.lookback:
+            if returns_data is None:
+                returns_data = pd.DataFrame(list(self.history), columns=self.columns)
+            return correlation_matrix(returns_data[self.columns], self.lookback)
+        k = self.lookback
+        mean = self.total / k
+        cov = self.cross / k - np.outer(mean, mean)
+        d = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(d, d)
+        corr = np.where(np.isfinite(corr), corr, 0.0)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+
+def keep_uncorrelated_buys(is_buy, corr, corr_threshold=0.8):
+    """
+    Greedy correlation filter on a matrix: scanning pairs in itertools.combinations order,
+    the second of two BUYs correlated above corr_threshold is dropped. Returns the kept-BUY mask.
+    """
+    keep = np.array(is_buy, dtype=bool)
+    for i in np.flatnonzero(keep):
+        if keep[i]:
+            keep[i + 1:] &= ~(corr[i, i + 1:] > corr_threshold)
+    return keep
+
 
-        metrics.append({
-            'date': prices.index[i],
-            'price': current_price,
-            'volatility': vol,
-            'barrier_5pct': probs[0],
-            'barrier_10pct': probs[1],
-            'barrier_15pct': probs[2],
-            'avg_barrier_prob': avg_prob,
-            'signal': signal
-        })
-    return pd.DataFrame(metrics)
+def filter_correlated_buys(signals, corr, columns, corr_threshold=0.8):
+    """Apply keep_uncorrelated_buys to a {column: signal} dict; dropped BUYs become HOLD."""
+    is_buy = np.array([signals.get(c) == BUY for c in columns])
+    keep = keep_uncorrelated_buys(is_buy, corr, corr_threshold)
+    signals = dict(signals)
+    for j in np.flatnonzero(is_buy & ~keep):
+        signals[columns[j]] = HOLD
+    return signals
 
 
 def calculate_correlations(returns_data, lookback=63):
-    correlations = {}
-    for s1, s2 in itertools.combinations(returns_data.columns, 2):
-        r = returns_data[[s1, s2]].dropna()
-        if len(r) > lookback:
-            corr = r[s1].rolling(lookback).corr(r[s2]).iloc[-1]
-            correlations[(s1, s2)] = corr if not np.isnan(corr) else 0
-        else:
-            correlations[(s1, s2)] = 0
-    return correlations
+    corr = correlation_matrix(returns_data, lookback)
+    iu, ju = np.triu_indices(len(returns_data.columns), k=1)
+    columns = list(returns_data.columns)
+    return {(columns[i], columns[j]): c for i, j, c in zip(iu.tolist(), ju.tolist(), corr[iu, ju].tolist())}
 
 
-def portfolio_signals(barrier_dfs, returns_data, lookback=63):
+def portfolio_signals(barrier_dfs, returns_data, lookback=63, corr_threshold=0.8):
     """
     Combine individual asset signals with correlation filter.
     """
-    correlations = calculate_correlations(returns_data, lookback)
-    latest_signals = {asset: df.iloc[-1]['signal'] for asset, df in barrier_dfs.items()}
-
-    # Apply correlation filter
-    for (a1, a2), corr in correlations.items():
-        if corr > 0.8 and latest_signals[a1] == latest_signals[a2] == "BUY":
-            # Too correlated → avoid doubling risk
-            latest_signals[a2] = "HOLD"
+    latest_signals = {asset: int(df.iloc[-1]['signal']) for asset, df in barrier_dfs.items()}
 
-    return latest_signals
+    # Apply correlation filter: too correlated → avoid doubling risk
+    corr = correlation_matrix(returns_data, lookback)
+    return filter_correlated_buys(latest_signals, corr, list(returns_data.columns), corr_threshold)
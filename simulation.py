@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+from .signals import HOLD, BUY, SELL, SIGNAL_DTYPE
+from .execution import simulate_sl_tp
+from .metrics import compute_metrics, position_flows
+
+SIGNAL_CODES = {"HOLD": HOLD, "BUY": BUY, "SELL": SELL}
+
+
+def encode_signals(signals):
+    """int8 codes for an array of signal codes, or of "BUY"/"SELL"/"HOLD" labels (anything else -> HOLD)."""
+    values = np.asarray(signals)
+    if values.dtype.kind in "iu":
+        return values.astype(SIGNAL_DTYPE, copy=False)
+    values = values.astype(object)
+    codes = np.zeros(values.shape, dtype=SIGNAL_DTYPE)
+    codes[values == "BUY"] = BUY
+    codes[values == "SELL"] = SELL
+    return codes
+
+
+def align_signals(signal_series, dates, tickers):
+    """
+    Align per-ticker signal Series (indexed by date) into one (dates x tickers) int8 array.
+    Dates missing for a ticker are HOLD.
+    """
+    dates = pd.Index(dates)
+    codes = np.zeros((len(dates), len(tickers)), dtype=np.int8)
+    for j, t in enumerate(tickers):
+        s = signal_series[t]
+        pos = dates.get_indexer(s.index)
+        found = pos >= 0
+        codes[pos[found], j] = encode_signals(s.to_numpy()[found])
+    return codes
+
+
+def align_signal_panel(signals, dates):
+    """Wide (dates x tickers) frame of signals to an int8 array on `dates` (missing dates are HOLD)."""
+    codes = np.zeros((len(dates), signals.shape[1]), dtype=np.int8)
+    pos = pd.Index(signals.index).get_indexer(dates)
+    found = pos >= 0
+    codes[found] = encode_signals(signals.to_numpy()[pos[found]])
+    return codes
+
+
+def buy_and_hold_values(prices, initial_capital):
+    """Equal-weight buy & hold benchmark on rows 1.. of a (dates x tickers) price array."""
+    prices = np.asarray(prices, dtype=float)
+    units = initial_capital / prices.shape[1] / prices[0]
+    return (units * prices[1:]).sum(axis=1)
+
+
+def _reflected_positions(start, steps):
+    """Closed form of x_t = max(0, x_{t-1} + d_t) for unit steps, starting from `start`."""
+    y = start + np.cumsum(steps, axis=0)
+    floor = np.minimum(np.minimum.accumulate(y, axis=0), 0)
+    return y - floor
+
+
+def _step(cash, positions, price, code, transaction_cost):
+    """One date of the unit-per-signal rules, tickers processed in column order."""
+    active = np.flatnonzero(code)
+    for j, c, p in zip(active.tolist(), code[active].tolist(), price[active].tolist()):
+        if c == BUY and cash >= p:
+            positions[j] += 1
+            cash -= p * (1 + transaction_cost)
+        elif c == SELL and positions[j] > 0:
+            positions[j] -= 1
+            cash += p * (1 - transaction_cost)
+    return cash
+
+
+def simulate_unit_portfolio(prices, codes, initial_capital, transaction_cost, block=1024, positions=None):
+    """
+    Buy/sell one unit per signal over NumPy arrays.
+
+    prices, codes: (dates x tickers) arrays, codes in {SELL, HOLD, BUY}.
+    positions: units held before the first date (none by default), with initial_capital
+    as the cash, so a run can be continued from the last row of a previous one.
+    Returns (portfolio_values, cash, positions) with one row per date.
+
+    Blocks of dates are solved in closed form (positions are a reflected cumulative
+    sum, cash a cumulative sum of trade flows) as long as cash cannot bind; the first
+    date where it might is stepped exactly, ticker by ticker, as in the original loop.
+    """
+    prices = np.asarray(prices, dtype=float)
+    codes = np.asarray(codes, dtype=np.int8)
+    n_dates, n_tickers = prices.shape
+    cash_path = np.empty(n_dates)
+    pos_path = np.zeros((n_dates, n_tickers), dtype=np.int64)
+
+    buy_price = np.where((codes == BUY) & ~np.isnan(prices), prices, 0.0)
+    buy_cost = buy_price * (1 + transaction_cost)
+    # Conservative per-date requirement: every buy succeeds whatever the ticker order
+    required = np.maximum(buy_price, buy_cost).sum(axis=1)
+    buy_flow = buy_cost.sum(axis=1)
+
+    cash = float(initial_capital)
+    positions = np.zeros(n_tickers, dtype=np.int64) if positions is None else np.array(positions, dtype=np.int64)
+    t, size = 0, block
+    while t < n_dates:
+        stop = min(n_dates, t + size)
+        steps = codes[t:stop].astype(np.int64)
+        steps[(codes[t:stop] == BUY) & np.isnan(prices[t:stop])] = 0
+        pos = _reflected_positions(positions, steps)
+        prev = np.vstack([positions, pos[:-1]])
+        sold = pos < prev
+        sell_flow = np.where(sold, prices[t:stop] * (1 - transaction_cost), 0.0).sum(axis=1)
+        cash_after = cash + np.cumsum(sell_flow - buy_flow[t:stop])
+        cash_before = np.concatenate([[cash], cash_after[:-1]])
+        binding = np.flatnonzero(~(cash_before >= required[t:stop]))
+
+        k = binding[0] if len(binding) else stop - t
+        if k > 0:
+            cash_path[t:t + k] = cash_after[:k]
+            pos_path[t:t + k] = pos[:k]
+            cash = cash_after[k - 1]
+            positions = pos[k - 1].copy()
+        t += k
+        if len(binding):
+            cash = _step(cash, positions, prices[t], codes[t], transaction_cost)
+            cash_path[t] = cash
+            pos_path[t] = positions
+            t += 1
+            size = max(1, size // 2)
+        else:
+            size = min(block, size * 2)
+
+    portfolio_values = cash_path + (pos_path * prices).sum(axis=1)
+    return portfolio_values, cash_path, pos_path
+
+
+def simulate_target_weights(prices, weights, initial_capital, transaction_cost):
+    """
+    Trade toward target weights.
+
+    prices, weights: (dates x tickers) arrays; a row of weights not all NaN is a rebalance:
+    holdings are set to weight * portfolio value / price (fractional units, the rest in
+    cash), paying transaction_cost on the traded value. Holdings are kept in between.
+    Returns (portfolio_values, cash, units) with one row per date.
+    """
+    prices = np.asarray(prices, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    n_dates, n_tickers = prices.shape
+    marks = pd.DataFrame(prices).ffill().fillna(0.0).to_numpy()
+    rebalance = np.flatnonzero(~np.isnan(weights).all(axis=1))
+
+    cash = float(initial_capital)
+    units = np.zeros(n_tickers)
+    cash_rows = np.empty(len(rebalance))
+    unit_rows = np.zeros((len(rebalance), n_tickers))
+    for k, t in enumerate(rebalance.tolist()):
+        price = marks[t]
+        value = cash + units @ price
+        target = np.where(price > 0, np.nan_to_num(weights[t]) * value / np.where(price > 0, price, 1.0), 0.0)
+        cash = value - target @ price - transaction_cost * (np.abs(target - units) @ price)
+        units = target
+        cash_rows[k], unit_rows[k] = cash, units
+
+    # Holdings of the last rebalance at or before each date
+    seg = np.searchsorted(rebalance, np.arange(n_dates), side="right") - 1
+    held = seg >= 0
+    cash_path = np.where(held, cash_rows[np.maximum(seg, 0)] if len(rebalance) else 0.0, float(initial_capital))
+    units_path = np.where(held[:, None], unit_rows[np.maximum(seg, 0)] if len(rebalance) else 0.0, 0.0)
+    portfolio_values = cash_path + (units_path * marks).sum(axis=1)
+    return portfolio_values, cash_path, units_path
+
+
+def simulate_strategy(prices, codes, initial_capital, transaction_cost, allocator=None, money_manager=None,
+                      sl_pct=None, tp_pct=None, bars=None, periods_per_year=252):
+    """
+    Simulation stage of the engines. prices: wide (dates x tickers) frame whose first date
+    only sets the benchmark entry; codes: signal codes aligned on dates 1.. (align_signal_panel).
+
+      - allocator (portfolio.PortfolioOptimizer): the signals become target weights at each
+        rebalance date, traded toward with simulate_target_weights; takes precedence;
+      - money_manager (MoneyManager / MoneyManagerMT5): lots sized with stop-loss and
+        take-profit exits as in the live loop (execution.simulate_sl_tp; sl_pct / tp_pct
+        override its defaults, `bars` = {"open_", "high", "low"} frames give the bar range);
+      - otherwise one unit per signal (simulate_unit_portfolio).
+
+    Returns a dict of results: portfolio_values, benchmark_values, metrics
+    (metrics.compute_metrics), invested / traded per date (not with a money_manager), and
+    target_weights or trades when used.
+    """
+    dates = prices.index[1:]
+    price_matrix = prices.to_numpy(dtype=float)
+    out = {}
+    units = None
+    if allocator is not None:
+        weights = allocator.target_weights(prices.pct_change().to_numpy()[1:], codes)
+        portfolio_values, _, units = simulate_target_weights(price_matrix[1:], weights, initial_capital,
+                                                             transaction_cost)
+        out["target_weights"] = pd.DataFrame(weights, index=dates, columns=prices.columns)
+    elif money_manager is None:
+        portfolio_values, _, units = simulate_unit_portfolio(price_matrix[1:], codes, initial_capital,
+                                                             transaction_cost)
+    else:
+        bars = {k: v[prices.columns].iloc[1:] for k, v in (bars or {}).items()}
+        portfolio_values, out["trades"] = simulate_sl_tp(prices.iloc[1:], codes, money_manager, transaction_cost,
+                                                         initial_capital, sl_pct=sl_pct, tp_pct=tp_pct, **bars)
+    flows = (None, None)
+    if units is not None:
+        flows = out["invested"], out["traded"] = position_flows(units, price_matrix[1:])
+    out["portfolio_values"] = portfolio_values
+    out["benchmark_values"] = buy_and_hold_values(price_matrix, initial_capital)
+    out["metrics"] = compute_metrics(portfolio_values, initial_capital, *flows, periods_per_year=periods_per_year)
+    return out
@@ -0,0 +1,120 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from .data import fetch_multiple_stocks
+from .signals import BUY, HOLD, calculate_barrier_panel, barrier_signal, correlation_matrix, keep_uncorrelated_buys
+from .simulation import simulate_unit_portfolio, buy_and_hold_values
+from .metrics import compute_metrics, position_flows
+
+DEFAULT_PARAMS = {
+    "lookback_days": 126,
+    "horizon_days": 30,
+    "sell_threshold": 0.7,
+    "buy_threshold": 0.3,
+    "corr_threshold": 0.8,
+    "transaction_cost": 0.001,
+}
+
+# Worker-side view of the shared price panel
+_PANEL = {}
+
+
+def expand_grid(param_grid):
+    """{"lookback_days": [63, 126], ...} -> list of full parameter dicts (defaults filled in)."""
+    keys = list(param_grid)
+    points = []
+    for values in itertools.product(*(param_grid[k] for k in keys)):
+        point = dict(DEFAULT_PARAMS)
+        point.update(zip(keys, values))
+        points.append(point)
+    return points
+
+
+def _attach(shm_name, shape, dtype, index, columns, corr):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _PANEL["shm"] = shm  # keep the mapping alive for the worker's lifetime
+    _PANEL["values"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _PANEL["index"] = index
+    _PANEL["columns"] = columns
+    _PANEL["corr"] = corr
+    _avg_barrier_prob.cache_clear()
+
+
+@lru_cache(maxsize=16)
+def _avg_barrier_prob(lookback_days, horizon_days):
+    """Barrier probabilities only depend on (lookback, horizon): computed once per worker."""
+    prices = pd.DataFrame(_PANEL["values"], index=_PANEL["index"], columns=_PANEL["columns"], copy=False)
+    return calculate_barrier_panel(prices, lookback_days, horizon_days)["avg_barrier_prob"].to_numpy()
+
+
+def _run_point(params, initial_capital):
+    values = _PANEL["values"]
+    avg_prob = _avg_barrier_prob(params["lookback_days"], params["horizon_days"])
+
+    codes = np.full((len(values) - 1, values.shape[1]), HOLD, dtype=np.int8)
+    start = params["lookback_days"] - 1  # panel row k is price row lookback + k, i.e. simulation row lookback + k - 1
+    codes[start:start + len(avg_prob)] = barrier_signal(avg_prob, params["sell_threshold"], params["buy_threshold"])
+    portfolio_values, _, positions = simulate_unit_portfolio(values[1:], codes, initial_capital,
+                                                             params["transaction_cost"])
+
+    # Latest signals after the portfolio_signals correlation filter
+    last_row = codes[start + len(avg_prob) - 1] if len(avg_prob) else codes[0]
+    is_buy = keep_uncorrelated_buys(last_row == BUY, _PANEL["corr"], params["corr_threshold"])
+
+    return {
+        **params,
+        **compute_metrics(portfolio_values, initial_capital, *position_flows(positions, values[1:])),
+        "n_trades": int(np.abs(np.diff(positions, axis=0, prepend=0)).sum()),
+        "latest_buys": int(is_buy.sum()),
+    }
+
+
+def _run_chunk(points, initial_capital):
+    return [_run_point(p, initial_capital) for p in points]
+
+
+def run_sweep(tickers, start_date, end_date, param_grid, initial_capital=100000, n_jobs=None, prices=None):
+    """
+    Run the BacktestEngine rules over every point of `param_grid` on one price panel.
+
+    The panel is fetched once and placed in shared memory; workers map it without
+    pickling. Points are grouped by (lookback_days, horizon_days) so each worker
+    computes the barrier probabilities once per group and only re-thresholds and
+    re-simulates per point. Volatility features are not computed: they do not feed
+    the simulation.
+
+    Returns a DataFrame with one row per grid point: parameters, final value and metrics.
+    """
+    if prices is None:
+        prices = fetch_multiple_stocks(tickers, start_date, end_date)
+    prices = prices[tickers]
+    values = np.ascontiguousarray(prices.to_numpy(dtype=float))
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    points = expand_grid(param_grid)
+    groups = {}
+    for p in points:
+        groups.setdefault((p["lookback_days"], p["horizon_days"]), []).append(p)
+    # Split groups so every worker gets work even when the grid has a single (lookback, horizon)
+    size = max(1, -(-len(points) // n_jobs))
+    chunks = [group[i:i + size] for group in groups.values() for i in range(0, len(group), size)]
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+    try:
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        corr = correlation_matrix(prices.pct_change().dropna())
+        init_args = (shm.name, values.shape, values.dtype, prices.index, prices.columns, corr)
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach, initargs=init_args) as pool:
+            rows = [r for chunk in pool.map(_run_chunk, chunks, itertools.repeat(initial_capital)) for r in chunk]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = pd.DataFrame(rows)
+    table["benchmark_final_value"] = buy_and_hold_values(values, initial_capital)[-1]
+    return table
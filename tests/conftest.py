@@ -0,0 +1,11 @@
+# The repository root is the package itself (relative imports): import it by its directory name.
+import importlib
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT.parent))
+
+
+def load(module):
+    return importlib.import_module(f"{ROOT.name}.{module}")
@@ -0,0 +1,76 @@
+"""In-process stand-in for ib_insync's IB client, with the calls used by brokers.IBKRBroker."""
+import asyncio
+import math
+from types import SimpleNamespace
+
+
+class FakeTicker:
+    def __init__(self, contract):
+        self.contract = contract
+        self.last = math.nan
+        self.time = None
+
+    def marketPrice(self):
+        return self.last
+
+
+class FakeIB:
+    """
+    Quotes are pushed with tick(); every placed order is acknowledged `ack_delay` seconds
+    later with statuses[symbol] ("Submitted" by default, None = never acknowledged).
+    """
+
+    def __init__(self, ack_delay=0.05, statuses=None):
+        self.ack_delay = ack_delay
+        self.statuses = statuses or {}
+        self.connected = False
+        self.tickers = {}
+        self.trades = []
+        self.events = []  # ("place" | "ack" | "cancel", symbol), in call order
+        self.cancelled_orders = []
+        self.cancelled_quotes = []
+
+    def isConnected(self):
+        return self.connected
+
+    def connect(self, host, port, clientId):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def sleep(self, seconds=0):
+        pass
+
+    async def qualifyContractsAsync(self, *contracts):
+        for k, c in enumerate(contracts):
+            c.conId = k + 1
+        return list(contracts)
+
+    def reqMktData(self, contract, genericTickList='', snapshot=False, regulatorySnapshot=False):
+        self.tickers[contract.symbol] = FakeTicker(contract)
+        return self.tickers[contract.symbol]
+
+    def cancelMktData(self, contract):
+        self.cancelled_quotes.append(contract.symbol)
+
+    def tick(self, symbol, price, time):
+        ticker = self.tickers[symbol]
+        ticker.last, ticker.time = price, time
+
+    def placeOrder(self, contract, order):
+        trade = SimpleNamespace(contract=contract, order=order, orderStatus=SimpleNamespace(status="PendingSubmit"))
+        self.trades.append(trade)
+        self.events.append(("place", contract.symbol))
+        status = self.statuses.get(contract.symbol, "Submitted")
+        if status is not None:
+            asyncio.get_running_loop().call_later(self.ack_delay, self._ack, trade, status)
+        return trade
+
+    def _ack(self, trade, status):
+        trade.orderStatus.status = status
+        self.events.append(("ack", trade.contract.symbol))
+
+    def cancelOrder(self, order):
+        self.cancelled_orders.append(order)
+        self.events.append(("cancel", next(t.contract.symbol for t in self.trades if t.order is order)))
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load
+
+backtest = load("backtest")
+chunked = load("chunked")
+signals = load("signals")
+
+TICKERS = ["A", "B", "C"]
+
+
+def make_prices(n=260, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n, len(TICKERS))), axis=0))
+    return pd.DataFrame(values, index=pd.bdate_range("2020-01-01", periods=n), columns=TICKERS)
+
+
+def make_engine():
+    # Thresholds around the median probability so that the codes mix BUY, HOLD and SELL
+    return backtest.BacktestEngine(initial_capital=1000, lookback_days=40, horizon_days=10,
+                                   sell_threshold=0.095, buy_threshold=0.08)
+
+
+@pytest.mark.parametrize("rows", [7, 17, 40, 1000])
+def test_chunked_run_matches_run(rows):
+    # Blocks shorter than the lookback: every rolling window spans several block boundaries
+    prices = make_prices()
+    full = make_engine().run(TICKERS, None, None, prices=prices)
+    chunks = make_engine().run_chunked(TICKERS, chunked.time_blocks(prices, rows), corr_lookback=63)
+
+    codes = full["barrier_panel"]["signal"].to_numpy()
+    assert {signals.BUY, signals.HOLD, signals.SELL} <= set(np.unique(codes))
+    for key in full["barrier_panel"]:
+        pd.testing.assert_frame_equal(chunks["barrier_panel"][key], full["barrier_panel"][key])
+    features = ["realized_vol", "parkinson_vol", "garman_klass_vol"]
+    pd.testing.assert_frame_equal(chunks["volatility_features"], full["volatility_features"][features])
+    pd.testing.assert_index_equal(chunks["dates"], full["dates"])
+    np.testing.assert_allclose(chunks["portfolio_values"], full["portfolio_values"], rtol=1e-12)
+    np.testing.assert_allclose(chunks["benchmark_values"], full["benchmark_values"], rtol=1e-12)
+    for key in ("invested", "traded"):
+        np.testing.assert_allclose(chunks[key], full[key], rtol=1e-12)
+    assert chunks["portfolio_signals"] == full["portfolio_signals"]
+    assert chunks["metrics"] == pytest.approx(full["metrics"], nan_ok=True)
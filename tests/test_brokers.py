@@ -0,0 +1,81 @@
+import time
+import pytest
+from conftest import load
+from fake_ib import FakeIB
+
+ib_insync = pytest.importorskip("ib_insync")
+brokers = load("brokers")
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN"]
+
+
+def order(symbol, side="BUY", price=100.0):
+    return {"symbol": symbol, "side": side, "volume": 1, "price": price, "sl": None, "tp": None}
+
+
+def test_quotes_are_streamed_from_subscriptions():
+    ib = FakeIB()
+    broker = brokers.IBKRBroker(SYMBOLS, ib=ib)
+    assert ib.isConnected()
+    assert set(ib.tickers) == set(SYMBOLS)
+    assert all(c.conId for c in broker.trader.contracts.values())
+
+    # No quote yet: nothing is reported, then each tick shows up without any new request
+    assert broker.poll() == {}
+    ib.tick("AAPL", 190.5, 1)
+    ib.tick("MSFT", 410.0, 1)
+    assert broker.poll() == {"AAPL": 190.5, "MSFT": 410.0}
+    ib.tick("AAPL", 191.0, 2)
+    assert broker.poll(["AAPL", "GOOGL"]) == {"AAPL": 191.0}
+    assert broker.last_update("AAPL") == 2
+    assert broker.last_update("GOOGL") is None
+
+
+def test_orders_are_placed_at_once_and_acknowledged_concurrently():
+    ib = FakeIB(ack_delay=0.05, statuses={"AMZN": "Filled"})
+    trader = brokers.AsyncIBKRTrader(ib, SYMBOLS)
+
+    async def run():
+        await trader.subscribe()
+        batch = [(s, trader.contracts[s], ib_insync.MarketOrder("BUY", 1)) for s in SYMBOLS * 5]
+        start = time.perf_counter()
+        records = await trader.submit(batch)
+        return records, time.perf_counter() - start
+
+    records, elapsed = ib_insync.util.run(run())
+
+    # Every order goes out before the first acknowledgement; the 20 waits overlap
+    assert [e for e, _ in ib.events] == ["place"] * 20 + ["ack"] * 20
+    assert elapsed < 20 * ib.ack_delay / 2
+    assert [r["status"] for r in records] == ["Submitted", "Submitted", "Submitted", "Filled"] * 5
+    assert all(r["ack_ms"] >= ib.ack_delay * 1000 * 0.5 for r in records)
+    assert trader.orders == records
+
+
+def test_stock_orders_are_mirrored_by_options():
+    ib = FakeIB(ack_delay=0.01)
+    broker = brokers.IBKRBroker(SYMBOLS, ib=ib, option_expiry="20251220", option_right="P")
+    records = broker.place_orders([order("AAPL", price=190.4), order("MSFT", side="SELL", price=410.0)])
+
+    assert [(r["symbol"], r["contract"], r["action"]) for r in records] == [
+        ("AAPL", "STK", "BUY"), ("AAPL", "OPT", "BUY"), ("MSFT", "STK", "SELL"), ("MSFT", "OPT", "SELL")]
+    option = ib.trades[1].contract
+    assert (option.lastTradeDateOrContractMonth, option.strike, option.right) == ("20251220", 190, "P")
+
+
+def test_shutdown_cancels_working_orders_and_quotes():
+    # AAPL fills, MSFT is never acknowledged, GOOGL / AMZN are working when the loop stops
+    ib = FakeIB(ack_delay=0.01, statuses={"AAPL": "Filled", "MSFT": None})
+    broker = brokers.IBKRBroker(SYMBOLS, ib=ib)
+    broker.trader.ack_timeout = 0.1
+    records = broker.place_orders([order(s) for s in SYMBOLS])
+    assert [r["status"] for r in records] == ["Filled", "Timeout", "Submitted", "Submitted"]
+
+    broker.close()
+    assert [e for e in ib.events if e[0] == "cancel"] == [("cancel", "MSFT"), ("cancel", "GOOGL"),
+                                                          ("cancel", "AMZN")]
+    assert [r["status"] for r in broker.trader.orders] == ["Filled", "PendingCancel", "PendingCancel",
+                                                           "PendingCancel"]
+    assert sorted(ib.cancelled_quotes) == sorted(SYMBOLS)
+    assert broker.trader.tickers == {}
+    assert not ib.isConnected()
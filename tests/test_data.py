@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load
+
+data = load("data")
+
+
+def _fake_download(calls, available, dividends=None):
+    """
+    Stand-in for yfinance: OHLCV on business days for the tickers in `available`, adjusted
+    like auto_adjust for the {ticker: {ex_date: yield}} entries of `dividends` known at call time.
+    """
+    def download(tickers, start, end):
+        calls.append((tuple(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        frames = {}
+        for t in (t for t in tickers if t in available):
+            factor = np.ones(len(dates))
+            for ex_date, dividend in (dividends or {}).get(t, {}).items():
+                factor[dates < ex_date] *= 1 - dividend
+            frames[t] = pd.DataFrame(np.outer(100.0 * factor, np.ones(5)), dates, data.OHLCV_FIELDS)
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+    return download
+
+
+def test_todays_partial_bar_is_refetched(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(data, "_download", _fake_download(calls, {"A"}))
+    today = pd.Timestamp.today().normalize()
+    start, end = today - pd.Timedelta(days=10), today + pd.Timedelta(days=1)
+    data.fetch_ohlcv("A", start, end, cache_dir=tmp_path, log=lambda *a: None)
+    assert data.PriceCache(tmp_path).ranges("A") == [(start.value, today.value)]
+
+    data.fetch_ohlcv("A", start, end, cache_dir=tmp_path, log=lambda *a: None)
+    assert calls[-1] == (("A",), today - data.OVERLAP, end + data.OVERLAP)
+
+
+def test_cache_is_refetched_when_adjustment_factors_change(tmp_path, monkeypatch):
+    calls, dividends = [], {}
+    monkeypatch.setattr(data, "_download", _fake_download(calls, {"A", "B"}, dividends))
+    fetch = lambda tickers, start, end: data.fetch_ohlcv(tickers, start, end, cache_dir=tmp_path,
+                                                         log=lambda *a: None)
+    fetch(["A", "B"], "2020-01-01", "2020-02-01")
+
+    # Unchanged factors: only the missing month is downloaded
+    fetch(["A", "B"], "2020-01-01", "2020-03-01")
+    assert len(calls) == 2 and calls[-1][1:] == (pd.Timestamp("2020-02-01") - data.OVERLAP,
+                                                 pd.Timestamp("2020-03-01") + data.OVERLAP)
+
+    # A pays a dividend after the cached range: backfilling January 2019 would stitch
+    # closes adjusted on different days, so A is refetched whole, B is not
+    dividends["A"] = {pd.Timestamp("2020-06-01"): 0.02}
+    frames = fetch(["A", "B"], "2019-01-01", "2020-03-01")
+    assert calls[-1] == (("A",), pd.Timestamp("2019-01-01"), pd.Timestamp("2020-03-01"))
+    assert len(calls) == 4
+    np.testing.assert_allclose(frames["A"]["Close"], 98.0)
+    np.testing.assert_allclose(frames["B"]["Close"], 100.0)
+    assert data.PriceCache(tmp_path).ranges("A") == [(pd.Timestamp("2019-01-01").value,
+                                                      pd.Timestamp("2020-03-01").value)]
+
+
+def test_empty_responses_are_not_downloaded_again(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(data, "_download", _fake_download(calls, {"A"}))
+    for _ in range(2):
+        frames = data.fetch_ohlcv(["A", "DELISTED"], "2020-01-01", "2020-02-01", cache_dir=tmp_path,
+                                  log=lambda *a: None)
+    assert len(calls) == 1
+    assert frames["DELISTED"].empty and len(frames["A"]) > 0
+
+
+def test_weekly_bars_are_not_collapsed_to_days():
+    index = pd.date_range("2024-01-01", periods=14 * 24, freq="1h")  # Monday 1 -> Sunday 14
+    closes = pd.DataFrame({"A": np.arange(len(index), dtype=float)}, index)
+    weekly = data.resample_closes(closes, "1W")
+    assert list(weekly.index) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-08")]
+    assert list(weekly["A"]) == [closes["A"][index < "2024-01-08"].iloc[-1], closes["A"].iloc[-1]]
+
+    daily = data.resample_closes(closes, "1D")
+    assert len(daily) == 14 and daily.index[1] == pd.Timestamp("2024-01-02")
+
+
+def test_unsupported_bar_frequency_raises():
+    closes = pd.DataFrame({"A": [1.0, 2.0]}, pd.date_range("2024-01-01", periods=2, freq="1h"))
+    for freq in ("2W", "MS", "B"):
+        with pytest.raises(ValueError, match="Unsupported bar frequency"):
+            data.resample_closes(closes, freq)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from conftest import load
+
+execution = load("execution")
+signals = load("signals")
+money_management = load("money_management")
+
+
+def test_sl_tp_entries_are_limited_by_cash():
+    # BUY on every bar; each risk-sized lot costs about half the capital
+    close = pd.DataFrame({"A": [100.0, 100.0, 100.0, 105.0, 105.0, 105.0]},
+                         index=pd.bdate_range("2024-01-01", periods=6))
+    codes = np.full((len(close), 1), signals.BUY)
+    mm = money_management.MoneyManager(account_size=100000, risk_per_trade=0.01)
+    equity, trades = execution.simulate_sl_tp(close, codes, mm, initial_capital=100000, sl_pct=0.02, tp_pct=0.04)
+
+    # Two lots fit; the next BUY is skipped until the take-profits at 105 free the cash
+    # for two more, then the last BUY is skipped again
+    assert list(trades["entry_date"]) == list(close.index[[0, 1, 3, 4]])
+    assert list(trades["exit_reason"]) == ["take_profit", "take_profit", "open", "open"]
+    cash = 100000 - (trades["lot"] * trades["entry_price"]).sum() + (trades["lot"] * trades["exit_price"]).sum()
+    assert cash >= 0
+    assert (equity >= 100000).all()
+
+
+def test_close_only_exits_fill_at_the_crossing_close():
+    # Without high/low/open, the stop (98) is only seen crossed by the close at 90
+    close = pd.DataFrame({"A": [100.0, 100.0, 90.0, 95.0], "B": [100.0, 101.0, 110.0, 111.0]},
+                         index=pd.bdate_range("2024-01-01", periods=4))
+    codes = np.zeros(close.shape, dtype=np.int8)
+    codes[0] = signals.BUY
+    mm = money_management.MoneyManager(account_size=100000, risk_per_trade=0.001)
+    equity, trades = execution.simulate_sl_tp(close, codes, mm, initial_capital=100000, sl_pct=0.02, tp_pct=0.04)
+
+    assert list(trades["exit_reason"]) == ["stop_loss", "take_profit"]
+    assert list(trades["exit_price"]) == [90.0, 110.0]
+    assert list(trades["pnl"]) == [50 * (90.0 - 100.0), 50 * (110.0 - 100.0)]
+    assert equity[-1] == 100000 + 50 * (90.0 - 100.0) + 50 * (110.0 - 100.0)
+
+
+def test_first_hit_takes_the_earlier_level():
+    # Column 0 reaches its stop first (bar 1), column 1 its target first (bar 2); column 2 reaches
+    # both on bar 3, which counts as a stop; column 3 never gets there before `last`
+    low = np.array([[100, 100, 100, 100],
+                    [94, 100, 100, 100],
+                    [100, 100, 100, 100],
+                    [100, 94, 94, 100],
+                    [100, 100, 100, 94]], dtype=float)
+    high = np.array([[101, 101, 101, 101],
+                     [101, 101, 101, 101],
+                     [111, 111, 101, 101],
+                     [101, 101, 111, 101],
+                     [101, 101, 101, 101]], dtype=float)
+    entry, column = np.zeros(4), np.arange(4)
+    bar, reason = execution.first_hit(high, low, entry, column, np.full(4, 95.0), np.full(4, 110.0),
+                                      last=[4, 4, 4, 3])
+    assert list(bar) == [1, 2, 3, -1]
+    assert list(reason) == [execution.EXIT_STOP, execution.EXIT_TARGET, execution.EXIT_STOP, execution.EXIT_OPEN]
+
+    # Short trades: the stop is above, the target below
+    bar, reason = execution.first_hit(high, low, [0, 0], [0, 1], [110.0, 110.0], [95.0, 95.0], direction=-1)
+    assert list(bar) == [1, 2]
+    assert list(reason) == [execution.EXIT_TARGET, execution.EXIT_STOP]
+
+
+def test_sell_signal_closes_the_trade_at_its_close():
+    close = pd.DataFrame({"A": [100.0, 101.0, 102.0, 103.0]}, index=pd.bdate_range("2024-01-01", periods=4))
+    codes = np.zeros(close.shape, dtype=np.int8)
+    codes[0, 0], codes[2, 0] = signals.BUY, signals.SELL
+    mm = money_management.MoneyManager(account_size=100000, risk_per_trade=0.001)
+    equity, trades = execution.simulate_sl_tp(close, codes, mm, transaction_cost=0.001, initial_capital=100000,
+                                              sl_pct=0.02, tp_pct=0.04)
+
+    # lot = 100 / (100 - 98) = 50, neither 98 nor 104 reached before the SELL on bar 2
+    trade = trades.iloc[0]
+    assert (trade["lot"], trade["exit_date"], trade["exit_price"], trade["exit_reason"]) == \
+        (50, close.index[2], 102.0, "signal")
+    pnl = 50 * (102.0 * 0.999 - 100.0 * 1.001)
+    assert np.isclose(trade["pnl"], pnl)
+    assert np.allclose(equity[2:], 100000 + pnl)
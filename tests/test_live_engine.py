@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from conftest import load
+
+signals = load("signals")
+brokers = load("brokers")
+live_engine = load("live_engine")
+scheduler = load("scheduler")
+
+
+class AlwaysBuy:
+    signal = signals.BUY
+
+    def update(self, price):
+        pass
+
+
+def _mixed_panel(n=1500, seed=0):
+    """1-minute FX pair and 5-minute equity pair, each pair strongly correlated."""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2024-01-02 09:00", periods=n, freq="1min")
+    fx, eq = rng.normal(0, 1e-3, (2, n))
+    returns = np.column_stack([fx, fx + rng.normal(0, 1e-4, n), eq, eq + rng.normal(0, 1e-4, n)])
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), idx, ["EURUSD", "GBPUSD", "AAPL", "MSFT"])
+    prices.loc[idx.minute % 5 != 0, ["AAPL", "MSFT"]] = np.nan
+    return prices
+
+
+def test_mixed_timeframe_replay_keeps_dropping_correlated_buys():
+    prices = _mixed_panel()
+    warmup = 1000
+    clock = scheduler.SimulatedClock(prices.index[warmup - 1])
+    broker = brokers.ReplayBroker(prices, warmup=warmup, clock=clock)
+    engine = live_engine.LiveEngine(broker, broker.history(), log=lambda *a: None, corr_threshold=0.8,
+                                    corr_lookback=20)
+    for s in engine.symbols:
+        engine.barrier_state[s] = AlwaysBuy()
+    engine.run({"1min": ["EURUSD", "GBPUSD"], "5min": ["AAPL", "MSFT"]}, clock=clock, lag_sec=0)
+
+    report = engine.scheduler.report()
+    assert report.loc["1min", "evaluated"] == len(prices) - warmup + 1
+    bought = {o["symbol"] for o in engine.orders}
+    assert bought == {"EURUSD", "AAPL"}
+    for symbols, correlation, _ in engine.correlations:
+        assert correlation.gaps == 0
+        assert correlation.matrix()[0, 1] > 0.8
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load
+
+metrics = load("metrics")
+report = load("report")
+
+
+def test_drawdown_duration_counts_an_unrecovered_peak():
+    # Recovered drawdown of 2 periods after 110, then a peak at 112 never regained (3 periods)
+    values = np.array([100.0, 110.0, 105.0, 108.0, 112.0, 100.0, 95.0, 97.0])
+    drawdown, duration = metrics.drawdowns(values)
+    assert list(duration) == [0, 0, 1, 2, 0, 1, 2, 3]
+    np.testing.assert_allclose(drawdown[-1], 97 / 112 - 1)
+
+    m = metrics.compute_metrics(values, 100.0)
+    assert m["max_drawdown_duration"] == 3
+    assert m["max_drawdown"] == pytest.approx(95 / 112 - 1)
+    assert m["total_return"] == pytest.approx(-0.03)
+    assert m["hit_rate"] == pytest.approx(4 / 7)
+
+
+def test_batch_metrics_match_one_curve_at_a_time():
+    rng = np.random.default_rng(0)
+    capital = np.array([1000.0, 5000.0, 100.0, 1e6])
+    values = capital * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 4)), axis=0))
+    values[100:120, 2] = values[99, 2]  # flat stretch: zero returns are not hits or misses
+    invested = values * rng.uniform(0, 1, values.shape)
+    traded = values * rng.uniform(0, 0.1, values.shape)
+    frame = pd.DataFrame(values, columns=["a", "b", "c", "d"])
+
+    table = metrics.compute_metrics(frame, capital, invested, traded, periods_per_year=52)
+    assert list(table.index) == ["a", "b", "c", "d"] and list(table.columns) == list(metrics.METRICS)
+    for j, name in enumerate(frame.columns):
+        one = metrics.compute_metrics(values[:, j], capital[j], invested[:, j], traded[:, j], periods_per_year=52)
+        assert set(one) == set(metrics.METRICS)
+        assert one == pytest.approx(table.loc[name].to_dict(), rel=1e-12)
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    rng = np.random.default_rng(0)
+    n = 100_000
+    x = np.arange(n) * 60.0
+    y = np.sin(np.arange(n) / 5000) + rng.normal(0, 0.05, n)
+    y[31_337], y[77_000] = 5.0, -5.0  # isolated spikes, the global max and min
+    keep = report.lttb(x, y, 500)
+
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert (np.diff(keep) > 0).all()
+    assert y.argmax() in keep and y.argmin() in keep
+    # On random walks the extremes are not isolated spikes and plain LTTB often drops them
+    for seed in range(10):
+        walk = np.cumsum(np.random.default_rng(seed).normal(size=n))
+        keep = report.lttb(x, walk, 500)
+        assert walk.argmax() in keep and walk.argmin() in keep
+        assert (np.diff(keep) > 0).all()
+    # Fewer points than asked for: everything is kept
+    assert list(report.lttb(x[:10], y[:10], 500)) == list(range(10))
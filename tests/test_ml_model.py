@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load
+
+pytest.importorskip("lightgbm")
+ml_model = load("ml_model")
+
+
+def _prices(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n, 3)), axis=0)),
+                          pd.bdate_range("2020-01-01", periods=n), ["C", "A", "B"])
+    prices.iloc[:60, 2] = np.nan  # B listed later
+    prices.iloc[200:210, 1] = np.nan  # A halted
+    return prices
+
+
+def test_design_matrix_matches_multiindex_path(tmp_path):
+    design = ml_model.build_design_matrix(_prices(), horizon_days=5, clip=0.1)
+    X, y = design.to_frame()
+    train_end = design.dates[250]
+
+    models = [ml_model.train_lightgbm(rows, targets, train_end, n_estimators=20, cache_dir=tmp_path)
+              for rows, targets in ((design, design.y), (X, y))]
+    assert models[0].cache_key == models[1].cache_key
+    assert len(list(tmp_path.iterdir())) == 1
+    pred = ml_model.predict_batched(models[0], design)
+    np.testing.assert_array_equal(pred, ml_model.predict_batched(models[1], X))
+    pd.testing.assert_frame_equal(ml_model.prediction_panel(pred, design), ml_model.prediction_panel(pred, X.index))
+
+    walk = [ml_model.WalkForwardTrainer(retrain_every=50, min_train_dates=150, embargo=5, initial_estimators=20,
+                                        n_estimators=10).fit_predict(rows, targets)
+            for rows, targets in ((design, design.y), (X, y))]
+    np.testing.assert_array_equal(walk[0], walk[1].to_numpy())
+    first_predicted = np.unique(design.row_dates())[150 + 5]
+    assert np.array_equal(np.isnan(walk[0]), design.row_dates() < first_predicted)
@@ -0,0 +1,89 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+from conftest import load
+
+pipeline = load("pipeline")
+
+
+def counting_graph(calls):
+    def stage(name, func):
+        def counted(**kwargs):
+            calls[name] += 1
+            return func(**kwargs)
+        return counted
+
+    g = pipeline.StageGraph()
+    g.stage("features", stage("features", lambda prices, window: prices.rolling(window).mean()), ("prices",),
+            ("window",))
+    g.stage("volatility", stage("volatility", lambda prices: prices.pct_change().std()), ("prices",))
+    g.stage("signal", stage("signal", lambda features, threshold: features > threshold), ("features",),
+            ("threshold",))
+    g.stage("sized", stage("sized", lambda signal, volatility=None, scale=1.0: signal * scale),
+            lambda c: ("signal", "volatility") if c["vol_sizing"] else ("signal",), ("scale",))
+    return g
+
+
+def test_stage_graph_shares_stages_between_strategies():
+    calls = Counter()
+    g = counting_graph(calls)
+    g.source("prices", pd.DataFrame({"A": np.arange(1.0, 21.0), "B": np.arange(1.0, 21.0)[::-1]}))
+    base = {"window": 5, "threshold": 8.0, "scale": 1.0, "vol_sizing": False}
+
+    # Two strategies sharing their features, differing in threshold
+    g.get("sized", base)
+    g.get("sized", {**base, "threshold": 12.0})
+    assert calls == {"features": 1, "signal": 2, "sized": 2}
+    assert g.reused["features"] == 1
+
+    # Asking again computes nothing
+    g.get("sized", base)
+    assert calls == {"features": 1, "signal": 2, "sized": 2}
+    assert g.reused["sized"] == 1
+
+
+def test_stage_graph_recomputes_only_downstream_of_a_change():
+    calls = Counter()
+    g = counting_graph(calls)
+    prices = pd.DataFrame({"A": np.arange(1.0, 21.0), "B": np.arange(1.0, 21.0)[::-1]})
+    g.source("prices", prices)
+    base = {"window": 5, "threshold": 8.0, "scale": 1.0, "vol_sizing": True}
+    g.get("sized", base)
+    assert calls == {"features": 1, "volatility": 1, "signal": 1, "sized": 1}
+
+    g.get("sized", {**base, "scale": 2.0})  # last stage only
+    assert calls == {"features": 1, "volatility": 1, "signal": 1, "sized": 2}
+    g.get("sized", {**base, "window": 3})  # features and everything downstream, not volatility
+    assert calls == {"features": 2, "volatility": 1, "signal": 2, "sized": 3}
+    g.get("sized", {**base, "vol_sizing": False})  # inputs chosen by the config: a new key
+    assert calls == {"features": 2, "volatility": 1, "signal": 2, "sized": 4}
+
+    # Same content under a new object is still a hit; changed content recomputes everything
+    g.source("prices", prices.copy())
+    g.get("sized", base)
+    assert calls == {"features": 2, "volatility": 1, "signal": 2, "sized": 4}
+    g.source("prices", prices * 2)
+    g.get("sized", base)
+    assert calls == {"features": 3, "volatility": 2, "signal": 3, "sized": 5}
+
+
+def test_runner_reuses_shared_stages_across_variants_and_runs():
+    rng = np.random.default_rng(0)
+    tickers = ["A", "B", "C"]
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (260, 3)), axis=0)),
+                          index=pd.bdate_range("2020-01-01", periods=260), columns=tickers)
+    runner = pipeline.MultiStrategyRunner(strategy="barrier", lookback_days=40, horizon_days=10)
+    variants = {"loose": {"buy_threshold": 0.1}, "strict": {"buy_threshold": 0.05}}
+    runner.run(tickers, variants, prices=prices)
+    assert Counter(runner.graph.computed) == {
+        "returns": 1, "correlation": 1, "barrier_probs": 1,
+        "barrier_signals": 2, "signals": 2, "simulation": 2, "portfolio_signals": 2}
+
+    # A changed sell threshold only reaches the signal stages and what reads them
+    del runner.graph.computed[:]
+    table = runner.run(tickers, {"loose": {"buy_threshold": 0.1, "sell_threshold": 0.12}}, prices=prices)
+    assert runner.graph.computed == ["barrier_signals", "signals", "simulation", "portfolio_signals"]
+
+    fresh = pipeline.MultiStrategyRunner(strategy="barrier", lookback_days=40, horizon_days=10)
+    expected = fresh.run(tickers, {"loose": {"buy_threshold": 0.1, "sell_threshold": 0.12}}, prices=prices)
+    pd.testing.assert_frame_equal(table, expected)
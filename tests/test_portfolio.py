@@ -0,0 +1,57 @@
+import numpy as np
+from conftest import load
+
+portfolio = load("portfolio")
+signals = load("signals")
+
+
+def test_project_simplex_rows_are_feasible():
+    rng = np.random.default_rng(0)
+    v = rng.normal(0, 2, (200, 8))
+    mask = rng.random(v.shape) < 0.6
+    mask[np.arange(len(v)), rng.integers(0, 8, len(v))] = True
+    w = portfolio.project_simplex(v, mask)
+
+    np.testing.assert_allclose(w.sum(axis=1), 1.0, atol=1e-12)
+    assert (w >= 0).all()
+    assert (w[~mask] == 0).all()
+    # Points already on the simplex are left where they are
+    inside = portfolio.project_simplex(w, mask)
+    np.testing.assert_allclose(inside, w, atol=1e-12)
+
+
+def test_window_moments_match_direct_ledoit_wolf():
+    rng = np.random.default_rng(1)
+    x = rng.normal(0, 0.01, (300, 5)) @ rng.normal(0, 1, (5, 5))
+    valid = np.ones(x.shape, dtype=bool)
+    moments = portfolio.WindowMoments(5, refresh=1000)
+    for hi in range(60, 240):  # slide by adding and removing rows, never recomputing
+        moments.move(x, valid, hi - 60, hi)
+    mean, cov, delta, target = moments.estimate()
+
+    window = x[179:239]
+    T, n = window.shape
+    y = window - window.mean(axis=0)
+    sample = y.T @ y / T
+    mu = np.trace(sample) / n
+    b2 = sum(((np.outer(r, r) - sample) ** 2).sum() for r in y) / T ** 2
+    d2 = ((sample - mu * np.eye(n)) ** 2).sum()
+    np.testing.assert_allclose(mean, window.mean(axis=0), rtol=1e-10)
+    np.testing.assert_allclose(cov, sample, rtol=1e-8)
+    np.testing.assert_allclose(target, mu, rtol=1e-8)
+    np.testing.assert_allclose(delta, min(1.0, b2 / d2), rtol=1e-6)
+    assert 0 < delta < 1
+
+
+def test_risk_parity_equalises_risk_contributions_on_diagonal_covariance():
+    # Orthogonal zero-mean columns: the sample covariance is exactly diagonal
+    vols = np.array([0.01, 0.02, 0.04])
+    returns = np.array([[1, 1, 1], [-1, 1, -1], [1, -1, -1], [-1, -1, 1]]) * vols
+    codes = np.full(returns.shape, signals.BUY)
+    optimizer = portfolio.PortfolioOptimizer("risk_parity", lookback=4, shrinkage=0.0, tol=1e-12)
+    w = optimizer.target_weights(returns, codes)[-1]
+
+    cov = np.diag(vols ** 2)
+    contributions = w * (cov @ w)
+    np.testing.assert_allclose(contributions, contributions.mean(), rtol=1e-8)
+    np.testing.assert_allclose(w, (1 / vols) / (1 / vols).sum(), rtol=1e-8)
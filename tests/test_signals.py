@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from conftest import load
+
+signals = load("signals")
+
+
+def _correlated_returns(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(0, 0.01, n)
+    return pd.DataFrame({"A": base, "B": base + rng.normal(0, 0.001, n), "C": rng.normal(0, 0.01, n)})
+
+
+def test_rolling_correlation_with_nan_row_matches_full_history():
+    returns = _correlated_returns()
+    returns.iloc[250, 1] = np.nan
+    rolling = signals.RollingCorrelation(returns.columns, lookback=63)
+    for i, row in enumerate(returns.to_numpy()):
+        rolling.update(row)
+        if i >= 250:
+            expected = signals.correlation_matrix(returns.iloc[:i + 1], 63)
+            np.testing.assert_allclose(rolling.matrix(), expected, atol=1e-10)
+    assert rolling.matrix()[0, 1] > 0.9
+
+
+def test_rolling_correlation_sparse_column_matches_full_history():
+    returns = _correlated_returns(n=600)
+    returns.loc[returns.index % 3 != 0, "B"] = np.nan  # B quoted every third row only
+    rolling = signals.RollingCorrelation(returns.columns, lookback=63, history=returns)
+    np.testing.assert_allclose(rolling.matrix(), signals.correlation_matrix(returns, 63), atol=1e-10)
+    assert len(rolling.history) < len(returns)
+
+
+def test_filter_still_drops_correlated_buy_after_gap():
+    returns = _correlated_returns()
+    returns.iloc[-5, 2] = np.nan
+    rolling = signals.RollingCorrelation(returns.columns, lookback=63, history=returns)
+    kept = signals.filter_correlated_buys({"A": signals.BUY, "B": signals.BUY, "C": signals.BUY},
+                                          rolling.matrix(), list(returns.columns))
+    assert kept == {"A": signals.BUY, "B": signals.HOLD, "C": signals.BUY}
+
+
+def _regime_prices(jump=0.0, seed=1):
+    # 100k bars cycling through calm and volatile regimes, with a flat stretch and an
+    # optional level shift on bar 10000
+    rng = np.random.default_rng(seed)
+    sigma = np.repeat([0.002, 0.05, 0.0005, 0.03] * 5, 5000)
+    log_ret = rng.normal(0, sigma)
+    log_ret[12000:12300] = 0.0
+    return pd.Series(50 * np.exp(np.cumsum(log_ret)) + jump * (np.arange(len(sigma)) >= 10000), name="A")
+
+
+def _stream(prices, lookback, horizon, **kwargs):
+    state = signals.BarrierSignalState(lookback, horizon, **kwargs)
+    streamed = [state.update(p) for p in prices.to_numpy()]
+    return pd.DataFrame(streamed[lookback:len(prices) - horizon])
+
+
+def test_streamed_barrier_state_matches_batch_panel():
+    prices = _regime_prices()
+    lookback, horizon = 126, 30
+    panel = signals.calculate_barrier_panel(prices, lookback, horizon, sell_threshold=0.12, buy_threshold=0.05)
+    rows = _stream(prices, lookback, horizon, sell_threshold=0.12, buy_threshold=0.05)
+
+    for key in ("volatility", "avg_barrier_prob"):
+        np.testing.assert_allclose(rows[key], panel[key]["A"], rtol=1e-7)
+    np.testing.assert_array_equal(rows["signal"], panel["signal"]["A"])
+    assert set(rows["signal"]) == {signals.BUY, signals.HOLD, signals.SELL}
+
+
+def test_streamed_volatility_does_not_drift_after_a_huge_return():
+    # A 200x jump leaves the window: removing it from the Welford sums cancels almost all of
+    # the variance, so the state must not keep the rounding error until the periodic recompute
+    prices = _regime_prices(jump=1e4)
+    lookback, horizon = 126, 30
+    rows = _stream(prices, lookback, horizon)
+
+    log_ret = np.diff(np.log(prices.to_numpy()))
+    windows = np.lib.stride_tricks.sliding_window_view(log_ret, lookback - 1)[:len(rows)]
+    exact = windows.std(axis=1, ddof=1) * np.sqrt(252)
+    np.testing.assert_allclose(rows["volatility"], np.where(exact == 0, 0.3, exact), rtol=1e-9, atol=1e-13)
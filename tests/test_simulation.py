@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from conftest import load
+
+signals = load("signals")
+simulation = load("simulation")
+
+
+def reference_loop(prices, codes, initial_capital, transaction_cost):
+    """The engines' original per-date loop: one unit per signal, tickers in column order."""
+    cash, refused = initial_capital, 0
+    positions = np.zeros(prices.shape[1], dtype=np.int64)
+    values, cash_path, pos_path = [], [], []
+    for price, code in zip(prices, codes):
+        for t in range(len(price)):
+            if code[t] == signals.BUY and cash >= price[t]:
+                positions[t] += 1
+                cash -= price[t] * (1 + transaction_cost)
+            elif code[t] == signals.BUY and price[t] > cash:
+                refused += 1
+            elif code[t] == signals.SELL and positions[t] > 0:
+                positions[t] -= 1
+                cash += price[t] * (1 - transaction_cost)
+        values.append(cash + sum(positions[t] * price[t] for t in range(len(price))))
+        cash_path.append(cash)
+        pos_path.append(positions.copy())
+    return np.array(values), np.array(cash_path), np.array(pos_path), refused
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("initial_capital", [350.0, 5000.0, 1e7])
+def test_unit_portfolio_matches_the_reference_loop(seed, initial_capital):
+    rng = np.random.default_rng(seed)
+    n_dates, n_tickers = 700, 6
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_dates, n_tickers)), axis=0))
+    codes = rng.choice([signals.SELL, signals.HOLD, signals.BUY], size=prices.shape,
+                       p=[0.25, 0.4, 0.35]).astype(np.int8)
+    # Missing prices: no BUY can fill there (a SELL would make cash NaN in both, so none there)
+    missing = rng.random(prices.shape) < 0.03
+    prices[missing] = np.nan
+    codes[missing & (codes == signals.SELL)] = signals.HOLD
+
+    values, cash, positions = simulation.simulate_unit_portfolio(prices, codes, initial_capital, 0.001, block=64)
+    ref_values, ref_cash, ref_positions, refused = reference_loop(prices, codes, initial_capital, 0.001)
+
+    np.testing.assert_array_equal(positions, ref_positions)
+    np.testing.assert_allclose(cash, ref_cash, rtol=1e-9)
+    np.testing.assert_allclose(values, ref_values, rtol=1e-9)
+    # The small capitals make cash bind on some dates, the largest never does
+    assert (refused > 0) == (initial_capital < 1e7)
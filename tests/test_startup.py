@@ -0,0 +1,10 @@
+from conftest import load
+
+benchmark = load("benchmark")
+
+
+def test_no_heavy_module_is_imported_at_startup():
+    # Each case runs in a fresh interpreter, so modules already loaded by the test session don't count
+    rows = benchmark.startup_times(repeat=1, log=lambda *args: None)
+    assert [row["stage"] for row in rows] == [f"startup_{case}" for case in benchmark.STARTUP_CASES]
+    assert {row["stage"]: row["heavy_imports"] for row in rows} == {row["stage"]: [] for row in rows}
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load
+
+pytest.importorskip("arch")
+volatility = load("volatility")
+backtest = load("backtest")
+
+
+def _prices(n=400, tickers=("A", "B"), seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (n, len(tickers)))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), pd.bdate_range("2020-01-01", periods=n),
+                        list(tickers))
+
+
+def test_engine_reuses_its_garch_stage_across_runs():
+    prices = _prices()
+    engine = backtest.BacktestEngine()
+    first = engine.run(["A", "B"], None, None, prices=prices)["garch_report"]
+    second = engine.run(["A", "B"], None, None, prices=prices)["garch_report"]
+    assert (first["n_fits"] == 1).all()
+    assert (second["n_fits"] == 0).all() and (second["n_cached"] == 1).all()
+
+
+def test_engine_takes_a_cached_garch_stage(tmp_path):
+    prices = _prices()
+    backtest.BacktestEngine(garch_stage=volatility.GarchStage(cache_dir=tmp_path)).run(["A", "B"], None, None,
+                                                                                     prices=prices)
+    stage = volatility.GarchStage(cache_dir=tmp_path)
+    report = backtest.BacktestEngine(garch_stage=stage).run(["A", "B"], None, None, prices=prices)["garch_report"]
+    assert (report["n_cached"] == 1).all()
+
+
+def test_short_history_with_refit_every_falls_back():
+    prices = _prices(n=100)
+    vol, report = volatility.GarchStage(refit_every=20, min_obs=250, n_jobs=1).fit(prices)
+    assert report["fallback"].all() and not report["converged"].any()
+    expected = prices.pct_change().rolling(20).std()
+    pd.testing.assert_frame_equal(vol, expected)
+    assert vol.iloc[20:].notna().all().all()
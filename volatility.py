@@ -1,6 +1,12 @@
 
+import os
+import json
+import time
+import hashlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from arch import arch_model
+import pandas as pd
 
 class VolatilityFeatures:
     """Calcul avancé de volatilité pour un actif."""
@@ -11,6 +17,7 @@ class VolatilityFeatures:
 
     @staticmethod
     def garch_volatility(prices, p=1, q=1):
+        from arch import arch_model
         returns = np.log(prices / prices.shift(1)).dropna() * 100
         model = arch_model(returns, vol="Garch", p=p, q=q)
         res = model.fit(disp="off")
@@ -32,3 +39,124 @@ class VolatilityFeatures:
     def close_to_close_volatility(prices, window=20):
         returns = np.log(prices / prices.shift(1))
         return returns.rolling(window).std()
+
+
+def _returns_hash(returns, p, q):
+    h = hashlib.sha1(np.ascontiguousarray(returns.to_numpy(dtype=float)).tobytes())
+    h.update(f"{p},{q}".encode())
+    return h.hexdigest()[:16]
+
+
+def _fit_garch(ticker, prices, p, q, refit_every, window, min_obs, cached, warm_start, fallback_window):
+    """Fit one ticker for GarchStage (module level so it can run in a worker process)."""
+    from arch import arch_model
+    start = time.perf_counter()
+    row = {"ticker": ticker, "n_fits": 0, "n_cached": 0, "converged": True, "fallback": False, "error": None}
+    new_params = {}
+    returns = np.log(prices / prices.shift(1)).dropna() * 100
+    try:
+        model = arch_model(returns, vol="Garch", p=p, q=q)
+        n = len(returns)
+        if refit_every is not None and n <= min_obs:
+            # No out-of-sample segment to fill: reported as a fallback below
+            raise ValueError(f"{n} returns, refit_every needs more than min_obs={min_obs}")
+        # Refit points: a single full-sample fit, or every `refit_every` bars once min_obs is reached
+        ends = [n] if refit_every is None else list(range(min_obs, n, refit_every))
+        vol = pd.Series(np.nan, index=returns.index)
+        params = warm_start
+        for k, end in enumerate(ends):
+            first = 0 if window is None else max(0, end - window)
+            key = _returns_hash(returns.iloc[first:end], p, q)
+            if key in cached:
+                params = np.asarray(cached[key]["params"])
+                row["n_cached"] += 1
+            else:
+                with warnings.catch_warnings():
+                    # arch warns and ignores starting values that violate its constraints
+                    warnings.simplefilter("ignore")
+                    res = model.fit(disp="off", starting_values=params, first_obs=first, last_obs=end,
+                                    show_warning=False)
+                params = res.params.to_numpy()
+                row["n_fits"] += 1
+                row["converged"] &= res.convergence_flag == 0
+                new_params[key] = {"params": params.tolist(), "converged": bool(res.convergence_flag == 0)}
+            # Parameters fitted up to `end` drive the volatility of the following segment
+            seg_start = 0 if refit_every is None else end
+            seg_stop = ends[k + 1] if k + 1 < len(ends) else n
+            cond = model.fix(params).conditional_volatility
+            vol.iloc[seg_start:seg_stop] = cond.iloc[seg_start:seg_stop]
+        vol = (vol / 100).reindex(prices.index)
+    except Exception as e:
+        vol = prices.pct_change().rolling(fallback_window).std()
+        row.update(fallback=True, converged=False, error=repr(e))
+    row["fit_time_s"] = time.perf_counter() - start
+    return ticker, vol, row, new_params
+
+
+class GarchStage:
+    """
+    GARCH(p, q) conditional volatility for a whole universe.
+
+    - tickers are fitted in parallel over a process pool (n_jobs);
+    - each fit warm-starts from the ticker's last cached parameters, or from the
+      median parameters of the other cached tickers;
+    - refit_every=None fits once on the full sample (same as garch_volatility);
+      refit_every=N refits every N bars on an expanding (window=None) or rolling
+      window, each segment using only parameters fitted on past data;
+    - fits are cached by ticker and data hash (in memory, and in cache_dir if given),
+      so re-running on extended data only fits the new refit points;
+    - failures fall back to the rolling std of returns and are reported, not hidden.
+    """
+
+    def __init__(self, p=1, q=1, n_jobs=None, refit_every=None, window=None, min_obs=250,
+                 cache_dir=None, fallback_window=20):
+        self.p, self.q = p, q
+        self.n_jobs = n_jobs
+        self.refit_every = refit_every
+        self.window = window
+        self.min_obs = min_obs
+        self.cache_dir = cache_dir
+        self.fallback_window = fallback_window
+        self.cache = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cached(self, ticker):
+        if ticker not in self.cache and self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, f"{ticker}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    self.cache[ticker] = json.load(f)
+        return self.cache.get(ticker, {})
+
+    def _warm_start(self, ticker):
+        own = self._cached(ticker)
+        if own:
+            return np.asarray(list(own.values())[-1]["params"])
+        others = [list(c.values())[-1]["params"] for t, c in self.cache.items() if c and t != ticker]
+        return np.median(np.asarray(others), axis=0) if others else None
+
+    def _store(self, ticker, new_params):
+        if not new_params:
+            return
+        self.cache.setdefault(ticker, {}).update(new_params)
+        if self.cache_dir is not None:
+            with open(os.path.join(self.cache_dir, f"{ticker}.json"), "w") as f:
+                json.dump(self.cache[ticker], f)
+
+    def fit(self, prices):
+        """Returns (volatility DataFrame aligned on prices, per-ticker report DataFrame)."""
+        jobs = [(t, prices[t], self.p, self.q, self.refit_every, self.window, self.min_obs,
+                 self._cached(t), self._warm_start(t), self.fallback_window) for t in prices.columns]
+        if self.n_jobs == 1 or len(jobs) == 1:
+            results = [_fit_garch(*job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+                results = list(pool.map(_fit_garch, *zip(*jobs)))
+
+        vols, rows = {}, []
+        for ticker, vol, row, new_params in results:
+            vols[ticker] = vol
+            rows.append(row)
+            self._store(ticker, new_params)
+        return pd.DataFrame(vols, index=prices.index), pd.DataFrame(rows).set_index("ticker")